@@ -1,16 +1,116 @@
 # alignment.py
+import torch
 from simalign import SentenceAligner
-import nltk
+from config import Config
+from tokenization import TokenizationService
+
+# torch < 1.9 has no inference_mode; no_grad is the closest equivalent
+_inference_mode = getattr(torch, "inference_mode", torch.no_grad)
+
+
+def _tensor_bytes(value, seen: set) -> int:
+    """
+    Bytes held by a state_dict value: a tensor, or the (weight, bias) tuples
+    of quantized layers' packed params. Tensors shared by several entries
+    (tied weights) are counted once.
+    """
+    if isinstance(value, torch.Tensor):
+        try:
+            key = value.data_ptr()
+        except RuntimeError:
+            key = id(value)
+        if key in seen:
+            return 0
+        seen.add(key)
+        return value.numel() * value.element_size()
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v, seen) for v in value)
+    return 0
 
 
 class AlignmentService:
-    def __init__(self, model_name="bert", token_type="bpe", matching_methods="mai"):
+    def __init__(
+        self,
+        model_name="bert",
+        token_type="bpe",
+        matching_methods="mai",
+        tokenizer: TokenizationService = None,
+        quantize: bool = False,
+        intra_op_threads: int = None,
+        inter_op_threads: int = None,
+        max_tokens: int = None,
+    ):
+        """
+        CPU inference profile:
+          quantize          -- dynamic int8 quantization of the encoder's Linear layers
+          intra_op_threads  -- torch.set_num_threads (process-wide)
+          inter_op_threads  -- torch.set_num_interop_threads (process-wide, first call only)
+          max_tokens        -- only the first N words of each side are aligned;
+                               the rest are still returned in the tokenized lists
+        """
         self.aligner = SentenceAligner(
             model=model_name, token_type=token_type, matching_methods=matching_methods
         )
+        # Shared with the translation endpoint so each sentence is tokenized once
+        self.tokenizer = tokenizer or TokenizationService()
+        self.max_tokens = max_tokens or None
+        self.quantized = False
+        self._apply_inference_profile(quantize, intra_op_threads, inter_op_threads)
         self.cache = {}
 
-    def align(self, original: str, translated: str):
+    @classmethod
+    def from_config(cls, tokenizer: TokenizationService = None, **overrides):
+        """
+        Builds a service with the CPU inference profile from Config.
+        """
+        options = {
+            "quantize": Config.ALIGNMENT_QUANTIZE,
+            "intra_op_threads": Config.ALIGNMENT_INTRA_OP_THREADS,
+            "inter_op_threads": Config.ALIGNMENT_INTER_OP_THREADS,
+            "max_tokens": Config.ALIGNMENT_MAX_TOKENS,
+        }
+        options.update(overrides)
+        return cls(tokenizer=tokenizer, **options)
+
+    def model_size_mb(self) -> float:
+        """
+        Memory held by the encoder's weights and buffers (after quantization).
+        """
+        loader = getattr(self.aligner, "embed_loader", None)
+        model = getattr(loader, "emb_model", None)
+        if model is None:
+            return 0.0
+        seen = set()
+        total = sum(_tensor_bytes(v, seen) for v in model.state_dict().values())
+        return total / (1024 * 1024)
+
+    def _apply_inference_profile(self, quantize, intra_op_threads, inter_op_threads):
+        if intra_op_threads:
+            torch.set_num_threads(intra_op_threads)
+        if inter_op_threads:
+            try:
+                torch.set_num_interop_threads(inter_op_threads)
+            except RuntimeError as e:
+                # Only allowed once, before any inter-op parallel work has started
+                print(f"Warning: Could not set inter-op threads: {str(e)}")
+
+        if quantize:
+            loader = getattr(self.aligner, "embed_loader", None)
+            if loader is None or not hasattr(loader, "emb_model"):
+                print("Warning: Aligner has no embedding model to quantize; using fp32")
+                return
+            loader.emb_model = torch.quantization.quantize_dynamic(
+                loader.emb_model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            self.quantized = True
+
+    def align(
+        self,
+        original: str,
+        translated: str,
+        source_lang: str = None,
+        target_lang: str = None,
+    ):
         """
         Returns alignment data:
         {
@@ -22,17 +122,17 @@ class AlignmentService:
         if not original or not translated:
             return {"src_tokenized": [], "trg_tokenized": [], "alignment": []}
 
-        cache_key = (original, translated)
+        cache_key = (original, translated, source_lang, target_lang)
         if cache_key in self.cache:
             return self.cache[cache_key]
 
-        # Tokenize sentences using nltk for consistency
-        src_tokens = nltk.word_tokenize(original)
-        trg_tokens = nltk.word_tokenize(translated)
+        # Tokenize with the language-specific (cached) tokenizer
+        src_tokens = self.tokenizer.word_tokenize(original, source_lang)
+        trg_tokens = self.tokenizer.word_tokenize(translated, target_lang)
 
         # Perform alignment
         try:
-            alignments = self.aligner.get_word_aligns(src_tokens, trg_tokens)
+            alignments = self._word_aligns(src_tokens, trg_tokens)
         except Exception as e:
             raise RuntimeError(f"Alignment failed: {str(e)}")
 
@@ -47,3 +147,11 @@ class AlignmentService:
         # Cache the result
         self.cache[cache_key] = alignment_data
         return alignment_data
+
+    def _word_aligns(self, src_tokens, trg_tokens):
+        if self.max_tokens:
+            # Indices are unchanged, so alignments of the prefix stay valid
+            src_tokens = src_tokens[: self.max_tokens]
+            trg_tokens = trg_tokens[: self.max_tokens]
+        with _inference_mode():
+            return self.aligner.get_word_aligns(src_tokens, trg_tokens)
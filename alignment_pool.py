@@ -0,0 +1,405 @@
+# alignment_pool.py
+"""
+Dedicated alignment worker pool shared by all web workers on a node.
+
+Run the pool once per node:
+
+    python alignment_pool.py [--socket PATH]
+
+and set ALIGNMENT_SOCKET to the socket path it prints. Web workers then use
+AlignmentClient, which never imports torch, instead of loading their own copy
+of the model.
+
+Messages are pickled, so connections must be authenticated: the socket lives
+in a directory only its owner can access (by default a per-user directory
+under $XDG_RUNTIME_DIR or the temp dir), and every connection must present
+the authkey. Without ALIGNMENT_AUTHKEY the server generates a random key and
+writes it next to the socket (<socket>.key, mode 0600), where clients of the
+same user read it.
+"""
+import argparse
+import multiprocessing
+import os
+import secrets
+import signal
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from config import Config
+
+EMPTY_ALIGNMENT = {"src_tokenized": [], "trg_tokenized": [], "alignment": []}
+
+
+def physical_cores() -> int:
+    """
+    Number of physical CPU cores (hyperthreads don't help BERT inference).
+    """
+    try:
+        import psutil
+
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return count
+    except ImportError:
+        pass
+
+    # Linux fallback: count distinct (physical id, core id) pairs
+    try:
+        cores = set()
+        physical_id = core_id = None
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("physical id"):
+                    physical_id = line.split(":")[1].strip()
+                elif line.startswith("core id"):
+                    core_id = line.split(":")[1].strip()
+                elif not line.strip():
+                    if core_id is not None:
+                        cores.add((physical_id, core_id))
+                    physical_id = core_id = None
+        if core_id is not None:
+            cores.add((physical_id, core_id))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+    return os.cpu_count() or 1
+
+
+def _authkey(key):
+    if not key:
+        return None
+    return key.encode("utf-8") if isinstance(key, str) else key
+
+
+def default_socket_path() -> str:
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"langl-{os.getuid()}", "align.sock")
+
+
+def key_path(address: str) -> str:
+    return address + ".key"
+
+
+def _private_directory(address: str):
+    """
+    Creates the socket's directory (mode 0700), or checks that an existing one
+    belongs to this user and can't be written by anyone else.
+    """
+    directory = os.path.dirname(os.path.abspath(address))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    st = os.stat(directory)
+    if st.st_uid != os.getuid() or st.st_mode & 0o022:
+        raise RuntimeError(
+            f"Socket directory {directory} must be owned by this user and not "
+            f"writable by group or others."
+        )
+
+
+def _read_key(address: str) -> bytes:
+    # OSError while the pool is not up yet; AlignmentClient retries those
+    with open(key_path(address), "rb") as f:
+        return f.read().strip()
+
+
+# --- Pool worker side -------------------------------------------------------
+
+_worker_service = None
+
+
+def _init_worker(threads: int):
+    global _worker_service
+    # torch / simalign are only ever imported inside pool workers
+    from alignment_registry import AlignmentModelRegistry
+
+    # Each worker gets its share of the cores; one inter-op thread avoids oversubscription
+    _worker_service = AlignmentModelRegistry.from_config(
+        intra_op_threads=threads, inter_op_threads=1
+    )
+
+
+def _align(original, translated, source_lang, target_lang):
+    result = _worker_service.align(
+        original, translated, source_lang=source_lang, target_lang=target_lang
+    )
+    # Model metrics ride along with every result; the server keeps the latest per worker
+    return result, os.getpid(), _worker_service.stats()
+
+
+def merge_worker_stats(worker_stats: dict) -> dict:
+    """
+    Combines the AlignmentModelRegistry.stats() of every pool worker into one
+    report in the same format, plus the per-worker reports.
+    """
+    models = {}
+    pairs = {}
+    memory_budget_mb = 0
+    loaded_mb = 0.0
+    process_rss_mb = 0.0
+    for stats in worker_stats.values():
+        pairs.update(stats["pairs"])
+        memory_budget_mb = stats["memory_budget_mb"]
+        loaded_mb += stats["loaded_mb"]
+        process_rss_mb += stats["process_rss_mb"]
+        for key, m in stats["models"].items():
+            merged = models.setdefault(
+                key,
+                {
+                    "model": m["model"],
+                    "loads": 0,
+                    "evictions": 0,
+                    "requests": 0,
+                    "total_latency_ms": 0.0,
+                    "load_seconds": 0.0,
+                    "size_mb": 0.0,
+                    "loaded_workers": 0,
+                },
+            )
+            for field in ("loads", "evictions", "requests", "total_latency_ms"):
+                merged[field] += m[field]
+            merged["load_seconds"] = max(merged["load_seconds"], m.get("load_seconds", 0.0))
+            merged["size_mb"] = max(merged["size_mb"], m.get("size_mb", 0.0))
+            merged["loaded_workers"] += 1 if m.get("loaded") else 0
+
+    for m in models.values():
+        m["total_latency_ms"] = round(m["total_latency_ms"], 1)
+        m["mean_latency_ms"] = (
+            round(m["total_latency_ms"] / m["requests"], 2) if m["requests"] else None
+        )
+    return {
+        "memory_budget_mb": memory_budget_mb,
+        "loaded_mb": round(loaded_mb, 1),
+        "process_rss_mb": round(process_rss_mb, 1),
+        "pairs": pairs,
+        "models": models,
+        "workers": {str(pid): stats for pid, stats in worker_stats.items()},
+    }
+
+
+class AlignmentPoolServer:
+    """
+    Accepts alignment requests over a Unix socket and runs them on a
+    multiprocessing pool. Workers that die are replaced by the pool; a request
+    that doesn't finish within `task_timeout` is reported back as an error.
+
+    Messages are (kind, payload) tuples: ("align", (original, translated,
+    source_lang, target_lang)) or ("stats", None), which returns the merged
+    model metrics of the live workers.
+    """
+
+    def __init__(self, address: str, workers: int = None, authkey=None, task_timeout: float = 60.0):
+        self.address = address
+        self.workers = workers or physical_cores()
+        self.authkey = _authkey(authkey)
+        self._generated_key = self.authkey is None
+        self.task_timeout = task_timeout
+        # Split cores between workers so they don't oversubscribe each other
+        self.threads_per_worker = max(1, physical_cores() // self.workers)
+        self.pool = None
+        self.listener = None
+        self._worker_stats = {}  # worker pid -> latest registry stats
+        self._stats_lock = threading.Lock()
+
+    def serve_forever(self):
+        _private_directory(self.address)
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        if self._generated_key:
+            self.authkey = secrets.token_hex(32).encode("ascii")
+            fd = os.open(key_path(self.address), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                os.fchmod(f.fileno(), 0o600)
+                f.write(self.authkey)
+
+        ctx = multiprocessing.get_context("spawn")
+        self.pool = ctx.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker,),
+        )
+        self.listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        print(
+            f"Alignment pool listening on {self.address} "
+            f"({self.workers} workers x {self.threads_per_worker} threads)"
+        )
+        try:
+            while True:
+                try:
+                    conn = self.listener.accept()
+                except (multiprocessing.AuthenticationError, EOFError):
+                    # Wrong or missing authkey; the connection was dropped unread
+                    continue
+                except OSError:
+                    if self.listener is None:
+                        break  # closed by shutdown()
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.shutdown()
+
+    def shutdown(self, *_):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        if self._generated_key and os.path.exists(key_path(self.address)):
+            os.unlink(key_path(self.address))
+
+    def _handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    kind, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                except (TypeError, ValueError):
+                    kind, payload = None, None
+                try:
+                    if kind == "align":
+                        reply = ("ok", self._align(payload))
+                    elif kind == "stats":
+                        reply = ("ok", self.stats())
+                    else:
+                        reply = ("error", f"unknown request {kind!r}")
+                except multiprocessing.TimeoutError:
+                    reply = ("error", f"timed out after {self.task_timeout}s")
+                except Exception as e:
+                    reply = ("error", str(e))
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def _align(self, args):
+        result, pid, stats = self.pool.apply_async(_align, args).get(self.task_timeout)
+        with self._stats_lock:
+            self._worker_stats[pid] = stats
+        return result
+
+    def stats(self) -> dict:
+        """
+        Model metrics of the live workers, as last reported with their results.
+        Workers that have not served a request yet are not included.
+        """
+        live = {p.pid for p in multiprocessing.active_children()}
+        with self._stats_lock:
+            # Drop workers the pool has replaced
+            for pid in [pid for pid in self._worker_stats if pid not in live]:
+                del self._worker_stats[pid]
+            worker_stats = dict(self._worker_stats)
+        return merge_worker_stats(worker_stats)
+
+
+# --- Web worker side --------------------------------------------------------
+
+
+class AlignmentClient:
+    """
+    Drop-in replacement for AlignmentService.align that forwards requests to
+    an AlignmentPoolServer. Keeps one connection per thread, retries when the
+    pool is restarting and raises RuntimeError on timeout, like AlignmentService.
+    """
+
+    def __init__(self, address: str, authkey=None, timeout: float = 30.0, retries: int = 3):
+        self.address = address
+        self.authkey = _authkey(authkey)
+        self.timeout = timeout
+        self.retries = retries
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Without a configured key, use the one the pool generated (re-read
+            # on every new connection, as a restarted pool has a new key)
+            authkey = self.authkey or _read_key(self.address)
+            conn = Client(self.address, family="AF_UNIX", authkey=authkey)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, kind: str, payload):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                conn = self._connection()
+                conn.send((kind, payload))
+                if not conn.poll(self.timeout):
+                    # Drop the connection so a late reply can't be read by the next call
+                    self._reset()
+                    raise RuntimeError(
+                        f"Alignment failed: worker pool timed out after {self.timeout}s"
+                    )
+                status, result = conn.recv()
+            except multiprocessing.AuthenticationError:
+                self._reset()
+                raise RuntimeError(
+                    "Alignment failed: the worker pool rejected the authkey"
+                )
+            except (OSError, EOFError) as e:
+                # Pool not up yet or restarting; reconnect with a short backoff
+                self._reset()
+                last_error = e
+                time.sleep(min(0.1 * 2**attempt, 2.0))
+                continue
+
+            if status == "ok":
+                return result
+            raise RuntimeError(f"Alignment failed: {result}")
+
+        raise RuntimeError(f"Alignment failed: worker pool unavailable ({last_error})")
+
+    def align(
+        self,
+        original: str,
+        translated: str,
+        source_lang: str = None,
+        target_lang: str = None,
+    ):
+        if not original or not translated:
+            return dict(EMPTY_ALIGNMENT)
+        return self._call("align", (original, translated, source_lang, target_lang))
+
+    def stats(self) -> dict:
+        """
+        Per-model metrics merged across the pool's workers
+        (same format as AlignmentModelRegistry.stats, plus "workers").
+        """
+        return self._call("stats", None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the shared alignment worker pool.")
+    parser.add_argument("--socket", default=Config.ALIGNMENT_SOCKET or default_socket_path())
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=Config.ALIGNMENT_POOL_WORKERS or None,
+        help="Worker processes (default: number of physical cores)",
+    )
+    parser.add_argument("--task-timeout", type=float, default=Config.ALIGNMENT_TIMEOUT * 2)
+    args = parser.parse_args()
+
+    server = AlignmentPoolServer(
+        args.socket,
+        workers=args.workers,
+        authkey=Config.ALIGNMENT_AUTHKEY,
+        task_timeout=args.task_timeout,
+    )
+    signal.signal(signal.SIGTERM, server.shutdown)
+    server.serve_forever()
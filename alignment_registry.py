@@ -0,0 +1,255 @@
+# alignment_registry.py
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from tokenization import TokenizationService
+
+# Inference options a model's config may override; threads are process-wide
+PER_MODEL_OPTIONS = ("quantize", "max_tokens")
+
+# Used when ALIGNMENT_MODELS is not configured: mBERT for every pair, as before
+DEFAULT_MODELS = {
+    "*": {"model": "bert", "token_type": "bpe", "matching_methods": "mai"},
+}
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of this process in MB.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # Peak RSS (KB on Linux, bytes on macOS); good enough as a fallback
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if peak > 1 << 30 else peak / 1024
+
+
+class AlignmentModelRegistry:
+    """
+    Maps language pairs to aligner configurations and loads each model lazily
+    on first use. Loaded models are evicted least-recently-used once their
+    combined size (weights and buffers, see AlignmentService.model_size_mb)
+    exceeds the memory budget. Exposes the same align() as AlignmentService,
+    routing on source_lang/target_lang.
+
+    `models` maps "SRC-TRG" (or "SRC-*", "*-TRG", "*") to a config such as
+      {"model": "distilbert-base-multilingual-cased", "token_type": "bpe",
+       "matching_methods": "mai", "quantize": true}
+    Pairs match in either direction; "*" is the fallback. Thread counts are
+    process-wide in torch, so they are registry settings (profile), not
+    per-model ones.
+    """
+
+    def __init__(
+        self,
+        models: dict = None,
+        memory_budget_mb: float = 0,
+        tokenizer: TokenizationService = None,
+        **profile,
+    ):
+        self.models = {
+            self._normalize_pair(pair): dict(cfg)
+            for pair, cfg in (models or DEFAULT_MODELS).items()
+        }
+        if "*" not in self.models:
+            self.models["*"] = dict(DEFAULT_MODELS["*"])
+        for pair, cfg in self.models.items():
+            for option in ("intra_op_threads", "inter_op_threads"):
+                if option in cfg:
+                    print(
+                        f"Warning: Ignoring '{option}' of alignment model for {pair}; "
+                        f"thread counts are process-wide"
+                    )
+        self.memory_budget_mb = memory_budget_mb or 0
+        self.tokenizer = tokenizer or TokenizationService()
+        self.profile = profile  # default inference profile overrides for every model
+
+        self._loaded = OrderedDict()  # model key -> AlignmentService, LRU order
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.metrics = {}
+
+    @classmethod
+    def from_config(cls, tokenizer: TokenizationService = None, **profile):
+        return cls(
+            models=Config.ALIGNMENT_MODELS or None,
+            memory_budget_mb=Config.ALIGNMENT_MEMORY_BUDGET_MB,
+            tokenizer=tokenizer,
+            **profile,
+        )
+
+    @staticmethod
+    def _normalize_pair(pair: str) -> str:
+        return pair.strip().upper() if pair.strip() != "*" else "*"
+
+    def _options(self, cfg: dict) -> dict:
+        """
+        Effective inference profile of a model: Config defaults, overridden by
+        the registry-wide profile, overridden by the model's own config.
+        """
+        options = {
+            "quantize": Config.ALIGNMENT_QUANTIZE,
+            "intra_op_threads": Config.ALIGNMENT_INTRA_OP_THREADS,
+            "inter_op_threads": Config.ALIGNMENT_INTER_OP_THREADS,
+            "max_tokens": Config.ALIGNMENT_MAX_TOKENS,
+        }
+        options.update((k, v) for k, v in self.profile.items() if k in options)
+        options.update((k, v) for k, v in cfg.items() if k in PER_MODEL_OPTIONS)
+        return options
+
+    def _model_key(self, cfg: dict) -> str:
+        # Pairs sharing the same configuration share one loaded model
+        options = self._options(cfg)
+        return "|".join(
+            [
+                cfg.get("model", "bert"),
+                cfg.get("token_type", "bpe"),
+                cfg.get("matching_methods", "mai"),
+                "int8" if options["quantize"] else "fp32",
+                f"max_tokens={options['max_tokens']}",
+            ]
+        )
+
+    def resolve(self, source_lang: str = None, target_lang: str = None) -> dict:
+        """
+        Returns the aligner configuration for a language pair.
+        """
+        src = (source_lang or "*").upper().split("-")[0]
+        trg = (target_lang or "*").upper().split("-")[0]
+        for candidate in (
+            f"{src}-{trg}",
+            f"{trg}-{src}",
+            f"{src}-*",
+            f"*-{trg}",
+            f"{trg}-*",
+            f"*-{src}",
+        ):
+            if candidate in self.models:
+                return self.models[candidate]
+        return self.models["*"]
+
+    def get(self, source_lang: str = None, target_lang: str = None):
+        """
+        Returns the (possibly freshly loaded) AlignmentService for a language pair.
+        """
+        cfg = self.resolve(source_lang, target_lang)
+        key = self._model_key(cfg)
+
+        with self._lock:
+            service = self._loaded.get(key)
+            if service is not None:
+                self._loaded.move_to_end(key)
+                return service
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given model; others wait for it
+        with load_lock:
+            with self._lock:
+                service = self._loaded.get(key)
+                if service is not None:
+                    self._loaded.move_to_end(key)
+                    return service
+            service = self._load(key, cfg)
+            with self._lock:
+                self._loaded[key] = service
+                self._evict(keep=key)
+        return service
+
+    def _load(self, key: str, cfg: dict):
+        from alignment import AlignmentService
+
+        options = self._options(cfg)
+        started = time.perf_counter()
+        service = AlignmentService.from_config(
+            tokenizer=self.tokenizer,
+            model_name=cfg.get("model", "bert"),
+            token_type=cfg.get("token_type", "bpe"),
+            matching_methods=cfg.get("matching_methods", "mai"),
+            **options,
+        )
+        load_seconds = time.perf_counter() - started
+
+        metrics = self.metrics.setdefault(
+            key,
+            {
+                "model": cfg.get("model", "bert"),
+                "loads": 0,
+                "evictions": 0,
+                "requests": 0,
+                "total_latency_ms": 0.0,
+            },
+        )
+        metrics["loads"] += 1
+        metrics["load_seconds"] = round(load_seconds, 3)
+        # Measured on the model itself: a process RSS delta is skewed by
+        # concurrent loads and by pages reused after an eviction
+        metrics["size_mb"] = round(service.model_size_mb(), 1)
+        metrics["loaded"] = True
+        return service
+
+    def _evict(self, keep: str):
+        # Caller holds self._lock
+        if not self.memory_budget_mb:
+            return
+        while len(self._loaded) > 1:
+            used = sum(self.metrics[k]["size_mb"] for k in self._loaded)
+            if used <= self.memory_budget_mb:
+                break
+            victim = next(k for k in self._loaded if k != keep)
+            del self._loaded[victim]
+            self.metrics[victim]["loaded"] = False
+            self.metrics[victim]["evictions"] += 1
+            gc.collect()
+
+    def align(
+        self,
+        original: str,
+        translated: str,
+        source_lang: str = None,
+        target_lang: str = None,
+    ):
+        service = self.get(source_lang, target_lang)
+        started = time.perf_counter()
+        result = service.align(
+            original, translated, source_lang=source_lang, target_lang=target_lang
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        metrics = self.metrics[self._model_key(self.resolve(source_lang, target_lang))]
+        with self._lock:
+            metrics["requests"] += 1
+            metrics["total_latency_ms"] += elapsed_ms
+        return result
+
+    def stats(self) -> dict:
+        """
+        Per-model metrics: load time, size, request count and mean latency,
+        plus the process RSS.
+        """
+        with self._lock:
+            models = {}
+            for key, m in self.metrics.items():
+                entry = dict(m)
+                entry["total_latency_ms"] = round(m["total_latency_ms"], 1)
+                entry["mean_latency_ms"] = (
+                    round(m["total_latency_ms"] / m["requests"], 2) if m["requests"] else None
+                )
+                models[key] = entry
+            return {
+                "memory_budget_mb": self.memory_budget_mb,
+                "loaded_mb": round(
+                    sum(self.metrics[k]["size_mb"] for k in self._loaded), 1
+                ),
+                "process_rss_mb": round(current_rss_mb(), 1),
+                "pairs": {pair: self._model_key(cfg) for pair, cfg in self.models.items()},
+                "models": models,
+            }
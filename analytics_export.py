@@ -0,0 +1,336 @@
+# analytics_export.py
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from db import DBService
+from models import ReviewHistory, Vocabulary
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; exports fall back to .npz
+    pa = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORMATS = ("parquet", "arrow", "npz")
+WATERMARK_FILE = "watermark.json"
+
+# (column, type, nullable); "time" columns are exported as UTC epoch milliseconds
+REVIEW_COLUMNS = [
+    ("id", "int", False),
+    ("user_id", "str", False),
+    ("word", "str", False),
+    ("language", "str", False),
+    ("review_time", "time", False),
+    ("rating", "int", False),
+    ("state", "int", True),
+]
+VOCABULARY_COLUMNS = [
+    ("user_id", "str", False),
+    ("word", "str", False),
+    ("language", "str", False),
+    ("translation", "str", True),
+    ("state", "int", False),
+    ("due", "time", True),
+    ("stability", "float", True),
+    ("difficulty", "float", True),
+    ("last_review", "time", True),
+    ("step", "int", True),
+    ("updated_at", "time", True),
+]
+
+
+def epoch_ms(dt):
+    """
+    Milliseconds since the epoch; naive datetimes are taken as UTC.
+    """
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _to_columns(rows, spec):
+    columns = {name: [] for name, _, _ in spec}
+    for row in rows:
+        for (name, kind, _), value in zip(spec, row):
+            columns[name].append(epoch_ms(value) if kind == "time" else value)
+    return columns
+
+
+class _ArrowWriter:
+    """
+    One Parquet file (a row group per chunk) or Arrow IPC file (a record
+    batch per chunk) per table. Opened on the first chunk so that incremental
+    runs without new rows write nothing.
+    """
+
+    TYPES = {"int": "int64", "float": "float64", "str": "string"}
+
+    def __init__(self, path: str, spec, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self.schema = pa.schema(
+            [
+                pa.field(
+                    name,
+                    pa.timestamp("ms", tz="UTC") if kind == "time" else self.TYPES[kind],
+                    nullable=nullable,
+                )
+                for name, kind, nullable in spec
+            ]
+        )
+        self._writer = None
+        self.paths = []
+
+    def write(self, columns: dict):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(columns[f.name], type=f.type) for f in self.schema],
+            schema=self.schema,
+        )
+        if self._writer is None:
+            if self.fmt == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self.schema)
+            self.paths.append(self.path)
+        self._writer.write_batch(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _NpzWriter:
+    """
+    Fallback without pyarrow: one .npz file per chunk with one typed array per
+    column. Nullable columns get a boolean "<column>_null" mask; their null
+    slots hold 0, NaN or "".
+    """
+
+    TYPES = {"int": "int64", "time": "int64", "float": "float64"}
+
+    def __init__(self, directory: str, spec):
+        self.directory = directory
+        self.spec = spec
+        self.paths = []
+
+    def write(self, columns: dict):
+        arrays = {}
+        for name, kind, nullable in self.spec:
+            values = columns[name]
+            if nullable:
+                arrays[f"{name}_null"] = np.array([v is None for v in values], dtype=bool)
+                fill = "" if kind == "str" else float("nan") if kind == "float" else 0
+                values = [fill if v is None else v for v in values]
+            if kind == "str":
+                arrays[name] = np.array(values, dtype=str)
+            else:
+                arrays[name] = np.array(values, dtype=self.TYPES[kind])
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"part-{len(self.paths):05d}.npz")
+        np.savez(path, **arrays)
+        self.paths.append(path)
+
+    def close(self):
+        pass
+
+
+class AnalyticsExportService:
+    """
+    Streams review_history and user_vocabulary into columnar files for
+    analytics. Rows are read with keyset pagination in chunks of chunk_size
+    and written out chunk by chunk, so memory use doesn't depend on the table
+    size.
+
+    A watermark file in output_dir records how far the last export got, per
+    database: the highest review id and the highest updated_at among exported
+    cards. Incremental runs only export reviews added since then, and cards
+    changed since overlap_seconds before the card watermark. The overlap
+    catches writes that committed after the previous export read them, so a
+    card can appear in two consecutive exports; the copy with the latest
+    updated_at is current.
+    """
+
+    def __init__(
+        self,
+        db_service: DBService,
+        output_dir: str = "exports",
+        fmt: str = "parquet",
+        chunk_size: int = 50000,
+        overlap_seconds: float = 300,
+    ):
+        if fmt not in FORMATS:
+            raise ValueError(
+                f"Unknown export format '{fmt}'. Must be one of: {', '.join(FORMATS)}"
+            )
+        if fmt != "npz" and pa is None:
+            print(f"Warning: pyarrow is not installed; exporting .npz instead of {fmt}")
+            fmt = "npz"
+        if fmt == "npz" and np is None:
+            raise RuntimeError("Exporting requires pyarrow or numpy.")
+        self.db_service = db_service
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.overlap = timedelta(seconds=overlap_seconds)
+
+    # --- Watermark ------------------------------------------------------------
+
+    def _watermark_path(self) -> str:
+        return os.path.join(self.output_dir, WATERMARK_FILE)
+
+    def load_watermark(self) -> dict:
+        try:
+            with open(self._watermark_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_watermark(self, watermark: dict):
+        # Write-then-rename, so a crash never leaves a half-written watermark
+        tmp = self._watermark_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(watermark, f, indent=2)
+        os.replace(tmp, self._watermark_path())
+
+    # --- Export ---------------------------------------------------------------
+
+    def _writer(self, run_dir: str, table: str, spec):
+        if self.fmt == "npz":
+            return _NpzWriter(os.path.join(run_dir, table), spec)
+        extension = "parquet" if self.fmt == "parquet" else "arrow"
+        return _ArrowWriter(os.path.join(run_dir, f"{table}.{extension}"), spec, self.fmt)
+
+    def export(self, incremental: bool = True) -> dict:
+        """
+        Exports both tables into a new timestamped directory under output_dir
+        and advances the watermark. With incremental=False everything is
+        exported regardless of the previous watermark.
+        Returns {"run_dir": ..., "review_history": {"rows": n, "files": [...]},
+                 "user_vocabulary": {...}}.
+        """
+        previous = self.load_watermark() if incremental else {}
+        started = datetime.now(timezone.utc)
+        run_dir = os.path.join(self.output_dir, started.strftime("%Y%m%dT%H%M%SZ"))
+        os.makedirs(run_dir, exist_ok=True)
+
+        watermark = {"review_history": {}, "user_vocabulary": {}}
+        report = {"run_dir": run_dir}
+
+        writer = self._writer(run_dir, "review_history", REVIEW_COLUMNS)
+        rows = 0
+        try:
+            last_ids = previous.get("review_history") or {}
+            for i, session_factory in enumerate(self.db_service.user_session_factories()):
+                after = last_ids.get(str(i), 0)
+                n, last_id = self._export_reviews(session_factory, writer, after)
+                rows += n
+                watermark["review_history"][str(i)] = last_id
+        finally:
+            writer.close()
+        report["review_history"] = {"rows": rows, "files": writer.paths}
+
+        # Naive UTC, as stored in the DateTime columns
+        last_updated = previous.get("user_vocabulary") or {}
+        writer = self._writer(run_dir, "user_vocabulary", VOCABULARY_COLUMNS)
+        rows = 0
+        try:
+            for i, session_factory in enumerate(self.db_service.user_session_factories()):
+                # Older watermarks hold one timestamp for every database
+                mark = last_updated if isinstance(last_updated, str) else last_updated.get(str(i))
+                mark = datetime.fromisoformat(mark) if mark else None
+                n, max_updated = self._export_vocabulary(
+                    session_factory, writer, mark - self.overlap if mark else None
+                )
+                rows += n
+                if max_updated is not None:
+                    max_updated = max_updated.replace(tzinfo=None)
+                    mark = max(mark, max_updated) if mark else max_updated
+                watermark["user_vocabulary"][str(i)] = mark.isoformat() if mark else None
+        finally:
+            writer.close()
+        report["user_vocabulary"] = {"rows": rows, "files": writer.paths}
+
+        self._save_watermark(watermark)
+        if not os.listdir(run_dir):
+            os.rmdir(run_dir)
+        return report
+
+    def _export_reviews(self, session_factory, writer, after_id: int):
+        """
+        Streams reviews with after_id < id <= max id at start. Returns
+        (rows written, new watermark id).
+        """
+        session: Session = session_factory()
+        try:
+            upper = session.query(func.max(ReviewHistory.id)).scalar() or after_id
+        finally:
+            session.close()
+
+        columns = [getattr(ReviewHistory, name) for name, _, _ in REVIEW_COLUMNS]
+        written = 0
+        last_id = after_id
+        while last_id < upper:
+            session = session_factory()
+            try:
+                rows = (
+                    session.query(*columns)
+                    .filter(ReviewHistory.id > last_id, ReviewHistory.id <= upper)
+                    .order_by(ReviewHistory.id)
+                    .limit(self.chunk_size)
+                    .all()
+                )
+            finally:
+                session.close()
+            if not rows:
+                break
+            writer.write(_to_columns(rows, REVIEW_COLUMNS))
+            written += len(rows)
+            last_id = rows[-1][0]
+        return written, max(last_id, upper)
+
+    def _export_vocabulary(self, session_factory, writer, changed_after):
+        """
+        Streams cards changed after changed_after (all cards if None) in
+        primary-key order. Returns (rows written, highest updated_at written).
+        """
+        columns = [getattr(Vocabulary, name) for name, _, _ in VOCABULARY_COLUMNS]
+        key = tuple_(Vocabulary.user_id, Vocabulary.word, Vocabulary.language)
+        written = 0
+        max_updated = None
+        last_key = None
+        while True:
+            session: Session = session_factory()
+            try:
+                query = session.query(*columns)
+                if changed_after is not None:
+                    query = query.filter(Vocabulary.updated_at > changed_after)
+                if last_key is not None:
+                    query = query.filter(key > tuple_(*last_key))
+                rows = (
+                    query.order_by(Vocabulary.user_id, Vocabulary.word, Vocabulary.language)
+                    .limit(self.chunk_size)
+                    .all()
+                )
+            finally:
+                session.close()
+            if not rows:
+                break
+            writer.write(_to_columns(rows, VOCABULARY_COLUMNS))
+            written += len(rows)
+            last_key = tuple(rows[-1][:3])
+            updated = [r.updated_at for r in rows if r.updated_at is not None]
+            if updated:
+                max_updated = max([max_updated, *updated] if max_updated else updated)
+        return written, max_updated
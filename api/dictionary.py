@@ -2,6 +2,8 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from http import HTTPStatus
+from config import Config
+from api.user import current_user_id
 
 dictionary_bp = Blueprint("dictionary_bp", __name__)
 
@@ -14,14 +16,16 @@ def lookup_word():
       {
         "word": "...",
         "language": "...",
-        "translation": "..."
+        "translation": "...",
+        "source": "cache" | "vocabulary" | "dictionary" | "deepl"
       }
 
-    We can rely on current_app.translation_service.translate(...)
-    or a specialized dictionary API call if you prefer.
+    Resolved cache-first through current_app.dictionary_service; DeepL is only
+    called when neither the in-process cache nor the local tables know the word.
     """
     word = request.args.get("word", "").strip()
     language = request.args.get("language", "").strip()  # e.g., "sv"
+    user_id = current_user_id()
 
     if not word or not language:
         return (
@@ -29,16 +33,72 @@ def lookup_word():
             HTTPStatus.BAD_REQUEST,
         )
 
-    # Let's call the existing translationService with target_lang=EN for simplicity,
-    # or you can do a specialized dictionary approach.
     try:
-        # We'll do a minimal 1-word translation, sourceLang= e.g. 'SV', targetLang='EN'
-        translated = current_app.translation_service.translate(
-            word, source_lang=language.upper(), target_lang="EN"
+        # Translate sourceLang= e.g. 'SV' to targetLang='EN'
+        result = current_app.dictionary_service.lookup_many(
+            [word], language, target_lang="EN", user_id=user_id
+        )[0]
+        return jsonify(result), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@dictionary_bp.route("/lookup/batch", methods=["POST"])
+def lookup_words():
+    """
+    POST /api/dictionary/lookup/batch
+    Expects JSON:
+    {
+      "words": ["hej", "tack", "snälla"],
+      "language": "sv",
+      "targetLanguage": "EN"   // optional, defaults to EN
+    }
+    Returns JSON:
+    {
+      "results": [
+        {"word": "hej", "language": "sv", "translation": "hi", "source": "cache"},
+        ...
+      ],
+      "tiers": {"cache": 1, "vocabulary": 0, "dictionary": 1, "deepl": 1}
+    }
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return jsonify({"error": "Missing JSON body"}), HTTPStatus.BAD_REQUEST
+
+    words = data.get("words")
+    language = data.get("language") or ""
+    target_lang = data.get("targetLanguage") or "EN"
+    user_id = current_user_id()
+
+    if not isinstance(language, str) or not isinstance(target_lang, str):
+        return (
+            jsonify({"error": "Fields 'language' and 'targetLanguage' must be strings."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+    language = language.strip()
+    target_lang = target_lang.strip()
+    if not language or not isinstance(words, list):
+        return (
+            jsonify({"error": "Fields 'language' and 'words' (as list) are required."}),
+            HTTPStatus.BAD_REQUEST,
         )
+    words = [str(w).strip() for w in words if str(w).strip()]
+    if len(words) > Config.DICTIONARY_BATCH_LIMIT:
         return (
-            jsonify({"word": word, "language": language, "translation": translated}),
-            HTTPStatus.OK,
+            jsonify(
+                {"error": f"At most {Config.DICTIONARY_BATCH_LIMIT} words per request."}
+            ),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    try:
+        results = current_app.dictionary_service.lookup_many(
+            words, language, target_lang=target_lang, user_id=user_id
         )
+        tiers = {"cache": 0, "vocabulary": 0, "dictionary": 0, "deepl": 0}
+        for r in results:
+            tiers[r["source"]] = tiers.get(r["source"], 0) + 1
+        return jsonify({"results": results, "tiers": tiers}), HTTPStatus.OK
     except Exception as e:
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
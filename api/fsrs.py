@@ -1,7 +1,11 @@
 # api/fsrs.py
 from flask import Blueprint, request, jsonify, current_app
 from http import HTTPStatus
+from config import Config
+from api.user import current_user_id
 
+# Every deck route acts on the requesting user's cards (see api.user.current_user_id);
+# word lists are shared by all users.
 fsrs_bp = Blueprint("fsrs_bp", __name__)
 
 
@@ -23,6 +27,7 @@ def update_fsrs_data():
     word = data.get("word")
     language = data.get("language")
     response = data.get("response")
+    user_id = current_user_id()
 
     # Validate input
     if not word or not language or not response:
@@ -32,7 +37,9 @@ def update_fsrs_data():
         )
 
     try:
-        updated_vocab = current_app.fsrs_service.review_word(word, language, response)
+        updated_vocab = current_app.fsrs_service.review_word(
+            word, language, response, user_id=user_id
+        )
         if not updated_vocab:
             return (
                 jsonify({"error": "Word not found in vocabulary"}),
@@ -61,13 +68,126 @@ def get_review_words():
     GET /api/fsrs/review
     Returns JSON of words that are due for review
     """
+    user_id = current_user_id()
     try:
-        words = current_app.fsrs_service.get_words_due_for_review()
+        words = current_app.fsrs_service.get_words_due_for_review(user_id)
         return jsonify({"words": words}), HTTPStatus.OK
     except Exception as e:
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@fsrs_bp.route("/session", methods=["GET"])
+def get_review_session():
+    """
+    GET /api/fsrs/session?limit=20[&language=sv]
+    Returns the next due cards with the outcome of every possible rating
+    precomputed, so the client can advance without waiting for the server:
+    {
+      "generatedAt": "...",
+      "cards": [
+        {
+          "word": "hej", "language": "sv", "translation": "hi",
+          "state": 2, "due": "...", ..., "version": 3,
+          "outcomes": {
+            "again": {"state": 3, "due": "...", "stability": ..., "difficulty": ..., "step": 0},
+            "hard": {...}, "good": {...}, "easy": {...}
+          }
+        }
+      ]
+    }
+    Ratings are sent back with POST /api/fsrs/session/reviews.
+    """
+    limit = request.args.get("limit", 20, type=int)
+    language = request.args.get("language", "").strip() or None
+    user_id = current_user_id()
+    if not 1 <= limit <= Config.REVIEW_SESSION_MAX_CARDS:
+        return (
+            jsonify(
+                {"error": f"'limit' must be between 1 and {Config.REVIEW_SESSION_MAX_CARDS}."}
+            ),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    try:
+        session = current_app.fsrs_service.get_review_session(
+            limit=limit, language=language, user_id=user_id
+        )
+        return jsonify(session), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@fsrs_bp.route("/session/reviews", methods=["POST"])
+def submit_session_reviews():
+    """
+    POST /api/fsrs/session/reviews
+    Expects JSON:
+    {
+      "reviews": [
+        {"word": "hej", "language": "sv", "rating": "good", "version": 3,
+         "reviewedAt": "2026-01-01T12:00:00+00:00"},   // reviewedAt optional
+        ...
+      ]
+    }
+    Reviews are applied in order, each only if the card is still at the given
+    version. Returns JSON:
+    {
+      "applied": [{"word": "hej", "language": "sv", "version": 4}],
+      "conflicts": [{"word": ..., "language": ..., "expectedVersion": 3,
+                     "currentVersion": 4, "card": {...}}],
+      "notFound": [{"word": ..., "language": ...}]
+    }
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return jsonify({"error": "Missing JSON body"}), HTTPStatus.BAD_REQUEST
+
+    reviews = data.get("reviews")
+    user_id = current_user_id()
+    if not isinstance(reviews, list):
+        return (
+            jsonify({"error": "Field 'reviews' (as list) is required."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+    if len(reviews) > Config.REVIEW_BATCH_LIMIT:
+        return (
+            jsonify({"error": f"At most {Config.REVIEW_BATCH_LIMIT} reviews per request."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    try:
+        result = current_app.fsrs_service.apply_review_batch(reviews, user_id=user_id)
+        return jsonify(result), HTTPStatus.OK
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@fsrs_bp.route("/stats", methods=["GET"])
+def get_deck_stats():
+    """
+    GET /api/fsrs/stats[?language=sv]
+    Returns card counts per language from the materialized deck summary:
+    {
+      "languages": {
+        "sv": {
+          "total": 120,
+          "states": {"learning": 20, "review": 95, "relearning": 5},
+          "due": {"overdue": 3, "today": 12, "next_7_days": 40}
+        }
+      }
+    }
+    """
+    language = request.args.get("language", "").strip() or None
+    user_id = current_user_id()
+    try:
+        stats = current_app.deck_stats_service.get_stats(language, user_id=user_id)
+        return jsonify({"languages": stats}), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
 @fsrs_bp.route("/vocabulary/import", methods=["POST"])
 def import_wordlist():
     """
@@ -141,8 +261,9 @@ def get_vocabulary():
     GET /api/fsrs/vocabulary
     Returns the full user vocabulary with FSRS fields.
     """
+    user_id = current_user_id()
     try:
-        vocab = current_app.fsrs_service.get_all_vocabulary()
+        vocab = current_app.fsrs_service.get_all_vocabulary(user_id)
         return jsonify({"words": vocab}), HTTPStatus.OK
     except Exception as e:
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
@@ -166,6 +287,7 @@ def add_word():
     word = data.get("word")
     language = data.get("language")
     translation = data.get("translation") or ""
+    user_id = current_user_id()
 
     # Validate input
     if not word or not language:
@@ -175,7 +297,7 @@ def add_word():
         )
 
     try:
-        current_app.fsrs_service.add_word(word, language, translation)
+        current_app.fsrs_service.add_word(word, language, translation, user_id=user_id)
         return (
             jsonify(
                 {"status": "success", "message": f"Word '{word}' added to vocabulary."}
@@ -186,6 +308,65 @@ def add_word():
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@fsrs_bp.route("/vocabulary/add_level", methods=["POST"])
+def add_level():
+    """
+    POST /api/fsrs/vocabulary/add_level
+    Expects JSON:
+    {
+      "language": "sv",
+      "level": "A1",
+      "newPerDay": 20,     // optional: stagger initial due dates
+      "translate": true    // optional: fetch missing translations (default true)
+    }
+    Returns JSON:
+    {"status": "success", "levelSize": 500, "added": 480, "translated": 480}
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), HTTPStatus.BAD_REQUEST
+
+    language = data.get("language")
+    level = data.get("level")
+    new_per_day = data.get("newPerDay")
+    translate = data.get("translate", True)
+    user_id = current_user_id()
+
+    # Validate input
+    if not language or not level:
+        return (
+            jsonify({"error": "Fields 'language' and 'level' are required."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+    if new_per_day is not None and (not isinstance(new_per_day, int) or new_per_day < 1):
+        return (
+            jsonify({"error": "'newPerDay' must be a positive integer."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    try:
+        result = current_app.fsrs_service.add_level_to_deck(
+            language,
+            level,
+            new_per_day=new_per_day,
+            translate=bool(translate),
+            user_id=user_id,
+        )
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "levelSize": result["level_size"],
+                    "added": result["added"],
+                    "translated": result["translated"],
+                }
+            ),
+            HTTPStatus.OK,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
 @fsrs_bp.route("/vocabulary/lookup", methods=["GET"])
 def lookup_fsrs_word():
     """
@@ -208,6 +389,7 @@ def lookup_fsrs_word():
 
     word = request.args.get("word", "").strip().lower()
     language = request.args.get("language", "").strip().lower()
+    user_id = current_user_id()
 
     if not word or not language:
         return (
@@ -215,9 +397,9 @@ def lookup_fsrs_word():
             HTTPStatus.BAD_REQUEST,
         )
 
-    session = current_app.db_service.get_session()
+    session = current_app.db_service.get_session(user_id)
     try:
-        vocab = session.get(Vocabulary, (word, language))
+        vocab = session.get(Vocabulary, (user_id, word, language))
         if not vocab:
             return jsonify({"error": "Not found"}), HTTPStatus.NOT_FOUND
 
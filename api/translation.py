@@ -2,27 +2,31 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from http import HTTPStatus
-import nltk
-from nltk.stem import WordNetLemmatizer
+from response_format import to_compact, negotiated_json_response
+from translation_pipeline import build_sentence_results, translation_payload
+from api.user import current_user_id
 
 translation_bp = Blueprint("translation_bp", __name__)
 
-lemmatizer = WordNetLemmatizer()
-
 
 @translation_bp.route("", methods=["POST"])
 def translate_text():
     """
     POST /api/translation
+    Words are marked against the vocabulary of the requesting user
+    (see api.user.current_user_id).
     Expects JSON:
     {
       "text": "Jag älskar dig",
       "sourceLanguage": "SV",
       "targetLanguage": "EN",
       "splitSentences": true,
-      "markWords": true
+      "markWords": true,
+      "format": "compact"   // optional, also accepted as ?format=compact
     }
-    Returns JSON with:
+    With "format": "compact" the response uses the deduplicated format described
+    in response_format.to_compact and is gzip/brotli compressed when accepted.
+    Otherwise returns JSON with:
     {
       "originalText": ...,
       "translatedText": ...,
@@ -58,6 +62,15 @@ def translate_text():
     target_lang = data.get("targetLanguage", "").upper()  # e.g. "EN"
     split_sentences = data.get("splitSentences", True)
     mark_words = data.get("markWords", True)
+    response_format = data.get("format") or request.args.get("format", "")
+    user_id = current_user_id()
+
+    if not isinstance(response_format, str):
+        return (
+            jsonify({"error": "Field 'format' must be a string."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+    compact = response_format.lower() == "compact"
 
     if not text:
         return (
@@ -71,66 +84,130 @@ def translate_text():
             text, source_lang=source_lang, target_lang=target_lang
         )
 
-        # 2) Split text into sentences if requested
-        if split_sentences:
-            original_sentences = nltk.sent_tokenize(text)
-            translated_sentences = nltk.sent_tokenize(translated_text)
-        else:
-            original_sentences = [text]
-            translated_sentences = [translated_text]
-
-        results = []
-        # 3) For each (original, translated) sentence pair:
-        for idx, (orig, tran) in enumerate(
-            zip(original_sentences, translated_sentences)
-        ):
-            # Use alignment service to get tokenization & alignment
-            align_data = current_app.alignment_service.align(orig, tran)
-            # align_data = {
-            #    "src_tokenized": [...],
-            #    "trg_tokenized": [...],
-            #    "alignment": [(src_idx, trg_idx), ...]
-            # }
-
-            # 4) If markWords == True, look up the source tokens in the vocabulary
-            #    because the source language is the one we're learning
-            word_info_list = []
-            if mark_words:
-                for token in align_data["src_tokenized"]:
-                    info = current_app.vocabulary_lookup_service.lookup_word(
-                        token, source_lang
-                    )
-                    # info has keys: "original_word", "found_in_vocabulary", "match_type", etc.
-                    word_info_list.append(info)
-
-            results.append(
-                {
-                    "original": orig,
-                    "translated": tran,
-                    "src_tokenized": align_data["src_tokenized"],
-                    "trg_tokenized": align_data["trg_tokenized"],
-                    "alignment": align_data["alignment"],
-                    "wordInfo": word_info_list,
-                }
-            )
+        # 2-4) Split into sentences, align each pair and mark known words
+        results = build_sentence_results(
+            text,
+            translated_text,
+            source_lang,
+            target_lang,
+            split_sentences=split_sentences,
+            mark_words=mark_words,
+            user_id=user_id,
+        )
 
         # 5) Build the final response
-        response_data = {
-            "originalText": text,
-            "translatedText": translated_text,
-            "alignment": (
-                [r["alignment"] for r in results]
-                if split_sentences
-                else results[0]["alignment"]
-            ),
-            "sentences": results if split_sentences else [results[0]],
-        }
-
-        # If not splitting, remove the array of sentences to keep it consistent
-        if not split_sentences:
-            del response_data["sentences"]
+        if compact:
+            return negotiated_json_response(to_compact(results), HTTPStatus.OK)
 
+        response_data = translation_payload(
+            text, translated_text, results, split_sentences
+        )
         return jsonify(response_data), HTTPStatus.OK
 
     except Exception as e:
         return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@translation_bp.route("/jobs", methods=["POST"])
+def submit_translation_job():
+    """
+    POST /api/translation/jobs
+    Expects JSON:
+    {
+      "text": "... a whole chapter ...",
+      "sourceLanguage": "SV",
+      "targetLanguage": "EN",
+      "markWords": true
+    }
+    Returns 202 with the job status (see GET /api/translation/jobs/<jobId>).
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Missing JSON body"}), HTTPStatus.BAD_REQUEST
+
+    text = data.get("text", "").strip()
+    source_lang = data.get("sourceLanguage", "").upper()
+    target_lang = data.get("targetLanguage", "").upper()
+    mark_words = data.get("markWords", True)
+    user_id = current_user_id()
+
+    if not text or not target_lang:
+        return (
+            jsonify({"error": "Fields 'text' and 'targetLanguage' are required."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    try:
+        job = current_app.translation_job_service.submit(
+            text, source_lang, target_lang, mark_words=bool(mark_words), user_id=user_id
+        )
+        return jsonify(job), HTTPStatus.ACCEPTED
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@translation_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_translation_job(job_id):
+    """
+    GET /api/translation/jobs/<jobId>
+    Returns JSON:
+    {
+      "jobId": "...",
+      "status": "queued" | "running" | "done" | "failed",
+      "totalChunks": 12,
+      "doneChunks": 5,
+      "failedChunks": 0,
+      "progress": 0.4167,
+      ...
+    }
+    """
+    user_id = current_user_id()
+    try:
+        job = current_app.translation_job_service.get_status(job_id, user_id=user_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), HTTPStatus.NOT_FOUND
+        return jsonify(job), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@translation_bp.route("/jobs/<job_id>/results", methods=["GET"])
+def get_translation_job_results(job_id):
+    """
+    GET /api/translation/jobs/<jobId>/results?page=1&pageSize=10
+    Returns one page of chunks; finished chunks carry "translatedText" and
+    "sentences" in the same format as POST /api/translation.
+    """
+    page = request.args.get("page", 1, type=int)
+    page_size = request.args.get("pageSize", 10, type=int)
+    user_id = current_user_id()
+    if page < 1 or not 1 <= page_size <= 100:
+        return (
+            jsonify({"error": "'page' must be >= 1 and 'pageSize' between 1 and 100."}),
+            HTTPStatus.BAD_REQUEST,
+        )
+
+    try:
+        results = current_app.translation_job_service.get_results(
+            job_id, page, page_size, user_id=user_id
+        )
+        if not results:
+            return jsonify({"error": "Job not found"}), HTTPStatus.NOT_FOUND
+        return jsonify(results), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@translation_bp.route("/alignment/models", methods=["GET"])
+def get_alignment_models():
+    """
+    GET /api/translation/alignment/models
+    Returns per-model metrics of the alignment registry
+    (load time, size, requests, mean latency) and the pair -> model mapping.
+    With the shared worker pool (ALIGNMENT_SOCKET), metrics are merged across
+    its workers and also listed per worker under "workers".
+    """
+    try:
+        return jsonify(current_app.alignment_service.stats()), HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
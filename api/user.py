@@ -0,0 +1,44 @@
+# api/user.py
+
+import re
+from http import HTTPStatus
+
+from flask import request, jsonify
+from config import Config
+from models import DEFAULT_USER_ID
+
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.@-]{1,128}$")
+
+
+class InvalidUserId(ValueError):
+    pass
+
+
+def parse_user_id(value: str) -> str:
+    """
+    Validates a user id taken from a request; empty means DEFAULT_USER_ID.
+    Raises InvalidUserId for malformed ids.
+    """
+    user_id = (value or "").strip()
+    if not user_id:
+        return DEFAULT_USER_ID
+    if not USER_ID_PATTERN.match(user_id):
+        raise InvalidUserId(
+            "User id must be 1-128 characters of letters, digits, '_', '.', '@' or '-'."
+        )
+    return user_id
+
+
+def current_user_id() -> str:
+    """
+    The user a request acts for: the Config.USER_ID_HEADER header, else
+    DEFAULT_USER_ID (single-user setups). Only the header is trusted: the
+    authenticating proxy in front of the app sets it and strips any value sent
+    by the client, which it can't do for a query parameter.
+    Raises InvalidUserId for malformed ids.
+    """
+    return parse_user_id(request.headers.get(Config.USER_ID_HEADER))
+
+
+def invalid_user_id(e):
+    return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
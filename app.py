@@ -1,4 +1,6 @@
 # app.py
+import os
+
 from flask import Flask
 from flask_cors import CORS
 from config import Config
@@ -6,10 +8,17 @@ from db import DBService
 from api.translation import translation_bp
 from api.fsrs import fsrs_bp
 from api.dictionary import dictionary_bp
-from alignment import AlignmentService
+from api.user import InvalidUserId, invalid_user_id
 from translation import TranslationService
 from app_fsrs import FSRS_Service
+from deck_stats import DeckStatsService
+from translation_jobs import TranslationJobService
 from vocabulary_lookup import VocabularyLookupService  # Import the new service
+from profiling import RequestProfiler
+from tokenization import TokenizationService
+from lemmatization import LemmatizationService
+from dictionary import DictionaryService
+from cli import register_commands
 import nltk
 
 
@@ -22,28 +31,98 @@ def create_app():
     # Initialize DB & create tables
     app.db_service = DBService()
     app.db_service.create_tables()
+    # Per-user rows written before sharding was enabled move to their shards
+    moved_to_shards = app.db_service.move_rows_to_shards()
 
     # Initialize services
-    app.translation_service = TranslationService()
-    app.alignment_service = AlignmentService()
-    app.fsrs_service = FSRS_Service(app.db_service)
+    app.translation_service = TranslationService(
+        cache_size=Config.TRANSLATION_CACHE_SIZE
+    )
+    app.dictionary_service = DictionaryService(
+        app.db_service, app.translation_service
+    )
+    app.tokenization_service = TokenizationService(
+        cache_size=Config.TOKENIZATION_CACHE_SIZE
+    )
+    if Config.ALIGNMENT_SOCKET:
+        # Alignment is served by the shared worker pool; keeps torch out of web workers
+        from alignment_pool import AlignmentClient
+
+        app.alignment_service = AlignmentClient(
+            Config.ALIGNMENT_SOCKET,
+            authkey=Config.ALIGNMENT_AUTHKEY,
+            timeout=Config.ALIGNMENT_TIMEOUT,
+        )
+    else:
+        # Models are picked per language pair and loaded lazily on first use
+        from alignment_registry import AlignmentModelRegistry
+
+        app.alignment_service = AlignmentModelRegistry.from_config(
+            tokenizer=app.tokenization_service
+        )
+    app.deck_stats_service = DeckStatsService(app.db_service)
+    if moved_to_shards:
+        app.deck_stats_service.rebuild()
+    else:
+        app.deck_stats_service.ensure_initialized()
+    app.fsrs_service = FSRS_Service(app.db_service, app.deck_stats_service)
+    app.lemmatization_service = LemmatizationService(
+        app.db_service, cache_size=Config.LEMMA_CACHE_SIZE
+    )
     app.vocabulary_lookup_service = VocabularyLookupService(
-        app.db_service
+        app.db_service, app.lemmatization_service
     )  # Initialize the new service
 
     with app.app_context():  # Ensure we have an application context
         nltk.download("punkt", quiet=True)
+        nltk.download("punkt_tab", quiet=True)
         nltk.download("wordnet", quiet=True)
         nltk.download("omw-1.4", quiet=True)
 
+    # Background translation jobs; unfinished ones are resumed by start_background_workers
+    app.translation_job_service = TranslationJobService(
+        app,
+        app.db_service,
+        max_workers=Config.JOB_MAX_WORKERS,
+        per_job_concurrency=Config.JOB_MAX_CHUNKS_PER_JOB,
+        chunk_chars=Config.JOB_CHUNK_CHARS,
+        lease_seconds=Config.JOB_CHUNK_LEASE_SECONDS,
+        max_attempts=Config.JOB_MAX_ATTEMPTS,
+    )
+
+    # Profiling hooks are only installed when enabled, so they cost nothing otherwise
+    if Config.PROFILING_ENABLED:
+        RequestProfiler(Config.PROFILE_DIR, header=Config.PROFILE_HEADER).init_app(app)
+
     # Register Blueprints
     app.register_blueprint(translation_bp, url_prefix="/api/translation")
     app.register_blueprint(fsrs_bp, url_prefix="/api/fsrs")
     app.register_blueprint(dictionary_bp, url_prefix="/api/dictionary")
+    app.register_error_handler(InvalidUserId, invalid_user_id)
+
+    register_commands(app)
 
     return app
 
 
+def start_background_workers(app):
+    """
+    Starts the periodic background work: the deck summary roll-forward, and
+    resuming plus sweeping unfinished translation jobs.
+    Called by the serving entry points, not by create_app, so `flask` commands
+    and extra server processes don't each start their own timers.
+    """
+    if getattr(app, "background_workers_started", False):
+        return
+    app.background_workers_started = True
+    app.deck_stats_service.start_roll_forward(Config.DECK_STATS_ROLL_INTERVAL)
+    app.translation_job_service.resume()
+    app.translation_job_service.start_sweeper(Config.JOB_SWEEP_INTERVAL)
+
+
 if __name__ == "__main__":
     app = create_app()
+    # The debug reloader runs this file twice; only the serving child starts timers
+    if Config.BACKGROUND_WORKERS and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_workers(app)
     app.run(debug=True, port=5000)
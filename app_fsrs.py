@@ -1,28 +1,70 @@
 # fsrs.py
 from fsrs import Scheduler, Card, Rating, State
-from datetime import datetime, timezone
-from models import Vocabulary, ReviewHistory, WordList
+from datetime import datetime, timedelta, timezone
+from models import DEFAULT_USER_ID, Vocabulary, ReviewHistory, WordList
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 from flask import current_app
+from vocabulary_lookup import vocabulary_entry
+
+
+# Rows per transaction when bulk-inserting cards
+INSERT_CHUNK_SIZE = 500
+
+# Attempts of review_word when the card is reviewed concurrently
+REVIEW_RETRIES = 3
+
+RATINGS = {
+    "again": Rating.Again,
+    "hard": Rating.Hard,
+    "good": Rating.Good,
+    "easy": Rating.Easy,
+}
+
+
+def parse_rating(user_rating: str) -> Rating:
+    rating = RATINGS.get(user_rating.lower().strip())
+    if not rating:
+        raise ValueError(
+            f"Invalid user rating '{user_rating}'. Must be one of: again, hard, good, easy"
+        )
+    return rating
+
+
+def as_utc(dt):
+    """
+    Aware UTC datetime; naive values (as SQLite returns them) are taken as UTC.
+    """
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
 
 
 class FSRS_Service:
-    def __init__(self, db_service):
+    def __init__(self, db_service, deck_stats=None):
         self.db_service = db_service
         self.scheduler = Scheduler()  # Load custom parameters here if needed
+        self.deck_stats = deck_stats  # DeckStatsService, kept in sync on add/review
 
-    def add_word(self, word: str, language: str, translation: str = ""):
+    def add_word(
+        self,
+        word: str,
+        language: str,
+        translation: str = "",
+        user_id: str = DEFAULT_USER_ID,
+    ):
         """
-        Adds a new word to the database as a new FSRS card if it doesn't exist.
+        Adds a new word to the user's deck as a new FSRS card if it doesn't exist.
         """
-        session: Session = self.db_service.get_session()
+        session: Session = self.db_service.get_session(user_id)
         try:
             # Normalize to lowercase
             word_lower = word.lower()
             lang_lower = language.lower()
 
-            existing = session.get(Vocabulary, (word_lower, lang_lower))
+            existing = session.get(Vocabulary, (user_id, word_lower, lang_lower))
             if existing:
                 # Word already in vocab; optionally we update translation if it's empty
                 if not existing.translation and translation:
@@ -33,10 +75,10 @@ class FSRS_Service:
             # If no translation is provided, let's fetch it from dictionary
             final_translation = translation.strip().lower()
             if not final_translation:
-                # We'll call the dictionary logic directly or reuse the translation service
+                # Local dictionary first; DeepL only if no table knows the word
                 try:
-                    fetched = current_app.translation_service.translate(
-                        word, source_lang=language.upper(), target_lang="EN"
+                    fetched = current_app.dictionary_service.translate_word(
+                        word, language, target_lang="EN", user_id=user_id
                     )
                     final_translation = fetched.lower()
                 except Exception as e:
@@ -48,6 +90,7 @@ class FSRS_Service:
 
             # Initialize Vocabulary entry without setting stability and difficulty
             vocab = Vocabulary(
+                user_id=user_id,
                 word=word_lower,
                 language=lang_lower,
                 translation=final_translation if final_translation else None,
@@ -59,100 +102,271 @@ class FSRS_Service:
                 due=datetime.now(timezone.utc),  # Due immediately for first review
             )
             session.add(vocab)
+            if self.deck_stats:
+                self.deck_stats.record(
+                    session, lang_lower, new=(vocab.state, vocab.due), user_id=user_id
+                )
             session.commit()
         finally:
             session.close()
 
-    def review_word(self, word: str, language: str, user_rating: str):
+    @staticmethod
+    def _card(vocab: Vocabulary) -> Card:
         """
-        Updates the FSRS card data for a word based on the user's rating.
-        user_rating can be: "again", "hard", "good", "easy"
-        Returns the updated Vocabulary object or None if not found.
+        Recreates the FSRS Card of a Vocabulary row.
         """
-        rating_map = {
-            "again": Rating.Again,
-            "hard": Rating.Hard,
-            "good": Rating.Good,
-            "easy": Rating.Easy,
+        # Ensure stability and difficulty are not negative if they are already set
+        stability = vocab.stability
+        if stability is not None and stability < 0.0001:
+            stability = 0.0001
+        difficulty = vocab.difficulty
+        if difficulty is not None and difficulty < 0.0001:
+            difficulty = 0.0001
+
+        return Card(
+            state=State(vocab.state),
+            due=as_utc(vocab.due),
+            stability=stability,
+            difficulty=difficulty,
+            last_review=as_utc(vocab.last_review),
+            step=vocab.step,
+        )
+
+    def _schedule(self, vocab: Vocabulary, rating: Rating, now: datetime) -> dict:
+        """
+        The Vocabulary fields after reviewing the card with `rating` at `now`.
+        Doesn't touch the database.
+        """
+        updated_card, review_log = self.scheduler.review_card(
+            self._card(vocab), rating, now
+        )
+
+        # Prevent math domain errors if stability ended up <= 0
+        if updated_card.stability is not None and updated_card.stability <= 0:
+            updated_card.stability = 0.0001
+
+        return {
+            "state": updated_card.state.value,
+            "due": updated_card.due,
+            "stability": updated_card.stability,
+            "difficulty": updated_card.difficulty,
+            "last_review": updated_card.last_review,
+            "step": updated_card.step,
         }
-        rating_key = user_rating.lower().strip()
-        rating = rating_map.get(rating_key)
-        if not rating:
-            raise ValueError(
-                f"Invalid user rating '{user_rating}'. Must be one of: again, hard, good, easy"
-            )
 
-        now = datetime.now(timezone.utc)
+    def _apply_rating(
+        self, session: Session, vocab: Vocabulary, rating: Rating, now: datetime, user_id: str
+    ) -> bool:
+        """
+        Reviews one card inside the caller's transaction: updates it only if its
+        version is still vocab.version (bumping the version), logs the review
+        and moves it in the deck stats. Returns False, writing nothing, if the
+        card was reviewed concurrently. Does not commit.
+        """
+        fields = self._schedule(vocab, rating, now)
+        updated = (
+            session.query(Vocabulary)
+            .filter(
+                Vocabulary.user_id == user_id,
+                Vocabulary.word == vocab.word,
+                Vocabulary.language == vocab.language,
+                Vocabulary.version == vocab.version,
+            )
+            .update(
+                {
+                    **{getattr(Vocabulary, k): v for k, v in fields.items()},
+                    Vocabulary.version: Vocabulary.version + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+        if not updated:
+            return False
 
-        session: Session = self.db_service.get_session()
-        try:
-            vocab = (
-                session.query(Vocabulary)
-                .filter(
-                    and_(
-                        Vocabulary.word == word.lower(),
-                        Vocabulary.language == language.lower(),
-                    )
-                )
-                .first()
+        # Log the review in ReviewHistory
+        session.add(
+            ReviewHistory(
+                user_id=user_id,
+                review_time=now,
+                word=vocab.word,
+                language=vocab.language,
+                rating=rating.value,
+                state=fields["state"],
             )
-            if not vocab:
-                return None
-
-            # Ensure stability and difficulty are not negative if they are already set
-            if vocab.stability is not None and vocab.stability < 0.0001:
-                vocab.stability = 0.0001
-
-            if vocab.difficulty is not None and vocab.difficulty < 0.0001:
-                vocab.difficulty = 0.0001
-
-            # Recreate FSRS Card from Vocabulary data
-            card = Card(
-                state=State(vocab.state),
-                due=vocab.due,
-                stability=vocab.stability,
-                difficulty=vocab.difficulty,
-                last_review=vocab.last_review,
-                step=vocab.step,
+        )
+        if self.deck_stats:
+            self.deck_stats.record(
+                session,
+                vocab.language,
+                old=(vocab.state, vocab.due),
+                new=(fields["state"], fields["due"]),
+                user_id=user_id,
             )
+        # Reload on next access instead of flushing the stale attributes
+        session.expire(vocab)
+        return True
 
-            # Update the card with the user's rating
-            updated_card, review_log = self.scheduler.review_card(card, rating, now)
+    def review_word(
+        self,
+        word: str,
+        language: str,
+        user_rating: str,
+        user_id: str = DEFAULT_USER_ID,
+    ):
+        """
+        Updates the FSRS card data for a word based on the user's rating.
+        user_rating can be: "again", "hard", "good", "easy"
+        Returns the updated Vocabulary object or None if not found.
+        """
+        rating = parse_rating(user_rating)
+        now = datetime.now(timezone.utc)
 
-            # Prevent math domain errors if stability ended up <= 0
-            if updated_card.stability is not None and updated_card.stability <= 0:
-                updated_card.stability = 0.0001
+        session: Session = self.db_service.get_session(user_id)
+        try:
+            for _ in range(REVIEW_RETRIES):
+                vocab = session.get(Vocabulary, (user_id, word.lower(), language.lower()))
+                if not vocab:
+                    return None
+                if self._apply_rating(session, vocab, rating, now, user_id):
+                    session.commit()
+                    return vocab
+                # Reviewed concurrently: re-read the card and schedule again
+                session.expire_all()
+            raise RuntimeError(f"Card '{word}' is being reviewed concurrently; try again.")
+        finally:
+            session.close()
 
-            # Update Vocabulary with updated Card data
-            vocab.state = updated_card.state.value
-            vocab.due = updated_card.due
-            vocab.stability = updated_card.stability
-            vocab.difficulty = updated_card.difficulty
-            vocab.last_review = updated_card.last_review
-            vocab.step = updated_card.step
+    def get_review_session(
+        self, limit: int = 20, language: str = None, user_id: str = DEFAULT_USER_ID
+    ):
+        """
+        Returns the next `limit` due cards, most overdue first, each with the
+        card state a review with every rating would produce now, so a client
+        can show the next card immediately and send ratings later in batches
+        (see apply_review_batch). Each card carries its version for conflict
+        detection.
+        """
+        now = datetime.now(timezone.utc)
+        session: Session = self.db_service.get_session(user_id)
+        try:
+            query = session.query(Vocabulary).filter(
+                Vocabulary.user_id == user_id, Vocabulary.due <= now
+            )
+            if language:
+                query = query.filter(Vocabulary.language == language.lower())
+            rows = query.order_by(Vocabulary.due).limit(limit).all()
 
-            # Log the review in ReviewHistory
-            rh = ReviewHistory(
-                review_time=now,
-                word=word.lower(),
-                language=language.lower(),
-                rating=rating.value,
-                state=updated_card.state.value,
+            cards = []
+            for v in rows:
+                entry = vocabulary_entry(v)
+                entry["version"] = v.version
+                entry["outcomes"] = {}
+                for name, rating in RATINGS.items():
+                    fields = self._schedule(v, rating, now)
+                    entry["outcomes"][name] = {
+                        "state": fields["state"],
+                        "due": fields["due"].isoformat() if fields["due"] else None,
+                        "stability": fields["stability"],
+                        "difficulty": fields["difficulty"],
+                        "step": fields["step"],
+                    }
+                cards.append(entry)
+            return {"generatedAt": now.isoformat(), "cards": cards}
+        finally:
+            session.close()
+
+    def apply_review_batch(self, reviews: list[dict], user_id: str = DEFAULT_USER_ID):
+        """
+        Applies ratings collected during a review session in one transaction,
+        in the given order. Each review is
+          {"word": ..., "language": ..., "rating": "good", "version": 3,
+           "reviewedAt": "2026-01-01T12:00:00+00:00"}   // reviewedAt optional
+        and is only applied if the card is still at that version; otherwise it
+        is reported as a conflict together with the card's current state.
+        reviewedAt is clamped to between the card's last review and now.
+        Raises ValueError if any review is malformed (nothing is applied).
+        Returns {"applied": [...], "conflicts": [...], "notFound": [...]}.
+        """
+        now = datetime.now(timezone.utc)
+        parsed = []
+        for i, r in enumerate(reviews):
+            if (
+                not isinstance(r, dict)
+                or not isinstance(r.get("word"), str)
+                or not isinstance(r.get("language"), str)
+                or not r["word"].strip()
+                or not r["language"].strip()
+            ):
+                raise ValueError(f"Review {i}: 'word' and 'language' (as strings) are required.")
+            version = r.get("version")
+            if not isinstance(version, int) or isinstance(version, bool):
+                raise ValueError(f"Review {i}: 'version' must be an integer.")
+            reviewed_at = now
+            if r.get("reviewedAt"):
+                try:
+                    reviewed_at = as_utc(datetime.fromisoformat(r["reviewedAt"]))
+                except (TypeError, ValueError):
+                    raise ValueError(f"Review {i}: 'reviewedAt' must be an ISO 8601 time.")
+                reviewed_at = min(reviewed_at, now)
+            parsed.append(
+                (
+                    r["word"].strip().lower(),
+                    r["language"].strip().lower(),
+                    parse_rating(str(r.get("rating", ""))),
+                    version,
+                    reviewed_at,
+                )
             )
-            session.add(rh)
+
+        result = {"applied": [], "conflicts": [], "notFound": []}
+        session: Session = self.db_service.get_session(user_id)
+        try:
+            for word, language, rating, version, reviewed_at in parsed:
+                vocab = session.get(Vocabulary, (user_id, word, language))
+                if vocab is None:
+                    result["notFound"].append({"word": word, "language": language})
+                    continue
+                # A review can't predate the card's last one (e.g. a stale or
+                # out-of-order reviewedAt); it would rewind the schedule
+                last_review = as_utc(vocab.last_review)
+                if last_review is not None:
+                    reviewed_at = max(reviewed_at, last_review)
+                if vocab.version == version and self._apply_rating(
+                    session, vocab, rating, reviewed_at, user_id
+                ):
+                    result["applied"].append(
+                        {"word": word, "language": language, "version": version + 1}
+                    )
+                    continue
+                session.refresh(vocab)
+                card = vocabulary_entry(vocab)
+                card["version"] = vocab.version
+                result["conflicts"].append(
+                    {
+                        "word": word,
+                        "language": language,
+                        "expectedVersion": version,
+                        "currentVersion": vocab.version,
+                        "card": card,
+                    }
+                )
             session.commit()
-            return vocab
+            return result
         finally:
             session.close()
 
-    def get_words_due_for_review(self):
+    def get_words_due_for_review(self, user_id: str = DEFAULT_USER_ID):
         """
-        Returns all Vocabulary items whose due date is <= now
+        Returns all of the user's Vocabulary items whose due date is <= now
         """
         now = datetime.now(timezone.utc)
-        session: Session = self.db_service.get_session()
+        session: Session = self.db_service.get_session(user_id)
         try:
-            results = session.query(Vocabulary).filter(Vocabulary.due <= now).all()
+            results = (
+                session.query(Vocabulary)
+                .filter(Vocabulary.user_id == user_id, Vocabulary.due <= now)
+                .all()
+            )
 
             return [
                 {"word": v.word, "language": v.language, "translation": v.translation}
@@ -189,6 +403,172 @@ class FSRS_Service:
         finally:
             session.close()
 
+    def add_level_to_deck(
+        self,
+        language: str,
+        level: str,
+        new_per_day: int = None,
+        translate: bool = True,
+        user_id: str = DEFAULT_USER_ID,
+    ):
+        """
+        Adds every word of a WordList level that isn't in the user's deck yet as a
+        new card. The level is diffed against the vocabulary in one query,
+        missing translations are fetched in batches through the dictionary tiers,
+        and cards are inserted in chunked transactions.
+        If new_per_day is set, initial due dates are staggered so that at most
+        that many new cards become due per day.
+        Returns {"level_size": ..., "added": ..., "translated": ...}.
+        """
+        lang_lower = language.lower()
+        level_upper = level.upper()
+
+        if self.db_service.sharded:
+            # Word lists and the deck live in different databases: no join
+            level_size, missing = self._missing_level_words_sharded(
+                lang_lower, level_upper, user_id
+            )
+        else:
+            level_size, missing = self._missing_level_words(
+                lang_lower, level_upper, user_id
+            )
+
+        translations = {}
+        if missing and translate:
+            try:
+                for r in current_app.dictionary_service.lookup_many(
+                    missing, language, target_lang="EN", user_id=user_id
+                ):
+                    if r["translation"]:
+                        translations[r["word"]] = r["translation"].lower()
+            except Exception as e:
+                print(f"Warning: Could not fetch translations: {str(e)}")
+
+        now = datetime.now(timezone.utc)
+        added = 0
+        for start in range(0, len(missing), INSERT_CHUNK_SIZE):
+            chunk = missing[start : start + INSERT_CHUNK_SIZE]
+            session = self.db_service.get_session(user_id)
+            try:
+                # Skip words added concurrently since the diff
+                existing = {
+                    w
+                    for (w,) in session.query(Vocabulary.word).filter(
+                        Vocabulary.user_id == user_id,
+                        Vocabulary.language == lang_lower,
+                        Vocabulary.word.in_(chunk),
+                    )
+                }
+                cards = []
+                for offset, w in enumerate(chunk):
+                    if w in existing:
+                        continue
+                    due = now
+                    if new_per_day:
+                        due = now + timedelta(days=(start + offset) // new_per_day)
+                    cards.append(
+                        {
+                            "user_id": user_id,
+                            "word": w,
+                            "language": lang_lower,
+                            "translation": translations.get(w),
+                            "state": State.Learning.value,
+                            "step": 0,
+                            "stability": None,
+                            "difficulty": None,
+                            "last_review": None,
+                            "due": due,
+                        }
+                    )
+                session.bulk_insert_mappings(Vocabulary, cards)
+                if self.deck_stats:
+                    self.deck_stats.record_many(
+                        session,
+                        lang_lower,
+                        [(State.Learning.value, c["due"]) for c in cards],
+                        user_id=user_id,
+                    )
+                session.commit()
+                added += len(cards)
+            finally:
+                session.close()
+
+        return {
+            "level_size": level_size,
+            "added": added,
+            "translated": sum(1 for w in missing if w in translations),
+        }
+
+    def _missing_level_words(self, language: str, level: str, user_id: str):
+        """
+        (level size, words of the level not in the user's deck), diffed with
+        one outer join.
+        """
+        session: Session = self.db_service.get_session()
+        try:
+            level_size = (
+                session.query(func.count())
+                .select_from(WordList)
+                .filter(WordList.language == language, WordList.level == level)
+                .scalar()
+            )
+            missing = [
+                w
+                for (w,) in session.query(WordList.word)
+                .outerjoin(
+                    Vocabulary,
+                    and_(
+                        Vocabulary.user_id == user_id,
+                        Vocabulary.word == WordList.word,
+                        Vocabulary.language == WordList.language,
+                    ),
+                )
+                .filter(
+                    WordList.language == language,
+                    WordList.level == level,
+                    Vocabulary.word.is_(None),
+                )
+                .order_by(WordList.word)
+                .all()
+            ]
+            return level_size, missing
+        finally:
+            session.close()
+
+    def _missing_level_words_sharded(self, language: str, level: str, user_id: str):
+        """
+        Same as _missing_level_words when the deck is in a shard: reads the
+        level, then checks it against the user's deck in chunked IN queries.
+        """
+        session: Session = self.db_service.get_session()
+        try:
+            words = [
+                w
+                for (w,) in session.query(WordList.word)
+                .filter(WordList.language == language, WordList.level == level)
+                .order_by(WordList.word)
+                .all()
+            ]
+        finally:
+            session.close()
+
+        known = set()
+        session = self.db_service.get_session(user_id)
+        try:
+            for start in range(0, len(words), INSERT_CHUNK_SIZE):
+                chunk = words[start : start + INSERT_CHUNK_SIZE]
+                known.update(
+                    w
+                    for (w,) in session.query(Vocabulary.word).filter(
+                        Vocabulary.user_id == user_id,
+                        Vocabulary.language == language,
+                        Vocabulary.word.in_(chunk),
+                    )
+                )
+        finally:
+            session.close()
+        return len(words), [w for w in words if w not in known]
+
     def get_learning_list(self, language: str, level: str):
         """
         Returns all words from WordList for the given language & level.
@@ -205,13 +585,13 @@ class FSRS_Service:
         finally:
             session.close()
 
-    def get_all_vocabulary(self):
+    def get_all_vocabulary(self, user_id: str = DEFAULT_USER_ID):
         """
-        Returns all vocab entries from user_vocabulary with FSRS fields in dictionary form.
+        Returns all of the user's vocab entries with FSRS fields in dictionary form.
         """
-        session: Session = self.db_service.get_session()
+        session: Session = self.db_service.get_session(user_id)
         try:
-            rows = session.query(Vocabulary).all()
+            rows = session.query(Vocabulary).filter(Vocabulary.user_id == user_id).all()
             output = []
             for v in rows:
                 output.append(
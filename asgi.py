@@ -0,0 +1,196 @@
+# asgi.py
+"""
+Async serving mode:
+
+    uvicorn --factory asgi:create_asgi_app
+
+POST /api/translation is served natively on the event loop: the DeepL call is
+awaited on a pooled async client, so a single process can hold hundreds of
+requests waiting on DeepL, while sentence splitting, alignment and the
+vocabulary lookups run on a bounded thread pool. Every other route is the
+regular Flask app behind an ASGI-to-WSGI bridge.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from api.user import InvalidUserId, parse_user_id
+from app import create_app, start_background_workers
+from async_translation import AsyncTranslationService
+from config import Config
+from response_format import encode_json, to_compact
+from translation_pipeline import build_sentence_results, translation_payload
+
+
+class AsyncApp:
+    def __init__(self, flask_app, executor_workers: int = 8):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.translator = AsyncTranslationService.from_config(
+            flask_app.translation_service
+        )
+        # CPU-bound alignment and DB work; bounded so it can't starve the loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=executor_workers, thread_name_prefix="asgi-worker"
+        )
+        self.routes = {("POST", "/api/translation"): self.translate_text}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "http":
+            path = scope["path"].rstrip("/") or "/"
+            handler = self.routes.get((scope["method"], path))
+            if handler is not None:
+                await handler(scope, receive, send)
+                return
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if Config.BACKGROUND_WORKERS:
+                    start_background_workers(self.flask_app)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.translator.aclose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # --- Helpers --------------------------------------------------------------
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    @staticmethod
+    def _header(scope, name: str) -> str:
+        name = name.lower().encode("latin-1")
+        for key, value in scope["headers"]:
+            if key == name:
+                return value.decode("latin-1")
+        return ""
+
+    @staticmethod
+    async def _send(send, status: int, body: bytes, encoding: str = None):
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": int(status), "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _send_error(self, send, status: int, message: str):
+        await self._send(send, status, json.dumps({"error": message}).encode("utf-8"))
+
+    # --- Routes ---------------------------------------------------------------
+
+    async def translate_text(self, scope, receive, send):
+        """
+        Async POST /api/translation; same request and response formats as
+        api.translation.translate_text.
+        """
+        try:
+            data = json.loads(await self._read_body(receive) or b"null")
+        except ValueError:
+            data = None
+        if not data or not isinstance(data, dict):
+            await self._send_error(send, HTTPStatus.BAD_REQUEST, "Missing JSON body")
+            return
+
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        text = data.get("text", "").strip()
+        source_lang = data.get("sourceLanguage", "").upper()
+        target_lang = data.get("targetLanguage", "").upper()
+        split_sentences = data.get("splitSentences", True)
+        mark_words = data.get("markWords", True)
+        response_format = data.get("format") or query.get("format", [""])[0]
+        if not isinstance(response_format, str):
+            await self._send_error(
+                send, HTTPStatus.BAD_REQUEST, "Field 'format' must be a string."
+            )
+            return
+        compact = response_format.lower() == "compact"
+        try:
+            user_id = parse_user_id(self._header(scope, Config.USER_ID_HEADER))
+        except InvalidUserId as e:
+            await self._send_error(send, HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        if not text:
+            await self._send_error(
+                send, HTTPStatus.BAD_REQUEST, "Field 'text' cannot be empty."
+            )
+            return
+
+        try:
+            # Waiting on DeepL holds no thread
+            translated_text = await self.translator.translate(
+                text, source_lang=source_lang, target_lang=target_lang
+            )
+            body, encoding = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                self._render,
+                text,
+                translated_text,
+                source_lang,
+                target_lang,
+                split_sentences,
+                mark_words,
+                compact,
+                user_id,
+                self._header(scope, "Accept-Encoding"),
+            )
+        except Exception as e:
+            await self._send_error(send, HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+        await self._send(send, HTTPStatus.OK, body, encoding)
+
+    def _render(
+        self,
+        text,
+        translated_text,
+        source_lang,
+        target_lang,
+        split_sentences,
+        mark_words,
+        compact,
+        user_id,
+        accept_encoding,
+    ):
+        # Runs on the executor: alignment, vocabulary lookups and serialization
+        with self.flask_app.app_context():
+            results = build_sentence_results(
+                text,
+                translated_text,
+                source_lang,
+                target_lang,
+                split_sentences=split_sentences,
+                mark_words=mark_words,
+                user_id=user_id,
+            )
+            if compact:
+                return encode_json(to_compact(results), accept_encoding)
+            payload = translation_payload(text, translated_text, results, split_sentences)
+            # Byte-for-byte what jsonify produces in the sync route
+            return self.flask_app.json.response(payload).get_data(), None
+
+
+def create_asgi_app():
+    return AsyncApp(create_app(), executor_workers=Config.ASYNC_EXECUTOR_WORKERS)
@@ -0,0 +1,118 @@
+# async_translation.py
+import asyncio
+
+import httpx
+
+from config import Config
+from translation import TranslationService, deepl_form_data, parse_deepl_response
+
+
+class AsyncTranslationService:
+    """
+    Non-blocking DeepL client for the async serving mode (asgi.py).
+
+    Shares its cache and in-flight calls with the synchronous TranslationService,
+    so both serving paths and the background jobs benefit from each other's
+    results, and a text that is already being translated (by either path) is
+    awaited instead of sent again. Connections are pooled by one
+    httpx.AsyncClient, created on first use inside the serving event loop.
+    """
+
+    def __init__(
+        self,
+        translation_service: TranslationService,
+        max_connections: int = 100,
+        timeout: float = 30.0,
+    ):
+        self.translation_service = translation_service
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+        self._tasks = set()  # running DeepL fetches, referenced until done
+
+    @classmethod
+    def from_config(cls, translation_service: TranslationService):
+        return cls(
+            translation_service,
+            max_connections=Config.DEEPL_MAX_CONNECTIONS,
+            timeout=Config.DEEPL_TIMEOUT,
+        )
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def translate(
+        self, text: str, source_lang: str = None, target_lang: str = "SV"
+    ) -> str:
+        """
+        Async equivalent of TranslationService.translate.
+        """
+        if not text:
+            return ""
+
+        service = self.translation_service
+        cache_key = service._cache_key(text, source_lang, target_lang)
+        cached, mine, theirs = service.claim([cache_key])
+        if cached:
+            return cached[cache_key]
+
+        if mine:
+            # A task rather than an await: the fetch must finish even if this
+            # caller is cancelled (client disconnected), as others may wait on it
+            task = asyncio.ensure_future(
+                self._fetch(text, source_lang, target_lang, mine)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        future = mine.get(cache_key) or theirs[cache_key]
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), service.wait_timeout
+            )
+        except asyncio.TimeoutError:
+            raise RuntimeError(
+                "DeepL Translation failed: timed out waiting for an identical request"
+            )
+
+    async def _fetch(self, text: str, source_lang: str, target_lang: str, futures: dict):
+        (cache_key,) = futures
+        try:
+            translated = (await self._request([text], source_lang, target_lang))[0]
+            self.translation_service.finish(futures, {cache_key: translated})
+        except BaseException as e:
+            # Cancellation at shutdown included, so waiters never hang
+            self.translation_service.finish(futures, error=e)
+            if not isinstance(e, Exception):
+                raise
+
+    async def _request(
+        self, texts: list[str], source_lang: str, target_lang: str
+    ) -> list[str]:
+        api_key = self.translation_service.api_key
+        if not api_key:
+            raise ValueError("DeepL API key is not set. Please configure DEEPL_API_KEY.")
+
+        # httpx repeats a form field given a list of values
+        data = {}
+        for key, value in deepl_form_data(api_key, texts, source_lang, target_lang):
+            data.setdefault(key, []).append(value)
+
+        resp = await self._get_client().post(self.translation_service.url, data=data)
+        if resp.status_code != 200:
+            raise RuntimeError(
+                f"DeepL Translation failed: {resp.status_code} - {resp.text}"
+            )
+        return parse_deepl_response(resp.json(), len(texts))
@@ -0,0 +1,130 @@
+# benchmarks/alignment_profile.py
+"""
+Compares the stock fp32 aligner with a CPU inference profile on a fixed corpus.
+
+    python benchmarks/alignment_profile.py --quantize --threads 4 --interop-threads 1
+
+Reports per-sentence latency, throughput and how well the optimized alignments
+agree with the fp32 baseline (precision/recall/F1 over alignment pairs).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from alignment import AlignmentService  # noqa: E402
+
+CORPUS = [
+    ("Jag älskar dig.", "I love you."),
+    ("Hon läser en bok i trädgården.", "She is reading a book in the garden."),
+    ("Vi ska åka till Stockholm i morgon.", "We are going to Stockholm tomorrow."),
+    ("Kan du hjälpa mig med mina läxor?", "Can you help me with my homework?"),
+    ("Det regnade hela dagen igår.", "It rained all day yesterday."),
+    ("Min bror arbetar som läkare på sjukhuset.", "My brother works as a doctor at the hospital."),
+    ("Katten sover på soffan.", "The cat is sleeping on the sofa."),
+    ("Jag har inte ätit frukost än.", "I have not eaten breakfast yet."),
+    ("Tåget var försenat på grund av snön.", "The train was delayed because of the snow."),
+    ("Hur mycket kostar den här tröjan?", "How much does this sweater cost?"),
+    ("Barnen lekte i parken hela eftermiddagen.", "The children played in the park all afternoon."),
+    ("Han glömde sina nycklar på kontoret.", "He forgot his keys at the office."),
+    ("Vi träffades för första gången förra sommaren.", "We met for the first time last summer."),
+    ("Kaffet är för varmt för att dricka.", "The coffee is too hot to drink."),
+    ("De flyttade till en större lägenhet i centrum.", "They moved to a bigger apartment in the city centre."),
+    (
+        "När vi kom fram till stugan hade det redan blivit mörkt, så vi tände en brasa "
+        "och lagade middag tillsammans innan vi gick och lade oss.",
+        "When we arrived at the cabin it had already become dark, so we lit a fire "
+        "and cooked dinner together before we went to bed.",
+    ),
+    (
+        "Regeringen meddelade på tisdagen att den kommer att investera mer pengar i "
+        "kollektivtrafik och förnybar energi under de kommande fem åren.",
+        "The government announced on Tuesday that it will invest more money in "
+        "public transport and renewable energy over the next five years.",
+    ),
+]
+
+
+def run(service, repeat):
+    latencies = []
+    results = []
+    for _ in range(repeat):
+        service.cache.clear()
+        results = []
+        for src, trg in CORPUS:
+            started = time.perf_counter()
+            results.append(service.align(src, trg, source_lang="SV", target_lang="EN"))
+            latencies.append(time.perf_counter() - started)
+    return latencies, results
+
+
+def summarize(name, load_time, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(
+        f"{name:<10} load={load_time:6.2f}s  mean={statistics.mean(latencies) * 1000:7.1f}ms  "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms  "
+        f"throughput={len(latencies) / sum(latencies):6.1f} sent/s"
+    )
+    return statistics.mean(latencies)
+
+
+def agreement(baseline, candidate):
+    tp = fp = fn = exact = 0
+    for b, c in zip(baseline, candidate):
+        b_pairs, c_pairs = set(map(tuple, b["alignment"])), set(map(tuple, c["alignment"]))
+        tp += len(b_pairs & c_pairs)
+        fp += len(c_pairs - b_pairs)
+        fn += len(b_pairs - c_pairs)
+        exact += b_pairs == c_pairs
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1, exact / len(baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--interop-threads", type=int, default=0)
+    parser.add_argument("--max-tokens", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Baseline first: thread settings are process-wide and would leak into it
+    started = time.perf_counter()
+    baseline = AlignmentService()
+    baseline_load = time.perf_counter() - started
+    run(baseline, 1)  # warm-up
+    baseline_latencies, baseline_results = run(baseline, args.repeat)
+    del baseline
+
+    started = time.perf_counter()
+    optimized = AlignmentService(
+        quantize=args.quantize,
+        intra_op_threads=args.threads,
+        inter_op_threads=args.interop_threads,
+        max_tokens=args.max_tokens,
+    )
+    optimized_load = time.perf_counter() - started
+    run(optimized, 1)  # warm-up
+    optimized_latencies, optimized_results = run(optimized, args.repeat)
+
+    print(f"{len(CORPUS)} sentence pairs x {args.repeat} passes")
+    base_mean = summarize("fp32", baseline_load, baseline_latencies)
+    opt_mean = summarize("profile", optimized_load, optimized_latencies)
+    print(f"speedup    {base_mean / opt_mean:.2f}x (quantized={optimized.quantized})")
+
+    precision, recall, f1, exact = agreement(baseline_results, optimized_results)
+    print(
+        f"agreement  precision={precision:.3f}  recall={recall:.3f}  f1={f1:.3f}  "
+        f"identical sentences={exact:.0%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# benchmarks/serving_throughput.py
+"""
+Compares POST /api/translation throughput of the sync (Flask on a fixed thread
+pool, like gunicorn --threads) and async (asgi.py on uvicorn) serving modes
+against a local stub DeepL that answers after a fixed latency.
+
+    python benchmarks/serving_throughput.py --requests 1000 --concurrency 200 --threads 16
+
+Each request uses a distinct text so the translation cache never answers it.
+Alignment is replaced by a trivial 1:1 aligner unless --real-alignment is
+given, so the numbers reflect serving and DeepL I/O rather than model time.
+Needs httpx and uvicorn.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+# --- Stub DeepL ----------------------------------------------------------------
+
+
+def start_stub_deepl(port: int, latency: float):
+    """
+    Async stub of DeepL's /v2/translate (uppercases each text), served by
+    uvicorn on a background thread so it never becomes the bottleneck.
+    """
+    import uvicorn
+
+    async def stub(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        form = parse_qs(body.decode("utf-8"))
+        await asyncio.sleep(latency)
+        payload = json.dumps(
+            {"translations": [{"text": t.upper()} for t in form.get("text", [])]}
+        ).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+    server = uvicorn.Server(
+        uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# --- Servers (run in a subprocess) ----------------------------------------------
+
+
+class IdentityAligner:
+    def align(self, original, translated, source_lang=None, target_lang=None):
+        src, trg = original.split(), translated.split()
+        return {
+            "src_tokenized": src,
+            "trg_tokenized": trg,
+            "alignment": [(i, i) for i in range(min(len(src), len(trg)))],
+        }
+
+
+def serve(mode: str, port: int, threads: int, real_alignment: bool):
+    if mode == "sync":
+        from werkzeug.serving import BaseWSGIServer
+        from app import create_app
+
+        app = create_app()
+        if not real_alignment:
+            app.alignment_service = IdentityAligner()
+
+        class PooledWSGIServer(BaseWSGIServer):
+            # A fixed number of request threads, like gunicorn --threads
+            pool = ThreadPoolExecutor(max_workers=threads)
+
+            def process_request(self, request, client_address):
+                self.pool.submit(self._handle, request, client_address)
+
+            def _handle(self, request, client_address):
+                try:
+                    self.finish_request(request, client_address)
+                finally:
+                    self.shutdown_request(request)
+
+        PooledWSGIServer("127.0.0.1", port, app).serve_forever()
+    else:
+        import uvicorn
+        from asgi import create_asgi_app
+
+        asgi_app = create_asgi_app()
+        if not real_alignment:
+            asgi_app.flask_app.alignment_service = IdentityAligner()
+        uvicorn.run(asgi_app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+# --- Load generator -------------------------------------------------------------
+
+
+async def load(port: int, n_requests: int, concurrency: int, run_id: str, split: bool):
+    import httpx
+
+    url = f"http://127.0.0.1:{port}/api/translation"
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = []
+
+    async with httpx.AsyncClient(
+        timeout=120, limits=httpx.Limits(max_connections=concurrency)
+    ) as client:
+
+        async def one(i):
+            body = {
+                "text": f"Jag läser bok nummer {i} i serie {run_id}.",
+                "sourceLanguage": "SV",
+                "targetLanguage": "EN",
+                "markWords": True,
+                "splitSentences": split,
+            }
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    resp = await client.post(url, json=body)
+                    if resp.status_code != 200:
+                        errors.append(resp.status_code)
+                        return
+                except httpx.HTTPError as e:
+                    errors.append(type(e).__name__)
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, errors
+
+
+def wait_ready(port: int, timeout: float = 120):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/fsrs/stats", timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def bench(mode, args, env):
+    port = args.port + (0 if mode == "sync" else 1)
+    command = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--serve",
+        mode,
+        "--port",
+        str(port),
+        "--threads",
+        str(args.threads),
+    ]
+    if args.real_alignment:
+        command.append("--real-alignment")
+    process = subprocess.Popen(command, env=env, cwd=ROOT)
+    try:
+        wait_ready(port)
+        split = not args.no_split
+        asyncio.run(load(port, min(20, args.requests), 10, f"warmup-{mode}", split))
+        elapsed, latencies, errors = asyncio.run(
+            load(port, args.requests, args.concurrency, mode, split)
+        )
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0
+    print(
+        f"{mode:<6} {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50={statistics.median(latencies) * 1000 if latencies else 0:8.1f}ms  "
+        f"p95={p95 * 1000:8.1f}ms  errors={len(errors)}"
+        + (f" ({', '.join(sorted(set(map(str, errors))))})" if errors else "")
+    )
+    return len(latencies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument(
+        "--threads", type=int, default=16, help="Sync request threads / async executor workers."
+    )
+    parser.add_argument("--deepl-latency", type=float, default=0.25, help="Seconds.")
+    parser.add_argument("--port", type=int, default=8710)
+    parser.add_argument("--real-alignment", action="store_true")
+    parser.add_argument(
+        "--no-split", action="store_true", help="Send splitSentences=false (no punkt data needed)."
+    )
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.threads, args.real_alignment)
+        return
+
+    stub_port = args.port + 2
+    stub = start_stub_deepl(stub_port, args.deepl_latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DEEPL_API_URL=f"http://127.0.0.1:{stub_port}/v2/translate",
+            DEEPL_API_KEY="benchmark",
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            ASYNC_EXECUTOR_WORKERS=str(args.threads),
+        )
+        print(
+            f"{args.requests} requests, concurrency {args.concurrency}, "
+            f"{args.threads} threads, DeepL latency {args.deepl_latency * 1000:.0f}ms"
+        )
+        sync_rps = bench("sync", args, env)
+        async_rps = bench("async", args, env)
+    stub.should_exit = True
+    if sync_rps:
+        print(f"async/sync throughput: {async_rps / sync_rps:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
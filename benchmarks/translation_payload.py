@@ -0,0 +1,117 @@
+# benchmarks/translation_payload.py
+"""
+Compares payload size and serialization time of the verbose and compact
+POST /api/translation response formats on a synthetic long text.
+
+    python benchmarks/translation_payload.py --sentences 500
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from response_format import brotli, to_compact  # noqa: E402
+
+
+def synthetic_results(n_sentences, vocab_size, known_ratio, seed=7):
+    rng = random.Random(seed)
+    words = [f"ord{i}" for i in range(vocab_size * 3)]
+    vocabulary = {
+        w: {
+            "word": w,
+            "language": "sv",
+            "translation": f"word{i}",
+            "state": rng.choice([1, 2, 3]),
+            "due": "2026-10-19T12:34:56.789012",
+            "stability": rng.uniform(0.1, 200.0),
+            "difficulty": rng.uniform(1.0, 10.0),
+            "last_review": "2026-10-12T08:00:00.000000",
+            "step": rng.randint(0, 3),
+        }
+        for i, w in enumerate(words[:vocab_size])
+    }
+
+    results = []
+    for _ in range(n_sentences):
+        length = rng.randint(6, 25)
+        src = [
+            rng.choice(words[:vocab_size]) if rng.random() < known_ratio else rng.choice(words)
+            for _ in range(length)
+        ]
+        trg = [f"t{rng.randint(0, 5000)}" for _ in range(length)]
+        alignment = [(i, min(length - 1, i + rng.randint(-1, 1))) for i in range(length)]
+        word_info = []
+        for w in src:
+            entry = vocabulary.get(w)
+            word_info.append(
+                {
+                    "original_word": w,
+                    "found_in_vocabulary": entry is not None,
+                    "match_type": "direct" if entry else "none",
+                    "vocabulary_entry": dict(entry) if entry else None,
+                }
+            )
+        results.append(
+            {
+                "original": " ".join(src) + ".",
+                "translated": " ".join(trg) + ".",
+                "src_tokenized": src,
+                "trg_tokenized": trg,
+                "alignment": alignment,
+                "wordInfo": word_info,
+            }
+        )
+    return results
+
+
+def verbose_payload(results):
+    return {
+        "originalText": " ".join(r["original"] for r in results),
+        "translatedText": " ".join(r["translated"] for r in results),
+        "alignment": [r["alignment"] for r in results],
+        "sentences": results,
+    }
+
+
+def measure(name, build, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    serialize_ms = (time.perf_counter() - started) / repeat * 1000
+
+    started = time.perf_counter()
+    gz = gzip.compress(body, compresslevel=6)
+    gzip_ms = (time.perf_counter() - started) * 1000
+    line = (
+        f"{name:<8} json={len(body) / 1024:9.1f}KB  serialize={serialize_ms:7.1f}ms  "
+        f"gzip={len(gz) / 1024:8.1f}KB ({gzip_ms:.1f}ms)"
+    )
+    if brotli is not None:
+        started = time.perf_counter()
+        br = brotli.compress(body, quality=5)
+        line += f"  br={len(br) / 1024:8.1f}KB ({(time.perf_counter() - started) * 1000:.1f}ms)"
+    print(line)
+    return len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sentences", type=int, default=500)
+    parser.add_argument("--vocab-size", type=int, default=400)
+    parser.add_argument("--known-ratio", type=float, default=0.6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = synthetic_results(args.sentences, args.vocab_size, args.known_ratio)
+    verbose = measure("verbose", lambda: verbose_payload(results), args.repeat)
+    compact = measure("compact", lambda: to_compact(results), args.repeat)
+    print(f"compact/verbose raw size: {compact / verbose:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# cli.py
+import threading
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from config import Config
+from review_maintenance import ReviewMaintenanceService
+from analytics_export import AnalyticsExportService, FORMATS
+
+
+@click.command("load-lemmas")
+@click.argument("language")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@with_appcontext
+def load_lemmas(language, path):
+    """
+    Loads a "form<TAB>lemma" file as the lemma table for LANGUAGE.
+    """
+    count = current_app.lemmatization_service.load_file(language, path)
+    click.echo(f"Loaded {count} forms for language '{language.lower()}'.")
+
+
+@click.command("load-dictionary")
+@click.argument("source_lang")
+@click.argument("target_lang")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--replace", is_flag=True, help="Overwrite existing translations.")
+@with_appcontext
+def load_dictionary(source_lang, target_lang, path, replace):
+    """
+    Bulk-loads a "word<TAB>translation" dump into the local dictionary.
+    """
+    count = current_app.dictionary_service.load_file(
+        path, source_lang, target_lang, replace=replace
+    )
+    click.echo(
+        f"Stored {count} entries for {source_lang.upper()} -> {target_lang.upper()}."
+    )
+
+
+@click.command("rebuild-deck-stats")
+@with_appcontext
+def rebuild_deck_stats():
+    """
+    Recomputes the deck summary counters from user_vocabulary.
+    """
+    current_app.deck_stats_service.rebuild()
+    click.echo("Deck summary rebuilt.")
+
+
+@click.command("maintain-reviews")
+@click.option(
+    "--retention-months",
+    type=int,
+    default=None,
+    help="Compact reviews older than this (default: REVIEW_RETENTION_MONTHS).",
+)
+@click.option("--no-vacuum", is_flag=True, help="Skip VACUUM/ANALYZE.")
+@with_appcontext
+def maintain_reviews(retention_months, no_vacuum):
+    """
+    Compacts old review_history rows into daily rollups and vacuums the database.
+    """
+    if retention_months is None:
+        retention_months = Config.REVIEW_RETENTION_MONTHS
+    report = ReviewMaintenanceService(current_app.db_service).run(
+        retention_months=retention_months, vacuum=not no_vacuum
+    )
+    for key, value in report.items():
+        click.echo(f"{key}: {value}")
+
+
+@click.command("export-analytics")
+@click.option("--output", "output_dir", default=None, help="Default: EXPORT_DIR.")
+@click.option(
+    "--format", "fmt", type=click.Choice(FORMATS), default=None, help="Default: EXPORT_FORMAT."
+)
+@click.option("--chunk-size", type=int, default=None, help="Default: EXPORT_CHUNK_SIZE.")
+@click.option("--full", is_flag=True, help="Ignore the watermark and export everything.")
+@with_appcontext
+def export_analytics(output_dir, fmt, chunk_size, full):
+    """
+    Exports review_history and user_vocabulary as columnar files. Only rows
+    added or changed since the last export are written unless --full is given.
+    """
+    report = AnalyticsExportService(
+        current_app.db_service,
+        output_dir=output_dir or Config.EXPORT_DIR,
+        fmt=fmt or Config.EXPORT_FORMAT,
+        chunk_size=chunk_size or Config.EXPORT_CHUNK_SIZE,
+        overlap_seconds=Config.EXPORT_OVERLAP_SECONDS,
+    ).export(incremental=not full)
+    for table in ("review_history", "user_vocabulary"):
+        click.echo(f"{table}: {report[table]['rows']} rows")
+        for path in report[table]["files"]:
+            click.echo(f"  {path}")
+
+
+@click.command("background-workers")
+@with_appcontext
+def background_workers():
+    """
+    Runs the periodic background work (see app.start_background_workers) in
+    this process until interrupted; for deployments with BACKGROUND_WORKERS=0.
+    """
+    from app import start_background_workers
+
+    start_background_workers(current_app._get_current_object())
+    click.echo("Background workers running; press Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+def register_commands(app):
+    """
+    Registers the maintenance commands on `flask --app app:create_app <command>`.
+    """
+    app.cli.add_command(load_lemmas)
+    app.cli.add_command(load_dictionary)
+    app.cli.add_command(rebuild_deck_stats)
+    app.cli.add_command(maintain_reviews)
+    app.cli.add_command(export_analytics)
+    app.cli.add_command(background_workers)
@@ -1,5 +1,6 @@
 # config.py
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,4 +12,92 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     DEEPL_API_KEY = os.environ.get('DEEPL_API_KEY', 'e686b367-4171-4fed-a77e-1d55a68778ab:fx')
+    DEEPL_API_URL = os.environ.get('DEEPL_API_URL', 'https://api-free.deepl.com/v2/translate')
+    # Seconds per DeepL request (both serving paths), and how long a caller waits
+    # for an identical request another caller already has in flight
+    DEEPL_TIMEOUT = float(os.environ.get('DEEPL_TIMEOUT', '30'))
+    DEEPL_WAIT_TIMEOUT = float(os.environ.get('DEEPL_WAIT_TIMEOUT', '60'))
+
+    # Opt-in per-request profiling. When enabled, requests carrying the
+    # PROFILE_HEADER header (or ?profile=1) dump a cProfile + SQL log into PROFILE_DIR.
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')
+
+    # Max entries in each of the sentence/word tokenization memo caches
+    TOKENIZATION_CACHE_SIZE = int(os.environ.get('TOKENIZATION_CACHE_SIZE', '10000'))
+
+    # Max DeepL translations kept in memory (shared by the sync and async paths)
+    TRANSLATION_CACHE_SIZE = int(os.environ.get('TRANSLATION_CACHE_SIZE', '10000'))
+
+    # Max (language, form) -> lemma entries kept in memory
+    LEMMA_CACHE_SIZE = int(os.environ.get('LEMMA_CACHE_SIZE', '50000'))
+
+    # Max words accepted by POST /api/dictionary/lookup/batch
+    DICTIONARY_BATCH_LIMIT = int(os.environ.get('DICTIONARY_BATCH_LIMIT', '500'))
+
+    # Shared alignment worker pool (see alignment_pool.py). When ALIGNMENT_SOCKET is
+    # set, web workers send alignment requests there instead of loading the model.
+    ALIGNMENT_SOCKET = os.environ.get('ALIGNMENT_SOCKET', '')
+    ALIGNMENT_POOL_WORKERS = int(os.environ.get('ALIGNMENT_POOL_WORKERS', '0'))  # 0 = physical cores
+    ALIGNMENT_TIMEOUT = float(os.environ.get('ALIGNMENT_TIMEOUT', '30'))
+    # Empty: the pool generates a key and shares it through <socket>.key (mode 0600)
+    ALIGNMENT_AUTHKEY = os.environ.get('ALIGNMENT_AUTHKEY', '')
+
+    # CPU inference profile for the aligner (0 = torch default / no limit)
+    ALIGNMENT_QUANTIZE = os.environ.get('ALIGNMENT_QUANTIZE', '').lower() in ('1', 'true', 'yes')
+    ALIGNMENT_INTRA_OP_THREADS = int(os.environ.get('ALIGNMENT_INTRA_OP_THREADS', '0'))
+    ALIGNMENT_INTER_OP_THREADS = int(os.environ.get('ALIGNMENT_INTER_OP_THREADS', '0'))
+    ALIGNMENT_MAX_TOKENS = int(os.environ.get('ALIGNMENT_MAX_TOKENS', '0'))
+
+    # Aligner per language pair, as JSON, e.g.
+    # {"SV-EN": {"model": "distilbert-base-multilingual-cased"}, "*": {"model": "bert"}}
+    # Models load on first use and are evicted LRU above the memory budget (0 = unlimited).
+    ALIGNMENT_MODELS = json.loads(os.environ.get('ALIGNMENT_MODELS', '{}'))
+    ALIGNMENT_MEMORY_BUDGET_MB = float(os.environ.get('ALIGNMENT_MEMORY_BUDGET_MB', '0'))
+
+    # Seconds between roll-forwards of the deck summary's due buckets
+    DECK_STATS_ROLL_INTERVAL = float(os.environ.get('DECK_STATS_ROLL_INTERVAL', '3600'))
+
+    # Background timers (see app.start_background_workers) are started by the serving
+    # entry points (python app.py, asgi.py), never by create_app or `flask` commands.
+    # With several server processes, set this to 0 and run `flask background-workers` once.
+    BACKGROUND_WORKERS = os.environ.get('BACKGROUND_WORKERS', '1').lower() in ('1', 'true', 'yes')
+
+    # Background document translation jobs
+    JOB_MAX_WORKERS = int(os.environ.get('JOB_MAX_WORKERS', '4'))  # chunks in flight per process
+    JOB_MAX_CHUNKS_PER_JOB = int(os.environ.get('JOB_MAX_CHUNKS_PER_JOB', '2'))
+    JOB_CHUNK_CHARS = int(os.environ.get('JOB_CHUNK_CHARS', '2000'))
+    JOB_CHUNK_LEASE_SECONDS = float(os.environ.get('JOB_CHUNK_LEASE_SECONDS', '600'))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+    JOB_SWEEP_INTERVAL = float(os.environ.get('JOB_SWEEP_INTERVAL', '60'))
+
+    # Reviews older than this many months are compacted into daily rollups
+    # by `flask maintain-reviews` (0 = keep every review)
+    REVIEW_RETENTION_MONTHS = int(os.environ.get('REVIEW_RETENTION_MONTHS', '0'))
+
+    # Multi-user: requests act for the user in this header, which the
+    # authenticating proxy in front of the app must set (and strip from clients)
+    USER_ID_HEADER = os.environ.get('USER_ID_HEADER', 'X-User-ID')
+    # Optional sharding of per-user tables, e.g. 'sqlite:///shards/users_{shard}.db'
+    DB_SHARD_URI_TEMPLATE = os.environ.get('DB_SHARD_URI_TEMPLATE', '')
+    DB_SHARD_COUNT = int(os.environ.get('DB_SHARD_COUNT', '16'))
+
+    # Review sessions: max cards per GET /api/fsrs/session and reviews per batch
+    REVIEW_SESSION_MAX_CARDS = int(os.environ.get('REVIEW_SESSION_MAX_CARDS', '200'))
+    REVIEW_BATCH_LIMIT = int(os.environ.get('REVIEW_BATCH_LIMIT', '500'))
+
+    # Columnar analytics exports (`flask export-analytics`): parquet, arrow or npz
+    EXPORT_DIR = os.environ.get('EXPORT_DIR', 'exports')
+    EXPORT_FORMAT = os.environ.get('EXPORT_FORMAT', 'parquet')
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '50000'))
+    # Incremental runs re-read cards changed this many seconds before the last
+    # exported updated_at, to catch writes that committed after that export read
+    EXPORT_OVERLAP_SECONDS = float(os.environ.get('EXPORT_OVERLAP_SECONDS', '300'))
+
+    # Async serving mode (asgi.py): pooled DeepL connections and the thread pool
+    # that runs alignment / DB work off the event loop
+    DEEPL_MAX_CONNECTIONS = int(os.environ.get('DEEPL_MAX_CONNECTIONS', '100'))
+    ASYNC_EXECUTOR_WORKERS = int(os.environ.get('ASYNC_EXECUTOR_WORKERS', '8'))
+
     # For advanced usage, you might store other configuration here (e.g. SECRET_KEY).
@@ -1,22 +1,222 @@
 # db.py
-from sqlalchemy import create_engine
+import os
+import threading
+import zlib
+
+from sqlalchemy import and_, bindparam, create_engine, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateColumn
 from config import Config
-from models import Base
+from models import (
+    DEFAULT_USER_ID,
+    Base,
+    Vocabulary,
+    ReviewHistory,
+    ReviewDailyRollup,
+    DeckSummary,
+)
+
+# Per-learner tables. With sharding enabled they live in the user's shard;
+# everything else (word lists, lemmas, dictionary, jobs) stays in the main DB.
+USER_TABLES = [
+    Vocabulary.__table__,
+    ReviewHistory.__table__,
+    ReviewDailyRollup.__table__,
+    DeckSummary.__table__,
+]
+
+# Dialects with INSERT ... ON CONFLICT (dictionary store, deck summary counts)
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Rows per transaction when moving per-user rows from the main DB to shards
+MOVE_BATCH_SIZE = 5000
+
 
 class DBService:
     def __init__(self):
         self.engine = create_engine(Config.SQLALCHEMY_DATABASE_URI, echo=Config.SQLALCHEMY_ECHO)
         self.SessionLocal = sessionmaker(bind=self.engine)
 
+        # Optional sharding of user tables, e.g. "sqlite:///shards/users_{shard}.db"
+        self.shard_uri_template = Config.DB_SHARD_URI_TEMPLATE
+        self.shard_count = Config.DB_SHARD_COUNT if self.shard_uri_template else 0
+        self._shards = {}  # shard number -> (engine, sessionmaker)
+        self._shards_lock = threading.Lock()
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_count > 0
+
     def create_tables(self):
         """
         Creates all tables in the database. Should be called once at startup.
         """
+        self._migrate(self.engine)
         Base.metadata.create_all(self.engine)
+        self._create_missing_indexes(self.engine, Base.metadata.sorted_tables)
 
-    def get_session(self):
+    @staticmethod
+    def _create_missing_indexes(engine, tables):
+        # create_all skips indexes of tables that already exist
+        for table in tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+
+    def _migrate(self, engine):
+        """
+        Minimal in-place migration for tables created by older versions.
+        Tables missing a primary-key or foreign-key column (e.g. user_id) are
+        rebuilt and their rows copied with the column's default; other missing
+        columns are added with ALTER TABLE.
+        """
+        with engine.begin() as conn:
+            inspector = inspect(conn)
+            existing_tables = set(inspector.get_table_names())
+            for table in Base.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+                existing_columns = [c["name"] for c in inspector.get_columns(table.name)]
+                missing = [c for c in table.columns if c.name not in existing_columns]
+                if not missing:
+                    continue
+                if any(c.primary_key or c.foreign_keys for c in missing):
+                    self._rebuild_table(conn, inspector, table, existing_columns, missing)
+                else:
+                    for column in missing:
+                        ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                        conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'))
+
+    @staticmethod
+    def _rebuild_table(conn, inspector, table, existing_columns, missing):
+        old_name = f"{table.name}_pre_migration"
+        # Index names are global in SQLite; free them for the new table
+        for index in inspector.get_indexes(table.name):
+            conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+        conn.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{old_name}"'))
+        table.create(conn)
+
+        kept = [c for c in existing_columns if c in table.columns]
+        params = {}
+        for i, column in enumerate(missing):
+            default = column.default.arg if column.default is not None else None
+            params[f"m{i}"] = None if callable(default) else default
+        columns_sql = ", ".join(f'"{c}"' for c in [c.name for c in missing] + kept)
+        values_sql = ", ".join([f":m{i}" for i in range(len(missing))] + [f'"{c}"' for c in kept])
+        conn.execute(
+            text(
+                f'INSERT INTO "{table.name}" ({columns_sql}) '
+                f'SELECT {values_sql} FROM "{old_name}"'
+            ),
+            params,
+        )
+        conn.execute(text(f'DROP TABLE "{old_name}"'))
+
+    def shard_for(self, user_id: str) -> int:
+        """
+        Stable shard number for a user.
+        """
+        return zlib.crc32(user_id.encode("utf-8")) % self.shard_count
+
+    def _shard(self, shard: int):
+        entry = self._shards.get(shard)
+        if entry is not None:
+            return entry
+        with self._shards_lock:
+            entry = self._shards.get(shard)
+            if entry is None:
+                uri = self.shard_uri_template.format(shard=shard)
+                if uri.startswith("sqlite:///"):
+                    directory = os.path.dirname(uri[len("sqlite:///") :])
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                engine = create_engine(uri, echo=Config.SQLALCHEMY_ECHO)
+                self._migrate(engine)
+                Base.metadata.create_all(engine, tables=USER_TABLES)
+                self._create_missing_indexes(engine, USER_TABLES)
+                entry = (engine, sessionmaker(bind=engine))
+                self._shards[shard] = entry
+        return entry
+
+    def move_rows_to_shards(self) -> int:
+        """
+        With sharding enabled, moves per-user rows still in the main DB (written
+        before sharding was turned on) into their users' shards, where all reads
+        go. Rows whose key already exists in the shard keep the shard's version;
+        moved reviews get new ids. deck_summary rows are dropped rather than
+        moved: callers rebuild the summary when rows were moved.
+        Returns the number of rows moved (0 when not sharded).
+        """
+        if not self.sharded:
+            return 0
+        moved = 0
+        with self.engine.connect() as main:
+            for table in USER_TABLES:
+                if table is DeckSummary.__table__:
+                    main.execute(table.delete())
+                    main.commit()
+                    continue
+                moved += self._move_table_rows(main, table)
+        return moved
+
+    def _move_table_rows(self, main, table) -> int:
+        primary_key = list(table.primary_key.columns)
+        # Autoincrement ids are only unique per database
+        generated = table.autoincrement_column
+        delete = table.delete().where(
+            and_(*[c == bindparam(f"pk_{c.name}") for c in primary_key])
+        )
+        moved = 0
+        while True:
+            rows = main.execute(select(table).limit(MOVE_BATCH_SIZE)).mappings().all()
+            if not rows:
+                return moved
+            by_shard = {}
+            for row in rows:
+                shard = self.shard_for(row["user_id"] or DEFAULT_USER_ID)
+                by_shard.setdefault(shard, []).append(
+                    {k: v for k, v in row.items() if generated is None or k != generated.name}
+                )
+            for shard, values in by_shard.items():
+                engine = self._shard(shard)[0]
+                insert = UPSERT_DIALECTS.get(engine.dialect.name)
+                if insert is not None and generated is None:
+                    stmt = insert(table).on_conflict_do_nothing()
+                else:
+                    stmt = table.insert()
+                with engine.begin() as conn:
+                    conn.execute(stmt, values)
+            # A crash between the shard commit and this one copies a batch twice;
+            # only reviews (no natural key) can then be duplicated
+            main.execute(
+                delete, [{f"pk_{c.name}": row[c.name] for c in primary_key} for row in rows]
+            )
+            main.commit()
+            moved += len(rows)
+
+    def get_session(self, user_id: str = None):
         """
         Provides a new SQLAlchemy session. Caller is responsible for closing it.
+        Pass user_id for queries on per-user tables; with sharding enabled the
+        session is bound to that user's shard.
+        """
+        if user_id is None or not self.sharded:
+            return self.SessionLocal()
+        return self._shard(self.shard_for(user_id))[1]()
+
+    def user_engines(self):
+        """
+        All engines holding per-user tables (every shard, or just the main DB).
+        """
+        if not self.sharded:
+            return [self.engine]
+        return [self._shard(i)[0] for i in range(self.shard_count)]
+
+    def user_session_factories(self):
+        """
+        Session factories for every database holding per-user tables, for
+        maintenance jobs that work across all users.
         """
-        return self.SessionLocal()
+        if not self.sharded:
+            return [self.SessionLocal]
+        return [self._shard(i)[1] for i in range(self.shard_count)]
@@ -0,0 +1,258 @@
+# deck_stats.py
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from db import UPSERT_DIALECTS, DBService
+from models import DEFAULT_USER_ID, DeckSummary, Vocabulary
+
+NO_DUE_DAY = date(9999, 12, 31)
+STATE_NAMES = {1: "learning", 2: "review", 3: "relearning"}
+
+
+def due_day(due) -> date:
+    if due is None:
+        return NO_DUE_DAY
+    if due.tzinfo is not None:
+        due = due.astimezone(timezone.utc)
+    return due.date()
+
+
+class DeckStatsService:
+    """
+    Maintains the deck_summary table: card counts by (user, language, state, due
+    day).
+    FSRS_Service calls record() inside its own transaction whenever a card is
+    added or reviewed, so reading the stats never has to scan user_vocabulary.
+    """
+
+    def __init__(self, db_service: DBService):
+        self.db_service = db_service
+        self._timer = None
+
+    def record(
+        self,
+        session: Session,
+        language: str,
+        old=None,
+        new=None,
+        user_id: str = DEFAULT_USER_ID,
+    ):
+        """
+        Moves one card from `old` to `new`, each a (state, due) tuple or None.
+        Does not commit; the change lands with the caller's transaction.
+        """
+        if old is not None:
+            self._bump(session, user_id, language, old[0], due_day(old[1]), -1)
+        if new is not None:
+            self._bump(session, user_id, language, new[0], due_day(new[1]), 1)
+
+    def record_many(
+        self, session: Session, language: str, new_cards, user_id: str = DEFAULT_USER_ID
+    ):
+        """
+        Adds many new cards, given as (state, due) tuples, with one update per
+        (state, due day) instead of one per card. Does not commit.
+        """
+        counts = {}
+        for state, due in new_cards:
+            key = (state, due_day(due))
+            counts[key] = counts.get(key, 0) + 1
+        for (state, day), n in counts.items():
+            self._bump(session, user_id, language, state, day, n)
+
+    def _bump(
+        self,
+        session: Session,
+        user_id: str,
+        language: str,
+        state: int,
+        day: date,
+        delta: int,
+    ):
+        # Days before yesterday are folded into yesterday by roll_forward, so a
+        # card that was due on one of them is counted in yesterday's row
+        day = max(day, datetime.now(timezone.utc).date() - timedelta(days=1))
+        insert = UPSERT_DIALECTS.get(session.get_bind().dialect.name)
+        if insert is None:
+            return self._bump_rows(session, user_id, language, state, day, delta)
+
+        stmt = insert(DeckSummary).values(
+            user_id=user_id, language=language, state=state, due_day=day, count=delta
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "language", "state", "due_day"],
+            set_={"count": DeckSummary.count + stmt.excluded.count},
+        )
+        session.execute(stmt)
+
+    @staticmethod
+    def _bump_rows(
+        session: Session,
+        user_id: str,
+        language: str,
+        state: int,
+        day: date,
+        delta: int,
+    ):
+        """
+        Update-then-insert fallback for dialects without an upsert.
+        """
+        updated = (
+            session.query(DeckSummary)
+            .filter(
+                DeckSummary.user_id == user_id,
+                DeckSummary.language == language,
+                DeckSummary.state == state,
+                DeckSummary.due_day == day,
+            )
+            .update({DeckSummary.count: DeckSummary.count + delta}, synchronize_session=False)
+        )
+        if not updated:
+            session.add(
+                DeckSummary(
+                    user_id=user_id, language=language, state=state, due_day=day, count=delta
+                )
+            )
+            session.flush()
+
+    def rebuild(self):
+        """
+        Recomputes the whole summary from user_vocabulary (full scan of every
+        shard). Used on first start and to repair drift.
+        """
+        for session_factory in self.db_service.user_session_factories():
+            self._rebuild(session_factory)
+        self.roll_forward()
+
+    @staticmethod
+    def _rebuild(session_factory):
+        counts = {}
+        session: Session = session_factory()
+        try:
+            rows = session.query(
+                Vocabulary.user_id, Vocabulary.language, Vocabulary.state, Vocabulary.due
+            ).yield_per(5000)
+            for user_id, language, state, due in rows:
+                key = (user_id, language, state, due_day(due))
+                counts[key] = counts.get(key, 0) + 1
+
+            session.query(DeckSummary).delete()
+            session.add_all(
+                DeckSummary(user_id=u, language=l, state=s, due_day=d, count=c)
+                for (u, l, s, d), c in counts.items()
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def ensure_initialized(self):
+        for session_factory in self.db_service.user_session_factories():
+            session: Session = session_factory()
+            try:
+                has_summary = session.query(DeckSummary).first() is not None
+                has_cards = session.query(Vocabulary.word).first() is not None
+            finally:
+                session.close()
+            if has_cards and not has_summary:
+                self._rebuild(session_factory)
+                self._roll_forward(
+                    session_factory, datetime.now(timezone.utc).date() - timedelta(days=1)
+                )
+
+    def roll_forward(self, today: date = None):
+        """
+        Folds all rows older than yesterday into yesterday's row and drops empty
+        rows. Bucket boundaries themselves are computed at read time.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        yesterday = today - timedelta(days=1)
+        for session_factory in self.db_service.user_session_factories():
+            self._roll_forward(session_factory, yesterday)
+
+    def _roll_forward(self, session_factory, yesterday: date):
+        session: Session = session_factory()
+        try:
+            stale = (
+                session.query(
+                    DeckSummary.user_id,
+                    DeckSummary.language,
+                    DeckSummary.state,
+                    func.sum(DeckSummary.count),
+                )
+                .filter(DeckSummary.due_day < yesterday)
+                .group_by(DeckSummary.user_id, DeckSummary.language, DeckSummary.state)
+                .all()
+            )
+            if stale:
+                session.query(DeckSummary).filter(DeckSummary.due_day < yesterday).delete(
+                    synchronize_session=False
+                )
+                for user_id, language, state, total in stale:
+                    self._bump(
+                        session, user_id, language, state, yesterday, int(total or 0)
+                    )
+            session.query(DeckSummary).filter(DeckSummary.count <= 0).delete(
+                synchronize_session=False
+            )
+            session.commit()
+        finally:
+            session.close()
+
+    def start_roll_forward(self, interval_seconds: float):
+        """
+        Runs roll_forward() every `interval_seconds` on a daemon timer.
+        """
+
+        def run():
+            try:
+                self.roll_forward()
+            except Exception as e:
+                print(f"Warning: Deck summary roll-forward failed: {str(e)}")
+            self.start_roll_forward(interval_seconds)
+
+        self._timer = threading.Timer(interval_seconds, run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def get_stats(self, language: str = None, user_id: str = DEFAULT_USER_ID):
+        """
+        Returns the user's per-language counts:
+        {"sv": {"total": n,
+                "states": {"learning": n, "review": n, "relearning": n},
+                "due": {"overdue": n, "today": n, "next_7_days": n}}}
+        """
+        today = datetime.now(timezone.utc).date()
+        week_end = today + timedelta(days=7)
+        session: Session = self.db_service.get_session(user_id)
+        try:
+            # Every row counts, including negative ones: a card can leave a day
+            # row whose +1 was already folded elsewhere
+            query = session.query(DeckSummary).filter(DeckSummary.user_id == user_id)
+            if language:
+                query = query.filter(DeckSummary.language == language.lower())
+
+            stats = {}
+            for row in query.all():
+                lang = stats.setdefault(
+                    row.language,
+                    {
+                        "total": 0,
+                        "states": {name: 0 for name in STATE_NAMES.values()},
+                        "due": {"overdue": 0, "today": 0, "next_7_days": 0},
+                    },
+                )
+                lang["total"] += row.count
+                state_name = STATE_NAMES.get(row.state, str(row.state))
+                lang["states"][state_name] = lang["states"].get(state_name, 0) + row.count
+                if row.due_day < today:
+                    lang["due"]["overdue"] += row.count
+                elif row.due_day == today:
+                    lang["due"]["today"] += row.count
+                elif row.due_day <= week_end:
+                    lang["due"]["next_7_days"] += row.count
+            return stats
+        finally:
+            session.close()
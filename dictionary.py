@@ -0,0 +1,328 @@
+# dictionary.py
+import unicodedata
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db import UPSERT_DIALECTS, DBService
+from lemmatization import QUERY_CHUNK_SIZE
+from models import DEFAULT_USER_ID, DictionaryEntry, Vocabulary
+from translation import TranslationService
+
+# Where a dictionary answer came from, cheapest first
+TIER_CACHE = "cache"
+TIER_VOCABULARY = "vocabulary"
+TIER_DICTIONARY = "dictionary"
+TIER_DEEPL = "deepl"
+
+# Rows per transaction when bulk-loading dictionary dumps
+LOAD_CHUNK_SIZE = 5000
+
+
+def normalize_word(word: str) -> str:
+    """
+    Normalized dictionary key: NFC, stripped and lowercased.
+    """
+    return unicodedata.normalize("NFC", word).strip().lower()
+
+
+class DictionaryService:
+    """
+    Resolves single-word translations through progressively more expensive tiers:
+    the in-process translation cache, then translations already stored in the
+    local tables (user vocabulary, then the bilingual dictionary), then one
+    batched DeepL call for whatever is left. DeepL answers are written back to
+    the dictionary table so each word is only paid for once.
+    """
+
+    def __init__(self, db_service: DBService, translation_service: TranslationService):
+        self.db_service = db_service
+        self.translation_service = translation_service
+
+    def translate_word(
+        self,
+        word: str,
+        language: str,
+        target_lang: str = "EN",
+        user_id: str = DEFAULT_USER_ID,
+    ) -> str:
+        return self.lookup_many([word], language, target_lang, user_id)[0]["translation"]
+
+    def lookup_many(
+        self,
+        words: list[str],
+        language: str,
+        target_lang: str = "EN",
+        user_id: str = DEFAULT_USER_ID,
+    ):
+        """
+        The vocabulary tier only consults the given user's deck.
+        Returns one dict per input word:
+          {"word": ..., "language": ..., "translation": ...,
+           "source": "cache"|"vocabulary"|"dictionary"|"deepl"}
+        """
+        source_lang = language.upper()
+        target_lang = target_lang.upper()
+        resolved = {}
+
+        # 1) In-process cache
+        pending = []
+        for word in dict.fromkeys(words):
+            cached = self.translation_service.get_cached(word, source_lang, target_lang)
+            if cached is not None:
+                resolved[word] = (cached, TIER_CACHE)
+            else:
+                pending.append(word)
+
+        # 2) Local tables
+        if pending:
+            local = self._lookup_vocabulary(
+                pending, language.lower(), target_lang, user_id
+            )
+            for word, translation in local.items():
+                resolved[word] = (translation, TIER_VOCABULARY)
+            pending = [w for w in pending if w not in resolved]
+
+        if pending:
+            local = self._lookup_dictionary(pending, source_lang, target_lang)
+            for word, translation in local.items():
+                resolved[word] = (translation, TIER_DICTIONARY)
+            pending = [w for w in pending if w not in resolved]
+
+        # 3) One batched DeepL call for the rest
+        if pending:
+            translations = self.translation_service.translate_batch(
+                pending, source_lang=source_lang, target_lang=target_lang
+            )
+            for word, translation in zip(pending, translations):
+                resolved[word] = (translation, TIER_DEEPL)
+            self.store(
+                [(w, t) for w, t in zip(pending, translations) if w and t],
+                source_lang,
+                target_lang,
+            )
+
+        return [
+            {
+                "word": word,
+                "language": language,
+                "translation": resolved[word][0],
+                "source": resolved[word][1],
+            }
+            for word in words
+        ]
+
+    @staticmethod
+    def _group_by_form(words: list[str]) -> dict:
+        by_form = {}
+        for word in words:
+            by_form.setdefault(normalize_word(word), []).append(word)
+        return by_form
+
+    def _lookup_vocabulary(
+        self, words: list[str], language: str, target_lang: str, user_id: str
+    ) -> dict:
+        # user_vocabulary translations are always stored in English
+        if target_lang != "EN":
+            return {}
+
+        by_form = self._group_by_form(words)
+        forms = list(by_form)
+
+        found = {}
+        session: Session = self.db_service.get_session(user_id)
+        try:
+            for i in range(0, len(forms), QUERY_CHUNK_SIZE):
+                chunk = forms[i : i + QUERY_CHUNK_SIZE]
+                rows = (
+                    session.query(Vocabulary.word, Vocabulary.translation)
+                    .filter(
+                        Vocabulary.user_id == user_id,
+                        Vocabulary.language == language,
+                        Vocabulary.word.in_(chunk),
+                        Vocabulary.translation.isnot(None),
+                        Vocabulary.translation != "",
+                    )
+                    .all()
+                )
+                for form, translation in rows:
+                    for word in by_form[form]:
+                        found[word] = translation
+        finally:
+            session.close()
+        return found
+
+    def _lookup_dictionary(self, words: list[str], source_lang: str, target_lang: str) -> dict:
+        by_form = self._group_by_form(words)
+        forms = list(by_form)
+
+        found = {}
+        session: Session = self.db_service.get_session()
+        try:
+            for i in range(0, len(forms), QUERY_CHUNK_SIZE):
+                chunk = forms[i : i + QUERY_CHUNK_SIZE]
+                rows = (
+                    session.query(DictionaryEntry.word, DictionaryEntry.translation)
+                    .filter(
+                        DictionaryEntry.source_lang == source_lang,
+                        DictionaryEntry.target_lang == target_lang,
+                        DictionaryEntry.word.in_(chunk),
+                    )
+                    .all()
+                )
+                for form, translation in rows:
+                    for word in by_form[form]:
+                        found[word] = translation
+        finally:
+            session.close()
+        return found
+
+    def store(
+        self,
+        pairs,
+        source_lang: str,
+        target_lang: str,
+        origin: str = "deepl",
+        replace: bool = False,
+    ) -> int:
+        """
+        Writes (word, translation) pairs to the dictionary table. Existing entries
+        are kept unless replace=True. Returns the number of rows inserted or updated.
+        """
+        source_lang = source_lang.upper()
+        target_lang = target_lang.upper()
+        entries = {}
+        for word, translation in pairs:
+            form = normalize_word(word)
+            if form and translation:
+                entries.setdefault(form, translation.strip())
+        if not entries:
+            return 0
+
+        insert = UPSERT_DIALECTS.get(self.db_service.engine.dialect.name)
+        if insert is None:
+            return self._store_rows(entries, source_lang, target_lang, origin, replace)
+
+        # Conflicting rows are skipped (or updated) one by one, so a word stored
+        # concurrently by another worker never costs the rest of the batch
+        stmt = insert(DictionaryEntry)
+        if replace:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["source_lang", "target_lang", "word"],
+                set_={
+                    "translation": stmt.excluded.translation,
+                    "origin": stmt.excluded.origin,
+                },
+                where=DictionaryEntry.translation != stmt.excluded.translation,
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=["source_lang", "target_lang", "word"]
+            )
+        rows = [
+            {
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "word": form,
+                "translation": translation,
+                "origin": origin,
+            }
+            for form, translation in entries.items()
+        ]
+        session: Session = self.db_service.get_session()
+        try:
+            connection = session.connection()
+            written = 0
+            for i in range(0, len(rows), QUERY_CHUNK_SIZE):
+                written += connection.execute(stmt, rows[i : i + QUERY_CHUNK_SIZE]).rowcount
+            session.commit()
+            return written
+        finally:
+            session.close()
+
+    def _store_rows(
+        self, entries: dict, source_lang: str, target_lang: str, origin: str, replace: bool
+    ) -> int:
+        """
+        store() for databases without INSERT ... ON CONFLICT: one savepoint per
+        new row, so a conflicting row is skipped without losing the others.
+        """
+        session: Session = self.db_service.get_session()
+        try:
+            existing = {}
+            forms = list(entries)
+            for i in range(0, len(forms), QUERY_CHUNK_SIZE):
+                chunk = forms[i : i + QUERY_CHUNK_SIZE]
+                rows = (
+                    session.query(DictionaryEntry)
+                    .filter(
+                        DictionaryEntry.source_lang == source_lang,
+                        DictionaryEntry.target_lang == target_lang,
+                        DictionaryEntry.word.in_(chunk),
+                    )
+                    .all()
+                )
+                existing.update((r.word, r) for r in rows)
+
+            written = 0
+            for form, translation in entries.items():
+                row = existing.get(form)
+                if row is None:
+                    try:
+                        with session.begin_nested():
+                            session.add(
+                                DictionaryEntry(
+                                    source_lang=source_lang,
+                                    target_lang=target_lang,
+                                    word=form,
+                                    translation=translation,
+                                    origin=origin,
+                                )
+                            )
+                        written += 1
+                    except IntegrityError:
+                        # Another worker stored this word concurrently; theirs is as good
+                        pass
+                elif replace and row.translation != translation:
+                    row.translation = translation
+                    row.origin = origin
+                    written += 1
+            session.commit()
+            return written
+        finally:
+            session.close()
+
+    def load_file(
+        self,
+        path: str,
+        source_lang: str,
+        target_lang: str,
+        delimiter: str = "\t",
+        replace: bool = False,
+    ) -> int:
+        """
+        Bulk-loads an offline "word<TAB>translation" dump, streaming it in chunks.
+        Blank lines and lines starting with '#' are skipped.
+        Returns the number of rows inserted or updated.
+        """
+        written = 0
+        batch = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                parts = line.split(delimiter)
+                if len(parts) < 2:
+                    continue
+                batch.append((parts[0], parts[1]))
+                if len(batch) >= LOAD_CHUNK_SIZE:
+                    written += self.store(
+                        batch, source_lang, target_lang, origin="import", replace=replace
+                    )
+                    batch = []
+        if batch:
+            written += self.store(
+                batch, source_lang, target_lang, origin="import", replace=replace
+            )
+        return written
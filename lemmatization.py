@@ -0,0 +1,120 @@
+# lemmatization.py
+import threading
+
+from sqlalchemy.orm import Session
+
+from cache import LRUCache
+from db import DBService
+from models import Lemma
+
+# Max bound parameters per IN (...) query; stays under SQLite's variable limit
+QUERY_CHUNK_SIZE = 500
+
+
+class LemmatizationService:
+    """
+    Resolves surface forms to lemmas using the per-language `lemmas` table,
+    with a bounded memo cache in front of it. WordNet is only consulted for
+    English forms that are not in the table.
+    """
+
+    def __init__(self, db_service: DBService, cache_size: int = 50000):
+        self.db_service = db_service
+        self.cache = LRUCache(cache_size)
+        self._wordnet = None
+        self._wordnet_lock = threading.Lock()
+
+    def _wordnet_lemmatize(self, word: str) -> str:
+        if self._wordnet is None:
+            with self._wordnet_lock:
+                if self._wordnet is None:
+                    from nltk.stem import WordNetLemmatizer
+
+                    self._wordnet = WordNetLemmatizer()
+        return self._wordnet.lemmatize(word)
+
+    def lemmatize(self, word: str, language: str) -> str:
+        return self.lemmatize_many([word], language)[word.lower()]
+
+    def lemmatize_many(self, words, language: str) -> dict:
+        """
+        Returns {lowercased form: lemma} for all given words. Cache misses are
+        resolved with a single IN query per chunk against the lemma table.
+        Forms without a known lemma map to themselves.
+        """
+        lang = language.lower()
+        result = {}
+        misses = []
+        for w in words:
+            form = w.lower()
+            if form in result:
+                continue
+            lemma = self.cache.get((lang, form))
+            if lemma is None:
+                misses.append(form)
+                result[form] = form
+            else:
+                result[form] = lemma
+
+        if not misses:
+            return result
+
+        found = {}
+        session: Session = self.db_service.get_session()
+        try:
+            for i in range(0, len(misses), QUERY_CHUNK_SIZE):
+                chunk = misses[i : i + QUERY_CHUNK_SIZE]
+                rows = (
+                    session.query(Lemma.form, Lemma.lemma)
+                    .filter(Lemma.language == lang, Lemma.form.in_(chunk))
+                    .all()
+                )
+                found.update(rows)
+        finally:
+            session.close()
+
+        for form in misses:
+            lemma = found.get(form)
+            if lemma is None:
+                # WordNet is English-only; for other languages it is wasted work
+                lemma = self._wordnet_lemmatize(form) if lang == "en" else form
+            self.cache.set((lang, form), lemma)
+            result[form] = lemma
+        return result
+
+    def load_file(self, language: str, path: str, delimiter: str = "\t") -> int:
+        """
+        Replaces the lemma table for `language` with the contents of a
+        "form<TAB>lemma" file (blank lines and lines starting with '#' are skipped).
+        Returns the number of forms loaded.
+        """
+        lang = language.lower()
+        session: Session = self.db_service.get_session()
+        try:
+            session.query(Lemma).filter(Lemma.language == lang).delete()
+            seen = set()
+            batch = []
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    parts = line.split(delimiter)
+                    if len(parts) < 2:
+                        continue
+                    form, lemma = parts[0].strip().lower(), parts[1].strip().lower()
+                    if not form or not lemma or form in seen:
+                        continue
+                    seen.add(form)
+                    batch.append({"language": lang, "form": form, "lemma": lemma})
+                    if len(batch) >= 5000:
+                        session.bulk_insert_mappings(Lemma, batch)
+                        batch = []
+            if batch:
+                session.bulk_insert_mappings(Lemma, batch)
+            session.commit()
+        finally:
+            session.close()
+
+        self.cache.clear()
+        return len(seen)
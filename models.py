@@ -5,14 +5,21 @@ from sqlalchemy import (
     Integer,
     Float,
     DateTime,
+    Date,
+    Boolean,
+    Text,
     ForeignKey,
     ForeignKeyConstraint,
+    Index,
 )
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime, timezone
 
 Base = declarative_base()
 
+# Owner of rows created before user scoping, and of requests without a user
+DEFAULT_USER_ID = "default"
+
 
 class Vocabulary(Base):
     """
@@ -21,6 +28,10 @@ class Vocabulary(Base):
 
     __tablename__ = "user_vocabulary"
 
+    # user_id leads the primary key so every per-user query is an index range scan
+    user_id = Column(
+        String, primary_key=True, default=DEFAULT_USER_ID, server_default=DEFAULT_USER_ID
+    )
     word = Column(String, primary_key=True)
     language = Column(String, primary_key=True)
     translation = Column(String, nullable=True)
@@ -34,6 +45,22 @@ class Vocabulary(Base):
     difficulty = Column(Float, nullable=True)  # Changed: Allow NULL, removed default
     last_review = Column(DateTime, nullable=True, default=None)
     step = Column(Integer, default=0)
+    # Bumped on every review; clients send it back to detect conflicting reviews
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Last insert/update, used as the watermark for incremental analytics exports
+    # (NULL for rows that predate the column)
+    updated_at = Column(
+        DateTime,
+        nullable=True,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        Index("ix_user_vocabulary_user_due", "user_id", "due"),
+        Index("ix_user_vocabulary_updated_at", "updated_at"),
+    )
 
     # Relationships
     reviews = relationship(
@@ -49,6 +76,9 @@ class ReviewHistory(Base):
     __tablename__ = "review_history"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(
+        String, nullable=False, default=DEFAULT_USER_ID, server_default=DEFAULT_USER_ID
+    )
     review_time = Column(
         DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
     )
@@ -57,16 +87,27 @@ class ReviewHistory(Base):
     rating = Column(Integer, nullable=False)  # 1=Again, 2=Hard, 3=Good, 4=Easy
     state = Column(Integer, nullable=True)  # 1=Learning, 2=Review, 3=Relearning
 
-    # Composite Foreign Key Constraint
+    # Composite Foreign Key Constraint, plus indexes for per-card history
+    # (card ordered by time) and per-user time-range scans (analytics, retention)
     __table_args__ = (
         ForeignKeyConstraint(
-            ["word", "language"], ["user_vocabulary.word", "user_vocabulary.language"]
+            ["user_id", "word", "language"],
+            [
+                "user_vocabulary.user_id",
+                "user_vocabulary.word",
+                "user_vocabulary.language",
+            ],
         ),
+        Index(
+            "ix_review_history_card_time", "user_id", "word", "language", "review_time"
+        ),
+        Index("ix_review_history_user_time", "user_id", "review_time"),
+        Index("ix_review_history_review_time", "review_time"),
     )
 
     # Relationships
     vocabulary = relationship(
-        "Vocabulary", back_populates="reviews", foreign_keys=[word, language]
+        "Vocabulary", back_populates="reviews", foreign_keys=[user_id, word, language]
     )
 
 
@@ -79,3 +120,117 @@ class WordList(Base):
     language = Column(String, primary_key=True)
     level = Column(String, primary_key=True)
     word = Column(String, primary_key=True)
+
+
+class Lemma(Base):
+    """
+    Precomputed surface form -> lemma table, one set of rows per language.
+    """
+
+    __tablename__ = "lemmas"
+    language = Column(String, primary_key=True)
+    form = Column(String, primary_key=True)
+    lemma = Column(String, nullable=False)
+
+
+class DictionaryEntry(Base):
+    """
+    Local bilingual dictionary, filled from DeepL responses and offline dumps.
+    The composite primary key doubles as the lookup index.
+    """
+
+    __tablename__ = "dictionary_entries"
+    source_lang = Column(String, primary_key=True)  # DeepL code, e.g. "SV"
+    target_lang = Column(String, primary_key=True)  # DeepL code, e.g. "EN"
+    word = Column(String, primary_key=True)  # normalized: NFC, stripped, lowercase
+    translation = Column(String, nullable=False)
+    origin = Column(String, nullable=False, default="deepl")  # deepl | import
+    created_at = Column(
+        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+
+
+class DeckSummary(Base):
+    """
+    Materialized card counts per (user, language, state, due day), kept up to date
+    incrementally by FSRS_Service. Past days are periodically folded into a
+    single overdue row (yesterday), so the table stays small.
+    """
+
+    __tablename__ = "deck_summary"
+    user_id = Column(
+        String, primary_key=True, default=DEFAULT_USER_ID, server_default=DEFAULT_USER_ID
+    )
+    language = Column(String, primary_key=True)
+    state = Column(Integer, primary_key=True)  # 1=Learning, 2=Review, 3=Relearning
+    due_day = Column(Date, primary_key=True)  # UTC date; 9999-12-31 if no due date
+    count = Column(Integer, nullable=False, default=0)
+
+
+class TranslationJob(Base):
+    """
+    A document submitted for background translation; progress is tracked per chunk.
+    """
+
+    __tablename__ = "translation_jobs"
+    id = Column(String, primary_key=True)  # uuid4 hex
+    user_id = Column(String, nullable=True, index=True)  # whose vocabulary marks words
+    status = Column(String, nullable=False, default="queued")  # queued|running|done|failed
+    source_lang = Column(String, nullable=False)
+    target_lang = Column(String, nullable=False)
+    mark_words = Column(Boolean, nullable=False, default=True)
+    total_chunks = Column(Integer, nullable=False, default=0)
+    done_chunks = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(
+        DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
+    )
+    updated_at = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+
+class TranslationJobChunk(Base):
+    """
+    One chunk of a TranslationJob. Finished chunks keep their result, so a
+    restarted worker only processes what is still pending.
+    """
+
+    __tablename__ = "translation_job_chunks"
+    job_id = Column(String, ForeignKey("translation_jobs.id"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    source_text = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending|running|done|failed
+    attempts = Column(Integer, nullable=False, default=0)
+    claimed_at = Column(DateTime, nullable=True)  # lease start while running
+    claim_token = Column(String, nullable=True)  # uuid4 of the current claim
+    result = Column(Text, nullable=True)  # JSON: {"translatedText": ..., "sentences": [...]}
+    error = Column(String, nullable=True)
+
+
+class ReviewDailyRollup(Base):
+    """
+    Per-card, per-day aggregate of review_history rows older than the retention
+    window. Keeps the first review of each day (what FSRS optimization uses)
+    and the rating counts (for analytics).
+    """
+
+    __tablename__ = "review_daily_rollups"
+    user_id = Column(
+        String, primary_key=True, default=DEFAULT_USER_ID, server_default=DEFAULT_USER_ID
+    )
+    word = Column(String, primary_key=True)
+    language = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC date
+    first_review_time = Column(DateTime, nullable=False)
+    first_rating = Column(Integer, nullable=False)
+    first_state = Column(Integer, nullable=True)
+    last_state = Column(Integer, nullable=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    again_count = Column(Integer, nullable=False, default=0)
+    hard_count = Column(Integer, nullable=False, default=0)
+    good_count = Column(Integer, nullable=False, default=0)
+    easy_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,97 @@
+# profiling.py
+import cProfile
+import os
+import time
+import uuid
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "profile" in g:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "profile" in g:
+        started = conn.info["profile_query_start"].pop()
+        g.profile["sql"].append((time.perf_counter() - started, statement, parameters))
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request profiler. When enabled in Config, a request that carries
+    the profiling header (or query flag) is run under cProfile and every SQL
+    statement it executes is logged. Both are written to the profile directory,
+    named after the request ID.
+
+    Nothing is registered on the app or SQLAlchemy unless profiling is enabled,
+    so there is no overhead at all when it is off. The SQL listeners are
+    attached to the Engine class, so statements on shard engines created
+    later (DB_SHARD_URI_TEMPLATE) are logged too.
+    """
+
+    def __init__(self, output_dir: str, header: str = "X-Profile", query_flag: str = "profile"):
+        self.output_dir = output_dir
+        self.header = header
+        self.query_flag = query_flag
+
+    def init_app(self, app):
+        os.makedirs(self.output_dir, exist_ok=True)
+        app.before_request(self._start)
+        app.after_request(self._stop)
+        app.teardown_request(self._discard)
+        # Module-level listeners, added once however many apps are created
+        for name, listener in (
+            ("before_cursor_execute", _before_cursor_execute),
+            ("after_cursor_execute", _after_cursor_execute),
+        ):
+            if not event.contains(Engine, name, listener):
+                event.listen(Engine, name, listener)
+
+    def _wants_profile(self) -> bool:
+        flag = request.headers.get(self.header) or request.args.get(self.query_flag)
+        return bool(flag) and flag.lower() not in ("0", "false", "no", "off")
+
+    def _start(self):
+        if not self._wants_profile():
+            return
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        # Keep the ID safe to use as a file name
+        request_id = "".join(c for c in request_id if c.isalnum() or c in "-_") or uuid.uuid4().hex
+        g.profile = {
+            "request_id": request_id,
+            "profiler": cProfile.Profile(),
+            "sql": [],
+            "started": time.perf_counter(),
+        }
+        g.profile["profiler"].enable()
+
+    def _stop(self, response):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return response
+        profile["profiler"].disable()
+        elapsed = time.perf_counter() - profile["started"]
+        request_id = profile["request_id"]
+
+        base = os.path.join(self.output_dir, request_id)
+        profile["profiler"].dump_stats(base + ".prof")
+        with open(base + ".sql.log", "w", encoding="utf-8") as f:
+            f.write(f"# {request.method} {request.full_path}\n")
+            f.write(f"# status={response.status_code} total={elapsed * 1000:.2f}ms "
+                    f"statements={len(profile['sql'])}\n")
+            for duration, statement, parameters in profile["sql"]:
+                f.write(f"-- {duration * 1000:.3f}ms params={parameters!r}\n")
+                f.write(statement.strip() + ";\n\n")
+
+        response.headers["X-Profile-Id"] = request_id
+        return response
+
+    def _discard(self, exc=None):
+        # after_request is skipped on unhandled errors; don't leave cProfile running
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profile["profiler"].disable()
@@ -0,0 +1,118 @@
+# response_format.py
+import gzip
+import json
+
+from flask import Response, request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Index of each match_type in the compact "match" arrays
+MATCH_TYPES = ["none", "direct", "lemma", "error"]
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def to_compact(sentences: list[dict]) -> dict:
+    """
+    Converts the verbose per-sentence results of POST /api/translation into the
+    compact format:
+    {
+      "format": "compact",
+      "matchTypes": ["none", "direct", "lemma", "error"],
+      "vocabulary": [ {vocabulary_entry}, ... ],      // deduplicated
+      "sentences": [
+        {
+          "original": ..., "translated": ...,
+          "src": [...], "trg": [...],
+          "alignment": [s0, t0, s1, t1, ...],          // flat index pairs
+          "vocab": [index into vocabulary or -1, ...], // one per src token
+          "match": [index into matchTypes, ...]        // one per src token
+        }
+      ]
+    }
+    "vocab"/"match" are omitted when words were not marked.
+    """
+    vocabulary = []
+    vocab_index = {}
+    match_codes = {m: i for i, m in enumerate(MATCH_TYPES)}
+
+    compact_sentences = []
+    for s in sentences:
+        flat_alignment = []
+        for src_idx, trg_idx in s["alignment"]:
+            flat_alignment.append(src_idx)
+            flat_alignment.append(trg_idx)
+
+        sentence = {
+            "original": s["original"],
+            "translated": s["translated"],
+            "src": s["src_tokenized"],
+            "trg": s["trg_tokenized"],
+            "alignment": flat_alignment,
+        }
+
+        if s["wordInfo"]:
+            refs = []
+            matches = []
+            for info in s["wordInfo"]:
+                entry = info["vocabulary_entry"]
+                if entry is None:
+                    refs.append(-1)
+                else:
+                    key = (entry["word"], entry["language"])
+                    idx = vocab_index.get(key)
+                    if idx is None:
+                        idx = vocab_index[key] = len(vocabulary)
+                        vocabulary.append(entry)
+                    refs.append(idx)
+                matches.append(match_codes.get(info["match_type"], 0))
+            sentence["vocab"] = refs
+            sentence["match"] = matches
+
+        compact_sentences.append(sentence)
+
+    return {
+        "format": "compact",
+        "matchTypes": MATCH_TYPES,
+        "vocabulary": vocabulary,
+        "sentences": compact_sentences,
+    }
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def encode_json(payload: dict, accept_encoding: str = ""):
+    """
+    Serializes payload without whitespace and compresses it with brotli or gzip
+    if the Accept-Encoding header value allows it.
+    Returns (body, content_encoding or None). Doesn't need a request context.
+    """
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    encoding = parse_accept_header(accept_encoding).best_match(offered)
+    if not encoding:
+        return body, None
+    return compress(body, encoding), encoding
+
+
+def negotiated_json_response(payload: dict, status: int) -> Response:
+    """
+    Flask response for encode_json, negotiated on the current request.
+    """
+    body, encoding = encode_json(payload, request.headers.get("Accept-Encoding", ""))
+    response = Response(body, status=status, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,299 @@
+# review_maintenance.py
+import calendar
+import time
+from datetime import date, datetime, time as dt_time, timezone
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from db import DBService
+from models import DEFAULT_USER_ID, ReviewDailyRollup, ReviewHistory
+
+RATING_COLUMNS = {1: "again_count", 2: "hard_count", 3: "good_count", 4: "easy_count"}
+
+# Cards sampled when timing per-card history queries for the report
+SAMPLE_CARDS = 50
+
+# Rollups (new or merged) written between flushes while compacting
+FLUSH_EVERY = 1000
+
+
+def months_ago(today: date, months: int) -> date:
+    month_index = today.year * 12 + today.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(today.day, calendar.monthrange(year, month)[1]))
+
+
+class ReviewMaintenanceService:
+    """
+    Retention and upkeep for review_history. Reviews older than the retention
+    window are compacted into review_daily_rollups (one row per card per day),
+    then the database is vacuumed and re-analyzed. With sharding enabled every
+    shard holding per-user tables is processed.
+    """
+
+    def __init__(self, db_service: DBService):
+        self.db_service = db_service
+
+    def compact(self, retention_months: int, today: date = None) -> dict:
+        """
+        Moves reviews before the start of the day `retention_months` ago into
+        daily rollups. Rows are streamed in card/time order, so memory use
+        doesn't depend on the table size.
+        Returns {"cutoff": ..., "reviews_compacted": ..., "rollups_written": ...}.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        cutoff = datetime.combine(months_ago(today, retention_months), dt_time.min)
+
+        compacted = 0
+        written = 0
+        for session_factory in self.db_service.user_session_factories():
+            c, w = self._compact(session_factory, cutoff)
+            compacted += c
+            written += w
+
+        return {
+            "cutoff": cutoff.isoformat(),
+            "reviews_compacted": compacted,
+            "rollups_written": written,
+        }
+
+    def _compact(self, session_factory, cutoff: datetime):
+        session: Session = session_factory()
+        try:
+            rows = (
+                session.query(
+                    ReviewHistory.user_id,
+                    ReviewHistory.word,
+                    ReviewHistory.language,
+                    ReviewHistory.review_time,
+                    ReviewHistory.rating,
+                    ReviewHistory.state,
+                )
+                .filter(ReviewHistory.review_time < cutoff)
+                .order_by(
+                    ReviewHistory.user_id,
+                    ReviewHistory.word,
+                    ReviewHistory.language,
+                    ReviewHistory.review_time,
+                )
+                .yield_per(5000)
+            )
+
+            compacted = 0
+            written = 0
+            pending = 0
+            group_key = None
+            group = None
+            for user_id, word, language, review_time, rating, state in rows:
+                key = (user_id, word, language, review_time.date())
+                if key != group_key:
+                    if group is not None:
+                        written += self._write_rollup(session, group)
+                        pending += 1
+                        if pending >= FLUSH_EVERY:
+                            # Flushed rows are only weakly referenced by the session
+                            session.flush()
+                            pending = 0
+                    group_key = key
+                    group = {
+                        "user_id": user_id,
+                        "word": word,
+                        "language": language,
+                        "day": key[3],
+                        "first_review_time": review_time,
+                        "first_rating": rating,
+                        "first_state": state,
+                        "last_state": state,
+                        "review_count": 0,
+                        "again_count": 0,
+                        "hard_count": 0,
+                        "good_count": 0,
+                        "easy_count": 0,
+                    }
+                group["last_state"] = state
+                group["review_count"] += 1
+                if rating in RATING_COLUMNS:
+                    group[RATING_COLUMNS[rating]] += 1
+                compacted += 1
+            if group is not None:
+                written += self._write_rollup(session, group)
+
+            session.query(ReviewHistory).filter(ReviewHistory.review_time < cutoff).delete(
+                synchronize_session=False
+            )
+            session.commit()
+        finally:
+            session.close()
+        return compacted, written
+
+    @staticmethod
+    def _write_rollup(session: Session, group: dict) -> int:
+        existing = session.get(
+            ReviewDailyRollup,
+            (group["user_id"], group["word"], group["language"], group["day"]),
+        )
+        if existing is None:
+            session.add(ReviewDailyRollup(**group))
+            return 1
+
+        # Late-arriving reviews for an already compacted day: merge
+        if group["first_review_time"] < existing.first_review_time:
+            existing.first_review_time = group["first_review_time"]
+            existing.first_rating = group["first_rating"]
+            existing.first_state = group["first_state"]
+        else:
+            existing.last_state = group["last_state"]
+        for column in ["review_count"] + list(RATING_COLUMNS.values()):
+            setattr(existing, column, getattr(existing, column) + group[column])
+        return 0
+
+    def get_review_logs(self, word: str, language: str, user_id: str = DEFAULT_USER_ID):
+        """
+        Time-ordered (review_time, rating, state) history of one of the user's
+        cards for FSRS optimization: the first review of each compacted day
+        followed by the raw reviews still in review_history.
+        """
+        session: Session = self.db_service.get_session(user_id)
+        try:
+            compacted = (
+                session.query(
+                    ReviewDailyRollup.first_review_time,
+                    ReviewDailyRollup.first_rating,
+                    ReviewDailyRollup.first_state,
+                )
+                .filter(
+                    ReviewDailyRollup.user_id == user_id,
+                    ReviewDailyRollup.word == word.lower(),
+                    ReviewDailyRollup.language == language.lower(),
+                )
+                .order_by(ReviewDailyRollup.day)
+                .all()
+            )
+            recent = (
+                session.query(
+                    ReviewHistory.review_time, ReviewHistory.rating, ReviewHistory.state
+                )
+                .filter(
+                    ReviewHistory.user_id == user_id,
+                    ReviewHistory.word == word.lower(),
+                    ReviewHistory.language == language.lower(),
+                )
+                .order_by(ReviewHistory.review_time)
+                .all()
+            )
+            return [tuple(r) for r in compacted] + [tuple(r) for r in recent]
+        finally:
+            session.close()
+
+    def _engines(self):
+        engines = [self.db_service.engine]
+        if self.db_service.sharded:
+            engines += self.db_service.user_engines()
+        return engines
+
+    def database_size(self):
+        """
+        Total size of the database (and shards) in bytes, or None if the backend
+        isn't supported.
+        """
+        sizes = [self._engine_size(engine) for engine in self._engines()]
+        if any(size is None for size in sizes):
+            return None
+        return sum(sizes)
+
+    @staticmethod
+    def _engine_size(engine):
+        with engine.connect() as conn:
+            if engine.dialect.name == "sqlite":
+                page_count = conn.execute(text("PRAGMA page_count")).scalar()
+                page_size = conn.execute(text("PRAGMA page_size")).scalar()
+                return page_count * page_size
+            if engine.dialect.name == "postgresql":
+                return conn.execute(
+                    text("SELECT pg_database_size(current_database())")
+                ).scalar()
+        return None
+
+    def vacuum(self):
+        """
+        Reclaims free pages and refreshes planner statistics.
+        """
+        for engine in self._engines():
+            if engine.dialect.name not in ("sqlite", "postgresql"):
+                continue
+            # VACUUM cannot run inside a transaction
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                if engine.dialect.name == "sqlite":
+                    conn.execute(text("VACUUM"))
+                    conn.execute(text("ANALYZE"))
+                else:
+                    conn.execute(text("VACUUM ANALYZE"))
+
+    def time_history_queries(self) -> float:
+        """
+        Mean time in ms of a per-card history query over a sample of cards
+        (taken from the first database holding reviews).
+        """
+        for session_factory in self.db_service.user_session_factories():
+            session: Session = session_factory()
+            try:
+                cards = (
+                    session.query(
+                        ReviewHistory.user_id, ReviewHistory.word, ReviewHistory.language
+                    )
+                    .distinct()
+                    .limit(SAMPLE_CARDS)
+                    .all()
+                )
+                if not cards:
+                    continue
+                started = time.perf_counter()
+                for user_id, word, language in cards:
+                    session.query(ReviewHistory).filter(
+                        ReviewHistory.user_id == user_id,
+                        ReviewHistory.word == word,
+                        ReviewHistory.language == language,
+                    ).order_by(ReviewHistory.review_time).all()
+                return (time.perf_counter() - started) / len(cards) * 1000
+            finally:
+                session.close()
+        return 0.0
+
+    def _count_reviews(self) -> int:
+        total = 0
+        for session_factory in self.db_service.user_session_factories():
+            session: Session = session_factory()
+            try:
+                total += session.query(func.count(ReviewHistory.id)).scalar()
+            finally:
+                session.close()
+        return total
+
+    def run(self, retention_months: int = 0, vacuum: bool = True) -> dict:
+        """
+        Compacts (if retention_months > 0), vacuums, and reports the space and
+        query time saved.
+        """
+        started = time.perf_counter()
+        report = {
+            "size_before_bytes": self.database_size(),
+            "reviews_before": self._count_reviews(),
+            "history_query_ms_before": round(self.time_history_queries(), 3),
+        }
+        if retention_months and retention_months > 0:
+            report.update(self.compact(retention_months))
+        if vacuum:
+            self.vacuum()
+
+        report["size_after_bytes"] = self.database_size()
+        report["reviews_after"] = self._count_reviews()
+        report["history_query_ms_after"] = round(self.time_history_queries(), 3)
+        if report["size_before_bytes"] is not None and report["size_after_bytes"] is not None:
+            report["bytes_saved"] = report["size_before_bytes"] - report["size_after_bytes"]
+        report["history_query_ms_saved"] = round(
+            report["history_query_ms_before"] - report["history_query_ms_after"], 3
+        )
+        report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return report
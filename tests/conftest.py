@@ -0,0 +1,19 @@
+# tests/conftest.py
+import pytest
+
+from app_fsrs import FSRS_Service
+from config import Config
+from db import DBService
+from deck_stats import DeckStatsService
+
+
+@pytest.fixture
+def fsrs(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/test.db")
+    monkeypatch.setattr(Config, "DB_SHARD_URI_TEMPLATE", "")
+    db_service = DBService()
+    db_service.create_tables()
+    service = FSRS_Service(db_service, DeckStatsService(db_service))
+    for word in ("hej", "tack"):
+        service.add_word(word, "sv", translation=word)
+    return service
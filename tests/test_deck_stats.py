@@ -0,0 +1,69 @@
+# tests/test_deck_stats.py
+"""
+DeckStatsService: incremental deck_summary counts and the daily roll-forward.
+"""
+from datetime import datetime, timedelta, timezone
+
+from models import DeckSummary, Vocabulary
+
+
+def make_overdue(service, word="hej", days=5):
+    session = service.db_service.get_session()
+    try:
+        vocab = session.get(Vocabulary, ("default", word, "sv"))
+        vocab.due = datetime.now(timezone.utc) - timedelta(days=days)
+        session.commit()
+    finally:
+        session.close()
+
+
+def summary_rows(service):
+    session = service.db_service.get_session()
+    try:
+        return {
+            (row.state, row.due_day): row.count
+            for row in session.query(DeckSummary).filter(DeckSummary.language == "sv")
+        }
+    finally:
+        session.close()
+
+
+def test_counts_follow_adds_and_reviews(fsrs):
+    stats = fsrs.deck_stats.get_stats("sv")["sv"]
+    assert stats["total"] == 2
+    assert stats["due"]["today"] == 2
+
+    fsrs.apply_review_batch([{"word": "hej", "language": "sv", "rating": "easy", "version": 0}])
+
+    stats = fsrs.deck_stats.get_stats("sv")["sv"]
+    assert stats["total"] == 2
+    assert (stats["states"]["learning"], stats["states"]["review"]) == (1, 1)
+    assert stats["due"]["today"] == 1
+
+
+def test_review_after_roll_forward(fsrs):
+    make_overdue(fsrs)
+    fsrs.deck_stats.rebuild()  # folds the card's due day into yesterday
+
+    fsrs.apply_review_batch([{"word": "hej", "language": "sv", "rating": "good", "version": 0}])
+
+    stats = fsrs.deck_stats.get_stats("sv")["sv"]
+    assert stats["total"] == 2
+    assert stats["due"]["overdue"] == 0
+    assert all(count >= 0 for count in summary_rows(fsrs).values())
+
+
+def test_review_before_roll_forward(fsrs):
+    make_overdue(fsrs)
+    fsrs.deck_stats._rebuild(fsrs.db_service.SessionLocal)  # day rows not yet folded
+
+    fsrs.apply_review_batch([{"word": "hej", "language": "sv", "rating": "good", "version": 0}])
+
+    stats = fsrs.deck_stats.get_stats("sv")["sv"]
+    assert stats["total"] == 2
+    assert stats["due"]["overdue"] == 0
+
+    fsrs.deck_stats.roll_forward()
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    assert all(day >= yesterday for _, day in summary_rows(fsrs))
+    assert fsrs.deck_stats.get_stats("sv")["sv"]["total"] == 2
@@ -0,0 +1,155 @@
+# tests/test_review_batch.py
+"""
+Versioned review writes in FSRS_Service: apply_review_batch and the
+review_word retry loop. Run with `python -m pytest` from the repo root.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app_fsrs import FSRS_Service, as_utc
+from models import ReviewHistory, Vocabulary
+
+
+def card(service, word="hej"):
+    session = service.db_service.get_session()
+    try:
+        return session.get(Vocabulary, ("default", word, "sv"))
+    finally:
+        session.close()
+
+
+def history(service, word="hej"):
+    session = service.db_service.get_session()
+    try:
+        return (
+            session.query(ReviewHistory)
+            .filter(ReviewHistory.word == word)
+            .order_by(ReviewHistory.id)
+            .all()
+        )
+    finally:
+        session.close()
+
+
+def review(word="hej", version=0, rating="good", **extra):
+    return {"word": word, "language": "sv", "rating": rating, "version": version, **extra}
+
+
+def test_applies_review_and_bumps_version(fsrs):
+    result = fsrs.apply_review_batch([review()])
+
+    assert result == {
+        "applied": [{"word": "hej", "language": "sv", "version": 1}],
+        "conflicts": [],
+        "notFound": [],
+    }
+    assert card(fsrs).version == 1
+    assert len(history(fsrs)) == 1
+
+
+def test_stale_version_is_a_conflict(fsrs):
+    fsrs.apply_review_batch([review()])
+    before = card(fsrs)
+
+    result = fsrs.apply_review_batch([review(rating="again")])
+
+    assert result["applied"] == []
+    (conflict,) = result["conflicts"]
+    assert conflict["expectedVersion"] == 0
+    assert conflict["currentVersion"] == 1
+    assert conflict["card"]["version"] == 1
+    after = card(fsrs)
+    assert (after.version, after.due, after.state) == (before.version, before.due, before.state)
+    assert len(history(fsrs)) == 1
+
+
+def test_repeated_card_in_one_batch(fsrs):
+    result = fsrs.apply_review_batch(
+        [review(version=0), review(version=1), review(version=1, rating="again")]
+    )
+
+    assert [a["version"] for a in result["applied"]] == [1, 2]
+    (conflict,) = result["conflicts"]
+    assert (conflict["expectedVersion"], conflict["currentVersion"]) == (1, 2)
+    assert card(fsrs).version == 2
+    assert len(history(fsrs)) == 2
+
+
+def test_unknown_card_is_not_found(fsrs):
+    result = fsrs.apply_review_batch([review(word="okänd"), review(word="tack")])
+
+    assert result["notFound"] == [{"word": "okänd", "language": "sv"}]
+    assert [a["word"] for a in result["applied"]] == ["tack"]
+
+
+def test_old_reviewed_at_does_not_rewind_the_card(fsrs):
+    first = datetime.now(timezone.utc) - timedelta(minutes=5)
+
+    result = fsrs.apply_review_batch(
+        [
+            review(version=0, reviewedAt=first.isoformat()),
+            review(version=1, reviewedAt="2020-01-01T00:00:00+00:00"),
+        ]
+    )
+
+    assert len(result["applied"]) == 2
+    updated = card(fsrs)
+    assert as_utc(updated.last_review) >= first
+    assert as_utc(updated.due) > first
+    times = [as_utc(h.review_time) for h in history(fsrs)]
+    assert times == sorted(times)
+    assert times[0] >= first
+
+
+def test_future_reviewed_at_is_clamped_to_now(fsrs):
+    fsrs.apply_review_batch([review(reviewedAt="2999-01-01T00:00:00+00:00")])
+
+    assert as_utc(card(fsrs).last_review) <= datetime.now(timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        {"word": 5, "language": "sv", "rating": "good", "version": 0},
+        {"word": "hej", "language": ["sv"], "rating": "good", "version": 0},
+        {"word": "hej", "language": "sv", "rating": "good", "version": "0"},
+        {"word": "hej", "language": "sv", "rating": "meh", "version": 0},
+        {"word": "hej", "language": "sv", "rating": "good", "version": 0, "reviewedAt": 5},
+        "hej",
+    ],
+)
+def test_malformed_review_applies_nothing(fsrs, bad):
+    with pytest.raises(ValueError):
+        fsrs.apply_review_batch([review(word="tack"), bad])
+
+    assert card(fsrs, "tack").version == 0
+    assert history(fsrs, "tack") == []
+
+
+def test_review_word_retries_after_concurrent_review(fsrs):
+    other_request = FSRS_Service(fsrs.db_service, fsrs.deck_stats)
+    apply_rating = fsrs._apply_rating
+    results = []
+
+    def racing_apply_rating(session, vocab, rating, now, user_id):
+        if not results:
+            # Another request reviews the card between our read and our write
+            other_request.apply_review_batch([review(version=vocab.version)])
+        results.append(apply_rating(session, vocab, rating, now, user_id))
+        return results[-1]
+
+    fsrs._apply_rating = racing_apply_rating
+    fsrs.review_word("hej", "sv", "good")
+
+    assert results == [False, True]
+    assert card(fsrs).version == 2
+    assert len(history(fsrs)) == 2
+
+
+def test_review_word_gives_up_after_repeated_conflicts(fsrs):
+    fsrs._apply_rating = lambda *args: False
+
+    with pytest.raises(RuntimeError):
+        fsrs.review_word("hej", "sv", "good")
+    assert card(fsrs).version == 0
@@ -0,0 +1,100 @@
+# tests/test_review_maintenance.py
+"""
+ReviewMaintenanceService.compact: rolling old review_history rows up into
+review_daily_rollups, including merges into days compacted earlier.
+"""
+from datetime import date, datetime
+
+from sqlalchemy.orm import Session, sessionmaker
+
+import review_maintenance
+from models import ReviewDailyRollup, ReviewHistory
+from review_maintenance import ReviewMaintenanceService
+
+TODAY = date(2026, 10, 19)
+DAY = date(2026, 1, 10)
+
+
+def add_reviews(service, *reviews):
+    session = service.db_service.get_session()
+    try:
+        session.add_all(
+            ReviewHistory(
+                user_id="default",
+                word=word,
+                language="sv",
+                review_time=datetime.combine(DAY, datetime.min.time()).replace(hour=hour),
+                rating=rating,
+                state=state,
+            )
+            for word, hour, rating, state in reviews
+        )
+        session.commit()
+    finally:
+        session.close()
+
+
+def rollups(service):
+    session = service.db_service.get_session()
+    try:
+        return {
+            r.word: r
+            for r in session.query(ReviewDailyRollup).filter(ReviewDailyRollup.day == DAY)
+        }
+    finally:
+        session.close()
+
+
+class CountingSession(Session):
+    flushes = 0
+
+    def flush(self, objects=None):
+        CountingSession.flushes += 1
+        super().flush(objects)
+
+
+def test_compacts_reviews_into_daily_rollups(fsrs):
+    maintenance = ReviewMaintenanceService(fsrs.db_service)
+    add_reviews(fsrs, ("hej", 10, 1, 1), ("hej", 12, 3, 2), ("tack", 9, 4, 2))
+
+    report = maintenance.compact(retention_months=3, today=TODAY)
+
+    assert (report["reviews_compacted"], report["rollups_written"]) == (3, 2)
+    hej = rollups(fsrs)["hej"]
+    assert (hej.review_count, hej.again_count, hej.good_count) == (2, 1, 1)
+    assert (hej.first_rating, hej.first_state, hej.last_state) == (1, 1, 2)
+    assert maintenance._count_reviews() == 0
+
+
+def test_late_reviews_merge_into_compacted_days(fsrs):
+    maintenance = ReviewMaintenanceService(fsrs.db_service)
+    add_reviews(fsrs, ("hej", 10, 3, 2), ("tack", 9, 3, 2))
+    maintenance.compact(retention_months=3, today=TODAY)
+
+    add_reviews(fsrs, ("hej", 8, 1, 1), ("tack", 15, 2, 3))
+    report = maintenance.compact(retention_months=3, today=TODAY)
+
+    assert (report["reviews_compacted"], report["rollups_written"]) == (2, 0)
+    hej, tack = rollups(fsrs)["hej"], rollups(fsrs)["tack"]
+    # An earlier review becomes the day's first review
+    assert (hej.review_count, hej.first_rating, hej.first_review_time.hour) == (2, 1, 8)
+    # A later one only moves the last state
+    assert (tack.review_count, tack.first_rating, tack.last_state) == (2, 3, 3)
+    assert (tack.good_count, tack.hard_count) == (1, 1)
+
+
+def test_flushes_once_per_batch_of_rollups(fsrs, monkeypatch):
+    maintenance = ReviewMaintenanceService(fsrs.db_service)
+    words = [f"ord{i}" for i in range(5)]
+    add_reviews(fsrs, *[(w, 10, 3, 2) for w in words])
+    maintenance.compact(retention_months=3, today=TODAY)
+    add_reviews(fsrs, *[(w, 11, 3, 2) for w in words])
+
+    monkeypatch.setattr(review_maintenance, "FLUSH_EVERY", 2)
+    monkeypatch.setattr(CountingSession, "flushes", 0)
+    factory = sessionmaker(bind=fsrs.db_service.engine, class_=CountingSession, autoflush=False)
+    maintenance._compact(factory, datetime.combine(TODAY, datetime.min.time()))
+
+    # Five merged groups: flushed after the 2nd and 4th, then once by commit
+    assert CountingSession.flushes == 3
+    assert all(r.review_count == 2 for r in rollups(fsrs).values())
@@ -0,0 +1,136 @@
+# tests/test_translation.py
+"""
+TranslationService single-flight: callers asking for a text that is already
+being fetched wait for that DeepL call (bounded by DEEPL_WAIT_TIMEOUT) and get
+its result or its error. DeepL itself is replaced by a fake _request.
+"""
+import threading
+
+import pytest
+
+import translation
+from translation import DEEPL_MAX_TEXTS_PER_REQUEST, TranslationService
+
+
+class Interrupted(BaseException):
+    pass
+
+
+@pytest.fixture
+def service():
+    service = TranslationService()
+    service.api_key = "key"
+    service.wait_timeout = 5
+    return service
+
+
+def blocking_request(service, outcome):
+    """
+    Makes service._request block until released, then return or raise outcome.
+    """
+    started, release = threading.Event(), threading.Event()
+
+    def request(texts, source_lang, target_lang):
+        started.set()
+        release.wait(5)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return [outcome(t) for t in texts]
+
+    service._request = request
+    return started, release
+
+
+def run_in_thread(fn, *args):
+    result = {}
+
+    def target():
+        try:
+            result["value"] = fn(*args)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, result
+
+
+def test_followers_share_the_leaders_result(service):
+    started, release = blocking_request(service, str.upper)
+    leader, leader_result = run_in_thread(service.translate, "hej", "SV", "EN")
+    started.wait(5)
+    follower, follower_result = run_in_thread(service.translate, "hej", "SV", "EN")
+
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert leader_result == follower_result == {"value": "HEJ"}
+    assert service._inflight == {}
+
+
+@pytest.mark.parametrize("error", [RuntimeError("DeepL down"), Interrupted()])
+def test_followers_get_the_leaders_error(service, error):
+    started, release = blocking_request(service, error)
+    leader, leader_result = run_in_thread(service.translate, "hej", "SV", "EN")
+    started.wait(5)
+    follower, follower_result = run_in_thread(service.translate, "hej", "SV", "EN")
+
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert leader_result["error"] is error
+    assert follower_result["error"] is error
+    assert service._inflight == {}
+
+
+def test_follower_gives_up_after_wait_timeout(service):
+    service.wait_timeout = 0.05
+    started, release = blocking_request(service, str.upper)
+    leader, leader_result = run_in_thread(service.translate, "hej", "SV", "EN")
+    started.wait(5)
+
+    with pytest.raises(RuntimeError, match="timed out"):
+        service.translate("hej", "SV", "EN")
+
+    release.set()
+    leader.join(5)
+    assert leader_result == {"value": "HEJ"}
+
+
+def test_failed_batch_releases_the_chunks_not_sent(service):
+    texts = [f"ord{i}" for i in range(DEEPL_MAX_TEXTS_PER_REQUEST + 1)]
+    sent = []
+
+    def request(batch, source_lang, target_lang):
+        sent.append(batch)
+        if len(sent) == 2:
+            raise RuntimeError("DeepL down")
+        return [t.upper() for t in batch]
+
+    service._request = request
+    with pytest.raises(RuntimeError):
+        service.translate_batch(texts, "SV", "EN")
+
+    assert service._inflight == {}
+    assert service.get_cached(texts[0], "SV", "EN") == texts[0].upper()
+    assert service.get_cached(texts[-1], "SV", "EN") is None
+
+
+def test_deepl_requests_have_a_timeout(service, monkeypatch):
+    calls = []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"translations": [{"text": "HEJ"}]}
+
+    def post(url, **kwargs):
+        calls.append(kwargs)
+        return Response()
+
+    monkeypatch.setattr(translation.requests, "post", post)
+    assert service.translate("hej", "SV", "EN") == "HEJ"
+    assert calls[0]["timeout"] == service.timeout
@@ -0,0 +1,168 @@
+# tests/test_translation_jobs.py
+"""
+TranslationJobService: chunk claims and leases, the sweeper and resume after
+a restart. DeepL and the alignment pipeline are replaced by fakes.
+"""
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+import translation_jobs
+from config import Config
+from db import DBService
+from models import TranslationJob, TranslationJobChunk
+from translation_jobs import TranslationJobService
+
+
+class FakeTokenizer:
+    def sent_tokenize(self, text, lang):
+        return text.split("\n")
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.calls = []
+        self.hook = None
+
+    def translate(self, text, source_lang=None, target_lang=None):
+        self.calls.append(text)
+        if self.hook:
+            hook, self.hook = self.hook, None
+            return hook(text)
+        return text.upper()
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/test.db")
+    monkeypatch.setattr(Config, "DB_SHARD_URI_TEMPLATE", "")
+    monkeypatch.setattr(translation_jobs, "build_sentence_results", lambda *a, **kw: [])
+    db_service = DBService()
+    db_service.create_tables()
+    app = Flask(__name__)
+    app.tokenization_service = FakeTokenizer()
+    app.translation_service = FakeTranslator()
+    service = TranslationJobService(app, db_service, chunk_chars=1, lease_seconds=60)
+    yield service
+    service.start_sweeper = lambda interval_seconds: None  # stop re-arming
+    if service._timer:
+        service._timer.cancel()
+    service.executor.shutdown(wait=True)
+
+
+def submit_unscheduled(service, text="ett\ntvå\ntre"):
+    # As if the process died right after storing the job
+    service._enqueue = lambda job_id, indexes: None
+    job_id = service.submit(text, "SV", "EN")["jobId"]
+    del service._enqueue
+    return job_id
+
+
+def set_chunk(service, job_id, idx, **fields):
+    session = service.db_service.get_session()
+    try:
+        chunk = session.get(TranslationJobChunk, (job_id, idx))
+        for name, value in fields.items():
+            setattr(chunk, name, value)
+        if fields.get("status") == "done":
+            session.get(TranslationJob, job_id).done_chunks += 1
+        session.commit()
+    finally:
+        session.close()
+
+
+def chunks(service, job_id):
+    return service.get_results(job_id, page_size=100)["chunks"]
+
+
+def wait_for_job(service, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = service.get_status(job_id)
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job still {status['status']}")
+
+
+def test_job_runs_to_done(jobs):
+    job_id = jobs.submit("ett\ntvå\ntre", "SV", "EN")["jobId"]
+
+    status = wait_for_job(jobs, job_id)
+
+    assert (status["status"], status["doneChunks"], status["totalChunks"]) == ("done", 3, 3)
+    assert [c["translatedText"] for c in chunks(jobs, job_id)] == ["ETT", "TVÅ", "TRE"]
+
+
+def test_expired_claim_cannot_overwrite_the_new_claim(jobs, monkeypatch):
+    job_id = submit_unscheduled(jobs, "ett")
+    # Both claims get the same timestamp, as on a coarse clock
+    frozen = datetime.now(timezone.utc)
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return frozen
+
+    monkeypatch.setattr(translation_jobs, "datetime", FrozenDatetime)
+
+    def lease_expires_and_another_worker_reclaims(text):
+        set_chunk(jobs, job_id, 0, claimed_at=frozen - timedelta(hours=1))
+        session = jobs.db_service.get_session()
+        try:
+            claimed = jobs._claim(session, job_id, 0, frozen, "theirs")
+            session.commit()
+        finally:
+            session.close()
+        assert claimed == 1
+        return "mine"
+
+    jobs.app.translation_service.hook = lease_expires_and_another_worker_reclaims
+    with jobs.app.app_context():
+        jobs._process_chunk(job_id, 0)
+
+    (chunk,) = chunks(jobs, job_id)
+    assert chunk["status"] == "running"  # still held by the other worker
+    assert jobs.get_status(job_id)["doneChunks"] == 0
+
+
+def test_running_chunk_within_its_lease_is_not_reclaimed(jobs):
+    job_id = submit_unscheduled(jobs, "ett")
+    set_chunk(jobs, job_id, 0, status="running", claimed_at=datetime.now(timezone.utc))
+
+    with jobs.app.app_context():
+        jobs._process_chunk(job_id, 0)
+
+    assert jobs.app.translation_service.calls == []
+    assert chunks(jobs, job_id)[0]["status"] == "running"
+
+
+def test_resume_runs_only_unfinished_chunks(jobs):
+    job_id = submit_unscheduled(jobs)
+    set_chunk(jobs, job_id, 0, status="done", result=json.dumps({"translatedText": "ETT"}))
+    set_chunk(jobs, job_id, 2, status="failed", attempts=jobs.max_attempts, error="boom")
+
+    jobs.resume()
+    status = wait_for_job(jobs, job_id)
+
+    assert jobs.app.translation_service.calls == ["två"]
+    assert (status["status"], status["doneChunks"], status["failedChunks"]) == ("failed", 2, 1)
+
+
+def test_sweeper_reclaims_expired_leases(jobs):
+    job_id = submit_unscheduled(jobs, "ett\ntvå")
+    expired = datetime.now(timezone.utc) - timedelta(seconds=jobs.lease_seconds + 1)
+    set_chunk(jobs, job_id, 0, status="running", claimed_at=expired, attempts=1)
+    set_chunk(jobs, job_id, 1, status="running", claimed_at=datetime.now(timezone.utc))
+
+    jobs.start_sweeper(0.05)
+    deadline = time.monotonic() + 5
+    while chunks(jobs, job_id)[0]["status"] != "done" and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    assert [c["status"] for c in chunks(jobs, job_id)] == ["done", "running"]
+    assert jobs.app.translation_service.calls == ["ett"]
+    assert jobs.get_status(job_id)["status"] == "running"
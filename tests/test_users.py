@@ -0,0 +1,143 @@
+# tests/test_users.py
+"""
+Multi-user storage: per-user scoping, the user id header, shard selection,
+and upgrading a single-user database (baseline schema, then sharding).
+"""
+import sqlite3
+import zlib
+
+import pytest
+from flask import Flask
+
+from api.user import current_user_id
+from app_fsrs import FSRS_Service
+from config import Config
+from db import DBService
+from deck_stats import DeckStatsService
+from models import ReviewHistory, Vocabulary
+
+# user_vocabulary and review_history as created before multi-user support
+BASELINE_SCHEMA = """
+CREATE TABLE user_vocabulary (
+    word VARCHAR NOT NULL, language VARCHAR NOT NULL, translation VARCHAR,
+    state INTEGER NOT NULL, due DATETIME, stability FLOAT, difficulty FLOAT,
+    last_review DATETIME, step INTEGER, PRIMARY KEY (word, language)
+);
+CREATE TABLE review_history (
+    id INTEGER NOT NULL, review_time DATETIME NOT NULL, word VARCHAR NOT NULL,
+    language VARCHAR NOT NULL, rating INTEGER NOT NULL, state INTEGER,
+    PRIMARY KEY (id),
+    FOREIGN KEY(word, language) REFERENCES user_vocabulary (word, language)
+);
+INSERT INTO user_vocabulary VALUES
+    ('hej', 'sv', 'hello', 2, '2026-01-02 10:00:00.000000', 3.0, 5.0,
+     '2026-01-01 10:00:00.000000', NULL),
+    ('tack', 'sv', 'thanks', 1, '2026-01-01 10:00:00.000000', NULL, NULL, NULL, 0);
+INSERT INTO review_history VALUES
+    (1, '2026-01-01 10:00:00.000000', 'hej', 'sv', 3, 2);
+"""
+
+
+def shard_template(tmp_path):
+    return f"sqlite:///{tmp_path}/shards/users_{{shard}}.db"
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/main.db")
+    monkeypatch.setattr(Config, "DB_SHARD_URI_TEMPLATE", shard_template(tmp_path))
+    monkeypatch.setattr(Config, "DB_SHARD_COUNT", 4)
+    db_service = DBService()
+    db_service.create_tables()
+    return FSRS_Service(db_service, DeckStatsService(db_service))
+
+
+def words(session_factory, user_id=None):
+    session = session_factory()
+    try:
+        query = session.query(Vocabulary.user_id, Vocabulary.word)
+        if user_id is not None:
+            query = query.filter(Vocabulary.user_id == user_id)
+        return sorted(query.all())
+    finally:
+        session.close()
+
+
+def test_decks_are_scoped_per_user(fsrs):
+    fsrs.add_word("katt", "sv", translation="cat", user_id="alice")
+    fsrs.apply_review_batch(
+        [{"word": "katt", "language": "sv", "rating": "easy", "version": 0}],
+        user_id="alice",
+    )
+
+    alice = fsrs.get_all_vocabulary(user_id="alice")
+    assert [v["word"] for v in alice] == ["katt"]
+    assert sorted(v["word"] for v in fsrs.get_all_vocabulary()) == ["hej", "tack"]
+    # Another user reviewing a word that only alice has finds nothing
+    result = fsrs.apply_review_batch(
+        [{"word": "katt", "language": "sv", "rating": "good", "version": 0}],
+        user_id="bob",
+    )
+    assert result["notFound"] == [{"word": "katt", "language": "sv"}]
+    assert fsrs.deck_stats.get_stats(user_id="alice")["sv"]["total"] == 1
+    assert fsrs.deck_stats.get_stats()["sv"]["total"] == 2
+
+
+def test_user_id_comes_only_from_the_header():
+    app = Flask(__name__)
+    with app.test_request_context("/?userId=mallory"):
+        assert current_user_id() == "default"
+    with app.test_request_context(
+        "/?userId=mallory", headers={Config.USER_ID_HEADER: "alice"}
+    ):
+        assert current_user_id() == "alice"
+
+
+def test_users_are_stored_in_their_shard(sharded):
+    db_service = sharded.db_service
+    for user_id in ("alice", "bob", "carol"):
+        sharded.add_word("hej", "sv", translation="hello", user_id=user_id)
+
+    for user_id in ("alice", "bob", "carol"):
+        shard = db_service.shard_for(user_id)
+        assert shard == zlib.crc32(user_id.encode("utf-8")) % 4
+        for i, factory in enumerate(db_service.user_session_factories()):
+            expected = [(user_id, "hej")] if i == shard else []
+            assert words(factory, user_id) == expected
+    assert words(db_service.SessionLocal) == []
+
+
+def test_baseline_database_upgrades_to_default_user_then_moves_to_shards(
+    tmp_path, monkeypatch
+):
+    connection = sqlite3.connect(tmp_path / "main.db")
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path}/main.db")
+    monkeypatch.setattr(Config, "DB_SHARD_URI_TEMPLATE", "")
+
+    db_service = DBService()
+    db_service.create_tables()
+    assert words(db_service.SessionLocal) == [("default", "hej"), ("default", "tack")]
+
+    # Turning sharding on later must not strand these rows in the main DB
+    monkeypatch.setattr(Config, "DB_SHARD_URI_TEMPLATE", shard_template(tmp_path))
+    monkeypatch.setattr(Config, "DB_SHARD_COUNT", 4)
+    db_service = DBService()
+    db_service.create_tables()
+    assert db_service.move_rows_to_shards() == 3
+    deck_stats = DeckStatsService(db_service)
+    deck_stats.rebuild()
+
+    assert words(db_service.SessionLocal) == []
+    assert words(lambda: db_service.get_session("default")) == [
+        ("default", "hej"),
+        ("default", "tack"),
+    ]
+    session = db_service.get_session("default")
+    try:
+        assert session.query(ReviewHistory).count() == 1
+    finally:
+        session.close()
+    assert deck_stats.get_stats()["sv"]["total"] == 2
+    assert db_service.move_rows_to_shards() == 0
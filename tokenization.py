@@ -0,0 +1,109 @@
+# tokenization.py
+import hashlib
+import threading
+
+import nltk
+
+from cache import LRUCache
+
+# DeepL-style language codes -> NLTK Punkt model names
+PUNKT_LANGUAGES = {
+    "CS": "czech",
+    "DA": "danish",
+    "DE": "german",
+    "EL": "greek",
+    "EN": "english",
+    "ES": "spanish",
+    "ET": "estonian",
+    "FI": "finnish",
+    "FR": "french",
+    "IT": "italian",
+    "NB": "norwegian",
+    "NL": "dutch",
+    "PL": "polish",
+    "PT": "portuguese",
+    "RU": "russian",
+    "SL": "slovene",
+    "SV": "swedish",
+    "TR": "turkish",
+}
+DEFAULT_PUNKT_LANGUAGE = "english"
+
+
+class TokenizationService:
+    """
+    Language-aware sentence/word tokenization. Punkt models are loaded once per
+    language and results are memoized by content hash, so the translation
+    endpoint and the aligner can share work for the same text.
+    """
+
+    def __init__(self, cache_size: int = 10000):
+        self._punkt = {}
+        self._punkt_lock = threading.Lock()
+        self.sentence_cache = LRUCache(cache_size)
+        self.word_cache = LRUCache(cache_size)
+
+    @staticmethod
+    def punkt_language(language: str = None) -> str:
+        if not language:
+            return DEFAULT_PUNKT_LANGUAGE
+        # Accept "SV", "sv", "EN-GB", "PT-BR", ...
+        code = language.upper().split("-")[0]
+        return PUNKT_LANGUAGES.get(code, DEFAULT_PUNKT_LANGUAGE)
+
+    def _get_punkt(self, punkt_language: str):
+        tokenizer = self._punkt.get(punkt_language)
+        if tokenizer is not None:
+            return tokenizer
+        with self._punkt_lock:
+            tokenizer = self._punkt.get(punkt_language)
+            if tokenizer is None:
+                try:
+                    # nltk >= 3.8.2 ships Punkt parameters as "punkt_tab"
+                    from nltk.tokenize import PunktTokenizer
+
+                    tokenizer = PunktTokenizer(punkt_language)
+                except ImportError:
+                    tokenizer = nltk.data.load(f"tokenizers/punkt/{punkt_language}.pickle")
+                self._punkt[punkt_language] = tokenizer
+        return tokenizer
+
+    @staticmethod
+    def _key(text: str, punkt_language: str):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        return (punkt_language, digest)
+
+    def sent_tokenize(self, text: str, language: str = None) -> list[str]:
+        """
+        Splits text into sentences with the Punkt model for the given language.
+        """
+        if not text:
+            return []
+        punkt_language = self.punkt_language(language)
+        key = self._key(text, punkt_language)
+        sentences = self.sentence_cache.get(key)
+        if sentences is None:
+            sentences = tuple(self._get_punkt(punkt_language).tokenize(text))
+            self.sentence_cache.set(key, sentences)
+        return list(sentences)
+
+    def word_tokenize(self, text: str, language: str = None) -> list[str]:
+        """
+        Splits text into word tokens. Equivalent to nltk.word_tokenize(text, language),
+        but sentence splitting goes through the cached Punkt model.
+        """
+        if not text:
+            return []
+        punkt_language = self.punkt_language(language)
+        key = self._key(text, punkt_language)
+        tokens = self.word_cache.get(key)
+        if tokens is None:
+            tokens = tuple(
+                token
+                for sentence in self.sent_tokenize(text, language)
+                for token in nltk.word_tokenize(
+                    sentence, language=punkt_language, preserve_line=True
+                )
+            )
+            self.word_cache.set(key, tokens)
+        return list(tokens)
@@ -1,14 +1,120 @@
 # translation.py
 import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
 import requests
+from cache import LRUCache
 from config import Config
 
+# DeepL accepts up to 50 `text` parameters per request
+DEEPL_MAX_TEXTS_PER_REQUEST = 50
+
+
+def deepl_form_data(
+    api_key: str, texts: list[str], source_lang: str, target_lang: str
+) -> list[tuple]:
+    """
+    Form fields of a DeepL /v2/translate request; `text` is repeated per text.
+    """
+    data = [("auth_key", api_key), ("target_lang", target_lang)]
+    if source_lang:
+        data.append(("source_lang", source_lang))
+    data.extend(("text", text) for text in texts)
+    return data
+
+
+def parse_deepl_response(result_json: dict, expected: int) -> list[str]:
+    translations = result_json.get("translations")
+    if not translations or len(translations) != expected:
+        raise RuntimeError("DeepL response is missing 'translations' data.")
+    return [t["text"] for t in translations]
+
 
 class TranslationService:
-    def __init__(self):
+    def __init__(self, cache_size: int = 10000):
         self.api_key = Config.DEEPL_API_KEY
-        self.url = "https://api-free.deepl.com/v2/translate"
-        self.cache = {}
+        self.url = Config.DEEPL_API_URL
+        self.timeout = Config.DEEPL_TIMEOUT
+        self.wait_timeout = Config.DEEPL_WAIT_TIMEOUT
+        # Bounded and lock-guarded: shared by request threads, translation job
+        # workers and the async serving path
+        self.cache = LRUCache(cache_size)
+        self._inflight = {}  # cache key -> Future of the DeepL call fetching it
+        self._inflight_lock = threading.Lock()
+
+    @staticmethod
+    def _cache_key(text: str, source_lang: str, target_lang: str):
+        return (text, source_lang or "", target_lang)
+
+    def get_cached(self, text: str, source_lang: str = None, target_lang: str = "SV"):
+        """
+        Returns the cached translation for text, or None without calling DeepL.
+        """
+        return self.cache.get(self._cache_key(text, source_lang, target_lang))
+
+    def claim(self, cache_keys):
+        """
+        Single-flight bookkeeping for DeepL calls. Splits cache_keys into
+        ({key: cached translation}, {key: Future the caller must fetch},
+        {key: Future another caller is already fetching}).
+        The caller must settle its own Futures with finish().
+        """
+        cached, mine, theirs = {}, {}, {}
+        with self._inflight_lock:
+            for key in cache_keys:
+                if key in cached or key in mine or key in theirs:
+                    continue
+                future = self._inflight.get(key)
+                if future is not None:
+                    theirs[key] = future
+                    continue
+                translated = self.cache.get(key)
+                if translated is not None:
+                    cached[key] = translated
+                else:
+                    mine[key] = self._inflight[key] = Future()
+        return cached, mine, theirs
+
+    def finish(self, futures: dict, results: dict = None, error: BaseException = None):
+        """
+        Settles Futures returned by claim(): caches and publishes results, or
+        passes error on to every caller waiting for them. Futures that are
+        already settled are skipped, and every other one is settled even if
+        caching fails (waiters then get that error).
+        """
+        try:
+            if error is None:
+                for key in futures:
+                    self.cache.set(key, results[key])
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                for key, future in futures.items():
+                    if self._inflight.get(key) is future:
+                        del self._inflight[key]
+            for key, future in futures.items():
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(results[key])
+                else:
+                    future.set_exception(error)
+
+    def wait(self, future: Future, deadline: float) -> str:
+        """
+        Result of a Future another caller is fetching, waiting at most until
+        `deadline` (a time.monotonic() value).
+        """
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            raise RuntimeError(
+                "DeepL Translation failed: timed out waiting for an identical request"
+            )
 
     def translate(
         self, text: str, source_lang: str = None, target_lang: str = "SV"
@@ -16,39 +122,80 @@ class TranslationService:
         """
         Translate text from source_lang to target_lang using DeepL.
         Returns the translated text or raises an exception if it fails.
+        Concurrent calls for the same text share one DeepL request.
         """
         if not text:
             return ""
 
+        cache_key = self._cache_key(text, source_lang, target_lang)
+        cached, mine, theirs = self.claim([cache_key])
+        if cached:
+            return cached[cache_key]
+        if theirs:
+            return self.wait(theirs[cache_key], time.monotonic() + self.wait_timeout)
+
+        try:
+            translated = self._request([text], source_lang, target_lang)[0]
+            self.finish(mine, {cache_key: translated})
+        except BaseException as e:
+            # Anything from a DeepL error to an interrupt: waiters must not hang
+            self.finish(mine, error=e)
+            raise
+        return translated
+
+    def translate_batch(
+        self, texts: list[str], source_lang: str = None, target_lang: str = "SV"
+    ) -> list[str]:
+        """
+        Translates many texts with as few DeepL requests as possible
+        (up to DEEPL_MAX_TEXTS_PER_REQUEST texts each). Cached texts, and texts
+        another caller is already translating, are not sent.
+        Returns translations in input order.
+        """
+        # cache key -> text, deduplicated in first-seen order
+        keys = {}
+        for text in texts:
+            if text:
+                keys.setdefault(self._cache_key(text, source_lang, target_lang), text)
+
+        results, mine, theirs = self.claim(keys)
+        pending = list(mine)
+        try:
+            for i in range(0, len(pending), DEEPL_MAX_TEXTS_PER_REQUEST):
+                chunk = pending[i : i + DEEPL_MAX_TEXTS_PER_REQUEST]
+                translations = self._request(
+                    [keys[key] for key in chunk], source_lang, target_lang
+                )
+                fetched = dict(zip(chunk, translations))
+                self.finish({key: mine[key] for key in chunk}, fetched)
+                results.update(fetched)
+        except BaseException as e:
+            # Release this chunk and the ones not sent yet (finish skips the
+            # chunks already settled)
+            self.finish(mine, error=e)
+            raise
+
+        deadline = time.monotonic() + self.wait_timeout
+        for key, future in theirs.items():
+            results[key] = self.wait(future, deadline)
+
+        return [
+            results[self._cache_key(text, source_lang, target_lang)] if text else ""
+            for text in texts
+        ]
+
+    def _request(self, texts: list[str], source_lang: str, target_lang: str) -> list[str]:
         # Check if we have a valid API key
         if not self.api_key:
             raise ValueError(
                 "DeepL API key is not set. Please configure DEEPL_API_KEY."
             )
 
-        cache_key = (text, source_lang or "", target_lang)
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-
-        data = {
-            "auth_key": self.api_key,
-            "text": text,
-            "target_lang": target_lang,
-            "source_lang": source_lang,
-        }
-        if source_lang:
-            data["source_lang"] = source_lang
-
-        resp = requests.post(self.url, data=data)
+        data = deepl_form_data(self.api_key, texts, source_lang, target_lang)
+        resp = requests.post(self.url, data=data, timeout=self.timeout)
         if resp.status_code != 200:
             raise RuntimeError(
                 f"DeepL Translation failed: {resp.status_code} - {resp.text}"
             )
 
-        result_json = resp.json()
-        if "translations" not in result_json or not result_json["translations"]:
-            raise RuntimeError("DeepL response is missing 'translations' data.")
-
-        translated = result_json["translations"][0]["text"]
-        self.cache[cache_key] = translated
-        return translated
+        return parse_deepl_response(resp.json(), len(texts))
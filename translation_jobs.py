@@ -0,0 +1,445 @@
+# translation_jobs.py
+import json
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from db import DBService
+from models import DEFAULT_USER_ID, TranslationJob, TranslationJobChunk
+from translation_pipeline import build_sentence_results
+
+
+class TranslationJobService:
+    """
+    Background translation of long documents. A submitted document is split into
+    sentence-aligned chunks that are stored in the DB; worker threads run
+    translate -> align -> mark on each chunk and checkpoint its result.
+
+    Chunks are claimed with a conditional UPDATE and a lease, so several
+    processes can sweep the same jobs safely, and a restarted process resumes
+    whatever is not done yet instead of starting over.
+    """
+
+    def __init__(
+        self,
+        app,
+        db_service: DBService,
+        max_workers: int = 4,
+        per_job_concurrency: int = 2,
+        chunk_chars: int = 2000,
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+    ):
+        self.app = app
+        self.db_service = db_service
+        self.per_job_concurrency = max(1, per_job_concurrency)
+        self.chunk_chars = chunk_chars
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Global concurrency limit: at most max_workers chunks run at once
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="translation-job"
+        )
+        self._lock = threading.Lock()
+        self._queues = {}  # job_id -> deque of chunk indexes waiting for a slot
+        self._active = {}  # job_id -> number of chunks currently running
+        self._scheduled = set()  # (job_id, chunk_index) queued or running here
+        self._timer = None
+
+    # --- Submission & scheduling ---------------------------------------------
+
+    def split(self, text: str, source_lang: str) -> list[str]:
+        """
+        Splits text into chunks of about chunk_chars, cutting only at sentence
+        starts so the original spacing and paragraph breaks are preserved.
+        """
+        sentences = self.app.tokenization_service.sent_tokenize(text, source_lang)
+        starts = []
+        pos = 0
+        for s in sentences:
+            idx = text.find(s, pos)
+            if idx < 0:
+                idx = pos
+            starts.append(idx)
+            pos = idx + len(s)
+
+        chunks = []
+        chunk_start = 0
+        for start in starts[1:]:
+            if start - chunk_start >= self.chunk_chars:
+                chunks.append(text[chunk_start:start])
+                chunk_start = start
+        chunks.append(text[chunk_start:])
+        return [c.strip() for c in chunks if c.strip()]
+
+    def submit(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        mark_words: bool = True,
+        user_id: str = DEFAULT_USER_ID,
+    ) -> dict:
+        """
+        Stores a new job and its chunks, then schedules them. Words are marked
+        against user_id's vocabulary. Returns the job status.
+        """
+        chunks = self.split(text, source_lang)
+        job_id = uuid.uuid4().hex
+
+        session: Session = self.db_service.get_session()
+        try:
+            session.add(
+                TranslationJob(
+                    id=job_id,
+                    user_id=user_id,
+                    status="queued",
+                    source_lang=source_lang,
+                    target_lang=target_lang,
+                    mark_words=mark_words,
+                    total_chunks=len(chunks),
+                    done_chunks=0,
+                )
+            )
+            session.flush()
+            session.add_all(
+                TranslationJobChunk(job_id=job_id, chunk_index=i, source_text=c)
+                for i, c in enumerate(chunks)
+            )
+            session.commit()
+        finally:
+            session.close()
+
+        self._enqueue(job_id, range(len(chunks)))
+        return self.get_status(job_id)
+
+    def _enqueue(self, job_id: str, indexes):
+        with self._lock:
+            queue = self._queues.setdefault(job_id, deque())
+            self._active.setdefault(job_id, 0)
+            for idx in indexes:
+                if (job_id, idx) not in self._scheduled:
+                    self._scheduled.add((job_id, idx))
+                    queue.append(idx)
+        self._pump(job_id)
+
+    def _pump(self, job_id: str):
+        # Per-job concurrency limit: at most per_job_concurrency chunks in flight
+        with self._lock:
+            queue = self._queues.get(job_id)
+            while queue and self._active[job_id] < self.per_job_concurrency:
+                idx = queue.popleft()
+                self._active[job_id] += 1
+                self.executor.submit(self._run_chunk, job_id, idx)
+
+    def _run_chunk(self, job_id: str, idx: int):
+        try:
+            with self.app.app_context():
+                self._process_chunk(job_id, idx)
+        except Exception as e:
+            print(f"Warning: Translation job {job_id} chunk {idx} crashed: {str(e)}")
+        finally:
+            with self._lock:
+                self._active[job_id] -= 1
+                self._scheduled.discard((job_id, idx))
+                finished = self._active[job_id] == 0 and not self._queues[job_id]
+                if finished:
+                    del self._active[job_id]
+                    del self._queues[job_id]
+            if finished:
+                self._finalize(job_id)
+            else:
+                self._pump(job_id)
+
+    def _process_chunk(self, job_id: str, idx: int):
+        now = datetime.now(timezone.utc)
+        token = uuid.uuid4().hex
+        session: Session = self.db_service.get_session()
+        try:
+            # Claim the chunk; another process may already own it
+            claimed = self._claim(session, job_id, idx, now, token)
+            session.query(TranslationJob).filter(
+                TranslationJob.id == job_id, TranslationJob.status == "queued"
+            ).update({TranslationJob.status: "running"}, synchronize_session=False)
+            session.commit()
+            if not claimed:
+                return
+
+            job = session.get(TranslationJob, job_id)
+            chunk = session.get(TranslationJobChunk, (job_id, idx))
+            # Result writes only land while this claim still holds the chunk; if
+            # the lease expired and another worker re-claimed it, theirs wins.
+            # The token tells claims apart even when their timestamps are equal
+            still_ours = session.query(TranslationJobChunk).filter(
+                TranslationJobChunk.job_id == job_id,
+                TranslationJobChunk.chunk_index == idx,
+                TranslationJobChunk.status == "running",
+                TranslationJobChunk.claim_token == token,
+            )
+            try:
+                translated = current_app.translation_service.translate(
+                    chunk.source_text,
+                    source_lang=job.source_lang,
+                    target_lang=job.target_lang,
+                )
+                sentences = build_sentence_results(
+                    chunk.source_text,
+                    translated,
+                    job.source_lang,
+                    job.target_lang,
+                    split_sentences=True,
+                    mark_words=job.mark_words,
+                    user_id=job.user_id or DEFAULT_USER_ID,
+                )
+            except Exception as e:
+                still_ours.update(
+                    {
+                        TranslationJobChunk.status: "failed",
+                        TranslationJobChunk.error: str(e),
+                    },
+                    synchronize_session=False,
+                )
+                session.commit()
+                return
+
+            # Checkpoint the finished chunk
+            finished = still_ours.update(
+                {
+                    TranslationJobChunk.result: json.dumps(
+                        {"translatedText": translated, "sentences": sentences},
+                        ensure_ascii=False,
+                    ),
+                    TranslationJobChunk.status: "done",
+                    TranslationJobChunk.error: None,
+                },
+                synchronize_session=False,
+            )
+            if finished == 1:
+                session.query(TranslationJob).filter(TranslationJob.id == job_id).update(
+                    {
+                        TranslationJob.done_chunks: TranslationJob.done_chunks + 1,
+                        TranslationJob.updated_at: datetime.now(timezone.utc),
+                    },
+                    synchronize_session=False,
+                )
+            session.commit()
+        finally:
+            session.close()
+
+    def _claim(self, session: Session, job_id: str, idx: int, now: datetime, token: str):
+        """
+        Marks the chunk running under `token` if it is pending, retryable or its
+        lease has expired. Returns the number of rows claimed (0 or 1).
+        Does not commit.
+        """
+        return (
+            session.query(TranslationJobChunk)
+            .filter(
+                TranslationJobChunk.job_id == job_id,
+                TranslationJobChunk.chunk_index == idx,
+                or_(
+                    TranslationJobChunk.status == "pending",
+                    and_(
+                        TranslationJobChunk.status == "failed",
+                        TranslationJobChunk.attempts < self.max_attempts,
+                    ),
+                    and_(
+                        TranslationJobChunk.status == "running",
+                        TranslationJobChunk.claimed_at
+                        < now - timedelta(seconds=self.lease_seconds),
+                    ),
+                ),
+            )
+            .update(
+                {
+                    TranslationJobChunk.status: "running",
+                    TranslationJobChunk.claimed_at: now,
+                    TranslationJobChunk.claim_token: token,
+                    TranslationJobChunk.attempts: TranslationJobChunk.attempts + 1,
+                },
+                synchronize_session=False,
+            )
+        )
+
+    def _finalize(self, job_id: str):
+        """
+        Marks the job done, or failed once no chunk can be retried any more.
+        """
+        session: Session = self.db_service.get_session()
+        try:
+            counts = dict(
+                session.query(TranslationJobChunk.status, func.count())
+                .filter(TranslationJobChunk.job_id == job_id)
+                .group_by(TranslationJobChunk.status)
+                .all()
+            )
+            retryable = (
+                session.query(func.count())
+                .select_from(TranslationJobChunk)
+                .filter(
+                    TranslationJobChunk.job_id == job_id,
+                    TranslationJobChunk.status == "failed",
+                    TranslationJobChunk.attempts < self.max_attempts,
+                )
+                .scalar()
+            )
+            if counts.get("pending") or counts.get("running") or retryable:
+                return  # the sweeper will pick the rest up
+
+            job = session.get(TranslationJob, job_id)
+            if job is None or job.status in ("done", "failed"):
+                return
+            failed = counts.get("failed", 0)
+            job.status = "failed" if failed else "done"
+            job.error = f"{failed} chunk(s) failed" if failed else None
+            session.commit()
+        finally:
+            session.close()
+
+    def resume(self):
+        """
+        Schedules every unfinished chunk of unfinished jobs (after a restart,
+        or for chunks whose lease expired in another process).
+        """
+        session: Session = self.db_service.get_session()
+        try:
+            rows = (
+                session.query(TranslationJob.id, TranslationJobChunk.chunk_index)
+                .outerjoin(
+                    TranslationJobChunk,
+                    and_(
+                        TranslationJobChunk.job_id == TranslationJob.id,
+                        TranslationJobChunk.status != "done",
+                        or_(
+                            TranslationJobChunk.status != "failed",
+                            TranslationJobChunk.attempts < self.max_attempts,
+                        ),
+                    ),
+                )
+                .filter(TranslationJob.status.in_(("queued", "running")))
+                .order_by(TranslationJob.created_at, TranslationJobChunk.chunk_index)
+                .all()
+            )
+        finally:
+            session.close()
+
+        pending = {}
+        for job_id, idx in rows:
+            indexes = pending.setdefault(job_id, [])
+            if idx is not None:
+                indexes.append(idx)
+        for job_id, indexes in pending.items():
+            if indexes:
+                self._enqueue(job_id, indexes)
+            else:
+                self._finalize(job_id)
+
+    def start_sweeper(self, interval_seconds: float):
+        """
+        Calls resume() every `interval_seconds` on a daemon timer.
+        """
+
+        def run():
+            try:
+                self.resume()
+            except Exception as e:
+                print(f"Warning: Translation job sweep failed: {str(e)}")
+            self.start_sweeper(interval_seconds)
+
+        self._timer = threading.Timer(interval_seconds, run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    # --- Queries --------------------------------------------------------------
+
+    @staticmethod
+    def _get_job(session: Session, job_id: str, user_id: str = None):
+        job = session.get(TranslationJob, job_id)
+        if job is None:
+            return None
+        if user_id is not None and (job.user_id or DEFAULT_USER_ID) != user_id:
+            return None
+        return job
+
+    def get_status(self, job_id: str, user_id: str = None):
+        """
+        Returns job progress, or None if the job doesn't exist (or, if user_id
+        is given, belongs to another user).
+        """
+        session: Session = self.db_service.get_session()
+        try:
+            job = self._get_job(session, job_id, user_id)
+            if not job:
+                return None
+            failed = (
+                session.query(func.count())
+                .select_from(TranslationJobChunk)
+                .filter(
+                    TranslationJobChunk.job_id == job_id,
+                    TranslationJobChunk.status == "failed",
+                )
+                .scalar()
+            )
+            return {
+                "jobId": job.id,
+                "status": job.status,
+                "sourceLanguage": job.source_lang,
+                "targetLanguage": job.target_lang,
+                "totalChunks": job.total_chunks,
+                "doneChunks": job.done_chunks,
+                "failedChunks": failed,
+                "progress": (
+                    round(job.done_chunks / job.total_chunks, 4) if job.total_chunks else 1.0
+                ),
+                "error": job.error,
+                "createdAt": job.created_at.isoformat() if job.created_at else None,
+                "updatedAt": job.updated_at.isoformat() if job.updated_at else None,
+            }
+        finally:
+            session.close()
+
+    def get_results(
+        self, job_id: str, page: int = 1, page_size: int = 10, user_id: str = None
+    ):
+        """
+        Returns one page of chunk results (finished or not), or None if the job
+        doesn't exist (or belongs to another user).
+        """
+        session: Session = self.db_service.get_session()
+        try:
+            job = self._get_job(session, job_id, user_id)
+            if not job:
+                return None
+            chunks = (
+                session.query(TranslationJobChunk)
+                .filter(TranslationJobChunk.job_id == job_id)
+                .order_by(TranslationJobChunk.chunk_index)
+                .offset((page - 1) * page_size)
+                .limit(page_size)
+                .all()
+            )
+            items = []
+            for c in chunks:
+                item = {"index": c.chunk_index, "status": c.status}
+                if c.status == "done" and c.result:
+                    item.update(json.loads(c.result))
+                elif c.error:
+                    item["error"] = c.error
+                items.append(item)
+            return {
+                "jobId": job.id,
+                "status": job.status,
+                "page": page,
+                "pageSize": page_size,
+                "totalChunks": job.total_chunks,
+                "totalPages": (job.total_chunks + page_size - 1) // page_size,
+                "chunks": items,
+            }
+        finally:
+            session.close()
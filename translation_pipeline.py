@@ -0,0 +1,94 @@
+# translation_pipeline.py
+from flask import current_app
+
+from models import DEFAULT_USER_ID
+
+
+def build_sentence_results(
+    text: str,
+    translated_text: str,
+    source_lang: str,
+    target_lang: str,
+    split_sentences: bool = True,
+    mark_words: bool = True,
+    user_id: str = DEFAULT_USER_ID,
+):
+    """
+    Splits an already translated text into sentence pairs, aligns each pair and
+    (optionally) marks source tokens found in the user's vocabulary.
+    Shared by POST /api/translation and the background translation jobs;
+    needs an application context.
+    Returns a list of
+    {
+      "original": ..., "translated": ...,
+      "src_tokenized": [...], "trg_tokenized": [...],
+      "alignment": [(src_idx, trg_idx), ...],
+      "wordInfo": [...]
+    }
+    """
+    # Split text into sentences if requested
+    if split_sentences:
+        tokenizer = current_app.tokenization_service
+        original_sentences = tokenizer.sent_tokenize(text, source_lang)
+        translated_sentences = tokenizer.sent_tokenize(translated_text, target_lang)
+    else:
+        original_sentences = [text]
+        translated_sentences = [translated_text]
+
+    results = []
+    # For each (original, translated) sentence pair:
+    for orig, tran in zip(original_sentences, translated_sentences):
+        # Use alignment service to get tokenization & alignment
+        align_data = current_app.alignment_service.align(
+            orig, tran, source_lang=source_lang, target_lang=target_lang
+        )
+        # align_data = {
+        #    "src_tokenized": [...],
+        #    "trg_tokenized": [...],
+        #    "alignment": [(src_idx, trg_idx), ...]
+        # }
+
+        # If markWords == True, look up the source tokens in the vocabulary
+        # because the source language is the one we're learning
+        word_info_list = []
+        if mark_words:
+            # One batched lookup per sentence; each info has keys:
+            # "original_word", "found_in_vocabulary", "match_type", etc.
+            word_info_list = current_app.vocabulary_lookup_service.lookup_words(
+                align_data["src_tokenized"], source_lang, user_id
+            )
+
+        results.append(
+            {
+                "original": orig,
+                "translated": tran,
+                "src_tokenized": align_data["src_tokenized"],
+                "trg_tokenized": align_data["trg_tokenized"],
+                "alignment": align_data["alignment"],
+                "wordInfo": word_info_list,
+            }
+        )
+    return results
+
+
+def translation_payload(
+    text: str, translated_text: str, results: list[dict], split_sentences: bool = True
+) -> dict:
+    """
+    The verbose POST /api/translation response body for build_sentence_results.
+    """
+    payload = {
+        "originalText": text,
+        "translatedText": translated_text,
+        "alignment": (
+            [r["alignment"] for r in results]
+            if split_sentences
+            else results[0]["alignment"]
+        ),
+        "sentences": results if split_sentences else [results[0]],
+    }
+
+    # If not splitting, remove the array of sentences to keep it consistent
+    if not split_sentences:
+        del payload["sentences"]
+    return payload
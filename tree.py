@@ -1,57 +1,225 @@
+# tree.py
+"""
+Writes a snapshot of the repository (directory tree plus file contents) to
+tree.txt:
+
+    python tree.py [path] [--incremental] [--max-bytes N] [--output tree.txt]
+
+The tree is walked with os.scandir and written to the output as it goes.
+Symlinked directories are followed unless they point back into the snapshot
+(or somewhere already listed); those are listed as "name -> target".
+Binary files are detected from their first bytes and never read further.
+Each file contributes at most --max-bytes bytes of content.
+
+With --incremental, a manifest next to the output records each file's mtime,
+size and the byte range of its rendered block. Files whose mtime and size are
+unchanged are copied from the previous snapshot instead of being re-read.
+"""
+import argparse
+import codecs
+import io
+import json
 import os
 
-global res
-res = ""
+# Paths containing any of these are skipped
+EXCLUDED = ("git", ".vscode", "config", ".venv", "__pycache__")
 
+DEFAULT_OUTPUT = "tree.txt"
+MANIFEST_SUFFIX = ".manifest.json"
+DEFAULT_MAX_BYTES = 256 * 1024
 
-def prpr(st):
-    global res
-    res += st + "\n"
+# Bytes read to decide whether a file is binary
+SNIFF_BYTES = 8192
 
+BINARY_LINE = "[Binary File - Content Not Displayed]"
+UNREADABLE_LINE = "[Unreadable File - Content Not Displayed]"
+
+
+def is_excluded(item_path: str) -> bool:
+    return any(pattern in item_path for pattern in EXCLUDED)
 
-def tree(path, indent=""):
-    """
-    Recursively prints the directory structure and file contents like the 'tree' command.
 
-    Args:
-      path: The path to the directory to start from.
-      indent: The indentation string to use for subdirectories.
+def render_file(path: str, name: str, indent: str, max_bytes: int) -> str:
     """
+    The snapshot block of one file: its name, then its content (up to
+    max_bytes) or a binary marker.
+    """
+    inner = indent + "    "
+    header = indent + "  " + name + "\n"
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(min(SNIFF_BYTES, max_bytes))
+            if b"\0" in head:
+                return header + inner + BINARY_LINE + "\n"
+            data = head + f.read(max_bytes - len(head))
+    except OSError:
+        return header + inner + UNREADABLE_LINE + "\n"
+
+    truncated = size > len(data)
+    try:
+        # A multi-byte character cut by the cap is dropped, not an error
+        text = codecs.getincrementaldecoder("utf-8")().decode(data, final=not truncated)
+    except UnicodeDecodeError:
+        return header + inner + BINARY_LINE + "\n"
+
+    out = io.StringIO()
+    out.write(header)
+    out.write(inner + "-- File Content --\n")
+    for line in io.StringIO(text, newline=None):
+        out.write(inner + line.strip() + "\n")
+    if truncated:
+        out.write(inner + f"[Truncated - {size - len(data)} more bytes not displayed]\n")
+    out.write(inner + "---\n")
+    return out.getvalue()
 
-    prpr(indent + os.path.basename(path))
 
-    for item in os.listdir(path):
-        item_path = os.path.join(path, item)
+class Snapshot:
+    def __init__(
+        self,
+        root: str = ".",
+        output: str = DEFAULT_OUTPUT,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        incremental: bool = False,
+    ):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be >= 0")
+        self.root = root
+        self.output = output
+        self.manifest_path = output + MANIFEST_SUFFIX
+        self.max_bytes = max_bytes
+        self.incremental = incremental
+        # Never snapshot our own output
+        self.skip = {
+            os.path.realpath(p)
+            for p in (output, self.manifest_path, output + ".tmp", self.manifest_path + ".tmp")
+        }
+        self.stats = {"files": 0, "rendered": 0, "reused": 0}
+        self._visited = set()  # real paths of directories followed through symlinks
+
+    def _load_manifest(self) -> dict:
+        """
+        Entries of the previous snapshot, or {} if there is none or it no
+        longer matches the output file or the current settings.
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            output_stat = os.stat(self.output)
+        except (OSError, ValueError):
+            return {}
         if (
-            "git" in item_path
-            or ".vscode" in item_path
-            or "config" in item_path
-            or ".venv" in item_path
-            or "__pycache__" in item_path
+            manifest.get("root") != os.path.abspath(self.root)
+            or manifest.get("max_bytes") != self.max_bytes
+            or manifest.get("output_size") != output_stat.st_size
+            or manifest.get("output_mtime_ns") != output_stat.st_mtime_ns
         ):
-            continue
-        if os.path.isdir(item_path):
-            tree(item_path, indent + "  ")
-        elif "tree.py" not in item_path:
-            prpr(indent + "  " + item)
+            return {}
+        return manifest.get("entries", {})
+
+    def run(self) -> dict:
+        previous = self._load_manifest() if self.incremental else {}
+        entries = {}
+        tmp = self.output + ".tmp"
+        old = open(self.output, "rb") if previous else None
+        try:
+            with open(tmp, "wb") as out:
+                self._walk(self.root, "", out, old, previous, entries)
+        finally:
+            if old is not None:
+                old.close()
+        os.replace(tmp, self.output)
+
+        output_stat = os.stat(self.output)
+        manifest = {
+            "root": os.path.abspath(self.root),
+            "max_bytes": self.max_bytes,
+            "output_size": output_stat.st_size,
+            "output_mtime_ns": output_stat.st_mtime_ns,
+            # relative path -> [mtime_ns, size, offset, length] in the output
+            "entries": entries,
+        }
+        with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        return self.stats
+
+    def _walk(self, path, indent, out, old, previous, entries):
+        out.write((indent + os.path.basename(path) + "\n").encode("utf-8"))
+
+        with os.scandir(path) as it:
+            items = sorted(it, key=lambda e: e.name)
+        for entry in items:
+            item_path = os.path.join(path, entry.name)
+            if is_excluded(item_path):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                self._walk(item_path, indent + "  ", out, old, previous, entries)
+            elif entry.is_symlink() and entry.is_dir():
+                self._symlinked_dir(entry, item_path, indent, out, old, previous, entries)
+            elif "tree.py" not in item_path and os.path.realpath(item_path) not in self.skip:
+                self._file(entry, item_path, indent, out, old, previous, entries)
+
+    def _symlinked_dir(self, entry, item_path, indent, out, old, previous, entries):
+        real = os.path.realpath(item_path)
+        root = os.path.realpath(self.root)
+        inside_root = real == root or real.startswith(root + os.sep)
+        if inside_root or real in self._visited:
+            # Listed elsewhere in the snapshot; following it could loop forever
             try:
-                with open(item_path, "r") as f:
-                    prpr(indent + "    " + "-- File Content --")
-                    for line in f:
-                        prpr(indent + "    " + line.strip())
-                    prpr(indent + "    " + "---")
-            except UnicodeDecodeError:
-                prpr(indent + "    " + "[Binary File - Content Not Displayed]")
+                target = os.readlink(item_path)
+            except OSError:
+                target = real
+            out.write(f"{indent}  {entry.name} -> {target}\n".encode("utf-8"))
+            return
+        self._visited.add(real)
+        self._walk(item_path, indent + "  ", out, old, previous, entries)
 
+    def _file(self, entry, item_path, indent, out, old, previous, entries):
+        self.stats["files"] += 1
+        key = os.path.relpath(item_path, self.root)
+        try:
+            stat = entry.stat()
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            mtime_ns, size = None, None
 
-if __name__ == "__main__":
-    import sys
+        cached = previous.get(key)
+        if cached is not None and mtime_ns is not None and cached[:2] == [mtime_ns, size]:
+            old.seek(cached[2])
+            block = old.read(cached[3])
+            self.stats["reused"] += 1
+        else:
+            block = render_file(item_path, entry.name, indent, self.max_bytes).encode("utf-8")
+            self.stats["rendered"] += 1
 
-    if len(sys.argv) > 1:
-        start_path = sys.argv[1]
-    else:
-        start_path = "."
+        offset = out.tell()
+        out.write(block)
+        if mtime_ns is not None:
+            entries[key] = [mtime_ns, size, offset, len(block)]
+
+
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {number}")
+    return number
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot a directory tree with file contents.")
+    parser.add_argument("path", nargs="?", default=".")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--max-bytes", type=non_negative_int, default=DEFAULT_MAX_BYTES)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only re-render files whose mtime or size changed since the last snapshot.",
+    )
+    args = parser.parse_args()
 
-    tree(start_path)
-    with open("./tree.txt", "w") as file:
-        file.write(res)
+    stats = Snapshot(args.path, args.output, args.max_bytes, args.incremental).run()
+    print(
+        f"{stats['files']} files: {stats['rendered']} rendered, {stats['reused']} reused "
+        f"-> {args.output}"
+    )
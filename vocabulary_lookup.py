@@ -1,99 +1,118 @@
 # vocabulary_lookup.py
-from nltk.stem import WordNetLemmatizer
 from db import DBService
+from lemmatization import LemmatizationService, QUERY_CHUNK_SIZE
+from models import DEFAULT_USER_ID
 from sqlalchemy.orm import Session
 
 
+def vocabulary_entry(v):
+    """
+    Serializes a Vocabulary row into the dict format used by the API.
+    """
+    return {
+        "word": v.word,
+        "language": v.language,
+        "translation": v.translation,
+        "state": v.state,
+        "due": v.due.isoformat() if v.due else None,
+        "stability": v.stability,
+        "difficulty": v.difficulty,
+        "last_review": v.last_review.isoformat() if v.last_review else None,
+        "step": v.step,
+    }
+
+
 class VocabularyLookupService:
-    def __init__(self, db_service: DBService):
+    def __init__(
+        self, db_service: DBService, lemmatization_service: LemmatizationService = None
+    ):
         self.db_service = db_service
-        self.lemmatizer = WordNetLemmatizer()
+        self.lemmatization_service = lemmatization_service or LemmatizationService(
+            db_service
+        )
+
+    def lookup_word(self, word: str, language: str, user_id: str = DEFAULT_USER_ID):
+        return self.lookup_words([word], language, user_id)[0]
 
-    def lookup_word(self, word: str, language: str):
-        session: Session = self.db_service.get_session()
+    def lookup_words(
+        self, words: list[str], language: str, user_id: str = DEFAULT_USER_ID
+    ):
+        """
+        Looks up many tokens at once. Lemmas are resolved in one batch and all
+        direct/lemma candidates are fetched with a single IN query (per chunk),
+        instead of two queries per token.
+        Only the given user's vocabulary is searched.
+        Returns one info dict per input word, in order.
+        """
+        session: Session = self.db_service.get_session(user_id)
         try:
             from models import Vocabulary
 
-            # Direct match (case-insensitive)
-            direct_match = (
-                session.query(Vocabulary)
-                .filter(
-                    Vocabulary.word.ilike(word), Vocabulary.language.ilike(language)
-                )
-                .first()
-            )
-
-            if direct_match:
-                return {
-                    "original_word": word,
-                    "found_in_vocabulary": True,
-                    "match_type": "direct",
-                    "vocabulary_entry": {
-                        "word": direct_match.word,
-                        "language": direct_match.language,
-                        "translation": direct_match.translation,
-                        "state": direct_match.state,
-                        "due": (
-                            direct_match.due.isoformat() if direct_match.due else None
-                        ),
-                        "stability": direct_match.stability,
-                        "difficulty": direct_match.difficulty,
-                        "last_review": (
-                            direct_match.last_review.isoformat()
-                            if direct_match.last_review
-                            else None
-                        ),
-                        "step": direct_match.step,
-                    },
-                }
+            lang = language.lower()
+            lemmas = self.lemmatization_service.lemmatize_many(words, lang)
+            candidates = list(set(lemmas) | set(lemmas.values()))
 
-            # Lemmatization match
-            lemma = self.lemmatizer.lemmatize(word.lower())
-            lemma_match = (
-                session.query(Vocabulary)
-                .filter(
-                    Vocabulary.word.ilike(lemma), Vocabulary.language.ilike(language)
+            found = {}
+            for i in range(0, len(candidates), QUERY_CHUNK_SIZE):
+                chunk = candidates[i : i + QUERY_CHUNK_SIZE]
+                rows = (
+                    session.query(Vocabulary)
+                    .filter(
+                        Vocabulary.user_id == user_id,
+                        Vocabulary.language == lang,
+                        Vocabulary.word.in_(chunk),
+                    )
+                    .all()
                 )
-                .first()
-            )
-
-            if lemma_match:
-                return {
-                    "original_word": word,
-                    "found_in_vocabulary": True,
-                    "match_type": "lemma",
-                    "vocabulary_entry": {
-                        "word": lemma_match.word,
-                        "language": lemma_match.language,
-                        "translation": lemma_match.translation,
-                        "state": lemma_match.state,
-                        "due": lemma_match.due.isoformat() if lemma_match.due else None,
-                        "stability": lemma_match.stability,
-                        "difficulty": lemma_match.difficulty,
-                        "last_review": (
-                            lemma_match.last_review.isoformat()
-                            if lemma_match.last_review
-                            else None
-                        ),
-                        "step": lemma_match.step,
-                    },
-                }
+                for v in rows:
+                    found[v.word] = vocabulary_entry(v)
 
-            # No match found
-            return {
-                "original_word": word,
-                "found_in_vocabulary": False,
-                "match_type": "none",
-                "vocabulary_entry": None,
-            }
+            results = []
+            for word in words:
+                form = word.lower()
+                lemma = lemmas[form]
+                if form in found:
+                    # Direct match (case-insensitive)
+                    results.append(
+                        {
+                            "original_word": word,
+                            "found_in_vocabulary": True,
+                            "match_type": "direct",
+                            "vocabulary_entry": found[form],
+                        }
+                    )
+                elif lemma in found:
+                    # Lemmatization match
+                    results.append(
+                        {
+                            "original_word": word,
+                            "found_in_vocabulary": True,
+                            "match_type": "lemma",
+                            "vocabulary_entry": found[lemma],
+                        }
+                    )
+                else:
+                    # No match found
+                    results.append(
+                        {
+                            "original_word": word,
+                            "found_in_vocabulary": False,
+                            "match_type": "none",
+                            "vocabulary_entry": None,
+                        }
+                    )
+            return results
         except Exception as e:
             # Log the exception as needed
             print(f"Error during vocabulary lookup: {str(e)}")
-            return {
-                "original_word": word,
-                "found_in_vocabulary": False,
-                "match_type": "error",
-                "vocabulary_entry": None,
-            }
+            return [
+                {
+                    "original_word": word,
+                    "found_in_vocabulary": False,
+                    "match_type": "error",
+                    "vocabulary_entry": None,
+                }
+                for word in words
+            ]
         finally:
             session.close()